@@ -1,75 +1,663 @@
+import asyncio
+import json
+import random
 import time
-from fastapi import APIRouter, HTTPException, Depends
-from app.schemas.text_analysis import TextRequest, TextAnalysisResponse
-from app.services.text_analysis_service import TextAnalysisService
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.admission import admission
+from app.core.cache import ResponseCache, SQLiteCacheBackend, TieredCache, estimate_size
 from app.core.config import settings
-from app.core.security import get_api_key
-from app.core.rate_limiter import rate_limiter
 from app.core.logging import api_logger
+from app.core.metrics import ANALYSIS_CANCELLATIONS, REGISTRY, Sample
+from app.core.rate_limiter import rate_limiter
+from app.core.security import get_api_key
+from app.core.singleflight import SingleFlight
+from app.core.startup import LazyResource
+from app.schemas.text_analysis import (
+    BatchAnalysisResponse,
+    BatchItemResult,
+    BatchTextRequest,
+    TextAnalysisResponse,
+    TextRequest,
+)
+from app.services.modes import GRAPH_MODE, LONG_MODE
 
 router = APIRouter()
-text_analysis_service = TextAnalysisService(settings.OPENAI_API_KEY)
 
-# Cache simples em memória
-response_cache = {}
+
+def _build_text_analysis_service():
+    # langchain, langgraph, openai e numpy só são importados aqui, no
+    # aquecimento da API ou na primeira requisição
+    from app.services.gazetteer import load_gazetteer
+    from app.services.local_classifier import HashedNGramClassifier
+    from app.services.text_analysis_service import TextAnalysisService
+
+    return TextAnalysisService(
+        settings.OPENAI_API_KEY,
+        topology=settings.WORKFLOW_TOPOLOGY,
+        default_mode=settings.ANALYSIS_MODE,
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        chunk_concurrency=settings.CHUNK_CONCURRENCY,
+        classification_sample_chunks=settings.CLASSIFICATION_SAMPLE_CHUNKS,
+        local_classifier=(
+            HashedNGramClassifier.load(settings.LOCAL_CLASSIFIER_PATH)
+            if settings.LOCAL_CLASSIFIER_PATH
+            else None
+        ),
+        local_classifier_threshold=settings.LOCAL_CLASSIFIER_THRESHOLD,
+        local_classifier_shadow_rate=settings.LOCAL_CLASSIFIER_SHADOW_RATE,
+        record_classification_labels=settings.LOG_CLASSIFICATION_TEXTS,
+        gazetteer=load_gazetteer(settings.GAZETTEER_PATH),
+        entity_mode=settings.ENTITY_EXTRACTION_MODE,
+        model=settings.MODEL_NAME,
+        base_url=settings.LLM_BASE_URL,
+    )
+
+
+text_analysis_service = LazyResource(_build_text_analysis_service)
+
+
+def _build_response_cache():
+    # Cache LRU em memória com TTL por entrada
+    cache = ResponseCache(
+        ttl=settings.CACHE_TTL,
+        max_items=settings.MAX_CACHE_ITEMS,
+        max_bytes=settings.CACHE_MAX_BYTES,
+        share_across_keys=settings.CACHE_SHARED_ACROSS_KEYS,
+    )
+    if settings.CACHE_BACKEND == "memory":
+        return cache
+    if settings.CACHE_BACKEND != "sqlite":
+        raise ValueError(f"Invalid CACHE_BACKEND '{settings.CACHE_BACKEND}'")
+    # Segundo nível em disco, compartilhado pelos workers do host
+    return TieredCache(
+        l1=cache,
+        l2=SQLiteCacheBackend(
+            settings.CACHE_SQLITE_PATH,
+            max_items=settings.CACHE_SQLITE_MAX_ITEMS,
+            busy_timeout=settings.CACHE_SQLITE_BUSY_TIMEOUT,
+        ),
+        dumps=lambda response: response.model_dump_json().encode("utf-8"),
+        loads=TextAnalysisResponse.model_validate_json,
+    )
+
+
+# Construído no aquecimento (ou na primeira requisição), e não na importação:
+# um CACHE_BACKEND inválido aparece em /ready em vez de impedir a partida
+response_cache = LazyResource(_build_response_cache)
+
+# Campos já prontos de análises canceladas (cliente desconectado), por chave
+# do cache de respostas: uma nova requisição para o mesmo texto só calcula o
+# que falta
+partial_results = ResponseCache(
+    ttl=settings.PARTIAL_RESULT_TTL,
+    max_items=settings.MAX_CACHE_ITEMS,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    sizeof=lambda fields: estimate_size(json.dumps(fields, ensure_ascii=False)),
+)
+
+# Requisições idênticas simultâneas compartilham uma única execução do workflow
+inflight_analyses = SingleFlight()
+
+
+def _collect_component_metrics():
+    # Contadores mantidos pelos próprios componentes, lidos só na exportação
+    cache_stats = response_cache.get().stats() if response_cache.built else {}
+    for name, value in cache_stats.items():
+        kind = "gauge" if name in ("items", "bytes") else "counter"
+        suffix = "" if kind == "gauge" else "_total"
+        yield Sample(
+            f"cache_{name}{suffix}", kind, f"Cache de respostas: {name}.", {}, value
+        )
+    admission_stats = admission.stats()
+    yield Sample(
+        "admission_limit",
+        "gauge",
+        "Limite atual (AIMD) de análises simultâneas enviadas ao LLM.",
+        {},
+        admission_stats["limit"],
+    )
+    yield Sample(
+        "admission_in_flight",
+        "gauge",
+        "Análises admitidas em execução.",
+        {},
+        admission_stats["in_flight"],
+    )
+    yield Sample(
+        "admission_queued",
+        "gauge",
+        "Análises aguardando vaga na fila de admissão.",
+        {},
+        admission_stats["queued"],
+    )
+    yield Sample(
+        "admission_limit_decreases_total",
+        "counter",
+        "Reduções do limite por latência acima do alvo.",
+        {},
+        admission_stats["decreases"],
+    )
+    partial_stats = partial_results.stats()
+    yield Sample(
+        "partial_results_items",
+        "gauge",
+        "Análises canceladas com campos prontos guardados para reaproveitamento.",
+        {},
+        partial_stats["items"],
+    )
+    yield Sample(
+        "partial_results_hits_total",
+        "counter",
+        "Análises retomadas a partir de campos de uma análise cancelada.",
+        {},
+        partial_stats["hits"],
+    )
+    singleflight_stats = inflight_analyses.stats()
+    yield Sample(
+        "singleflight_in_flight",
+        "gauge",
+        "Análises em execução no single-flight.",
+        {},
+        singleflight_stats["in_flight"],
+    )
+    yield Sample(
+        "singleflight_calls_total",
+        "counter",
+        "Chamadas ao single-flight.",
+        {},
+        singleflight_stats["calls"],
+    )
+    yield Sample(
+        "singleflight_coalesced_total",
+        "counter",
+        "Requisições atendidas por uma execução já em andamento.",
+        {},
+        singleflight_stats["coalesced"],
+    )
+    logger_stats = api_logger.stats()
+    yield Sample(
+        "log_queue_size",
+        "gauge",
+        "Registros de log aguardando escrita.",
+        {},
+        logger_stats["queued"],
+    )
+    yield Sample(
+        "log_dropped_total",
+        "counter",
+        "Registros de log descartados com a fila cheia.",
+        {},
+        logger_stats["dropped"],
+    )
+    yield Sample(
+        "log_sampled_out_total",
+        "counter",
+        "Registros de log descartados pela amostragem.",
+        {},
+        logger_stats["sampled_out"],
+    )
+    yield Sample(
+        "log_labels_dropped_total",
+        "counter",
+        "Pares texto/rótulo descartados com a fila do log de rótulos cheia.",
+        {},
+        logger_stats["labels_dropped"],
+    )
+    if not text_analysis_service.built:
+        return
+    # O pool de conexões só existe depois que o serviço foi construído
+    from app.core.llm_client import get_http_clients
+
+    pool_stats = get_http_clients().pool_stats()
+    yield Sample(
+        "llm_http_requests_total",
+        "counter",
+        "Requisições HTTP enviadas ao provedor do LLM.",
+        {},
+        pool_stats["requests"],
+    )
+    yield Sample(
+        "llm_http_connections_opened_total",
+        "counter",
+        "Conexões novas abertas com o provedor do LLM.",
+        {},
+        pool_stats["connections_opened"],
+    )
+    yield Sample(
+        "llm_http_tls_handshakes_total",
+        "counter",
+        "Handshakes TLS com o provedor do LLM.",
+        {},
+        pool_stats["tls_handshakes"],
+    )
+    yield Sample(
+        "llm_http_tls_handshake_seconds_total",
+        "counter",
+        "Tempo gasto em handshakes TLS.",
+        {},
+        pool_stats["tls_seconds"],
+    )
+    for client in ("sync", "async"):
+        yield Sample(
+            "llm_http_pool_connections",
+            "gauge",
+            "Conexões no pool do cliente HTTP do LLM.",
+            {"client": client},
+            pool_stats[client]["open"],
+        )
+        yield Sample(
+            "llm_http_pool_idle_connections",
+            "gauge",
+            "Conexões ociosas (keep-alive) no pool do cliente HTTP do LLM.",
+            {"client": client},
+            pool_stats[client]["idle"],
+        )
+
+
+REGISTRY.register_collector(_collect_component_metrics)
+
+
+def _validate_text(text: str, mode: Optional[str] = None) -> str:
+    # Retorna o modo a usar: sem modo explícito, textos acima de
+    # MAX_TEXT_LENGTH vão para o modo "long", que aceita até LONG_MAX_TEXT_LENGTH,
+    # e os demais usam o ANALYSIS_MODE da configuração
+    if len(text) < settings.MIN_TEXT_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Text must be at least {settings.MIN_TEXT_LENGTH} characters long",
+        )
+    if mode is None and len(text) > settings.MAX_TEXT_LENGTH:
+        mode = LONG_MODE
+    max_length = (
+        settings.LONG_MAX_TEXT_LENGTH if mode == LONG_MODE else settings.MAX_TEXT_LENGTH
+    )
+    if len(text) > max_length:
+        raise HTTPException(
+            status_code=400, detail=f"Text must not exceed {max_length} characters"
+        )
+    return mode or settings.ANALYSIS_MODE
+
+
+def _build_response(result: dict) -> TextAnalysisResponse:
+    return TextAnalysisResponse(
+        classification=result["classification"],
+        entities=result["entities"],
+        summary=result["summary"],
+    )
+
+
+async def _analyze_resumable(
+    service, cache_key: str, api_key: str, text: str, mode: Optional[str]
+) -> dict:
+    # Executa dentro do single-flight: só é cancelada quando todos os
+    # interessados desistiram, e então guarda os campos que ficaram prontos
+    partial = dict(partial_results.get(cache_key) or {})
+    try:
+        result = await admission.run(
+            api_key,
+            lambda: service.aanalyze_text(text, mode=mode, partial=partial),
+            measure=mode != LONG_MODE,
+        )
+    except asyncio.CancelledError:
+        ANALYSIS_CANCELLATIONS.inc(completed_fields=str(len(partial)))
+        if partial:
+            partial_results.set(cache_key, partial)
+        raise
+    partial_results.delete(cache_key)
+    return result
+
+
+async def _wait_for_disconnect(raw_request: Request) -> None:
+    # O corpo já foi lido: a próxima mensagem do ASGI só chega quando o
+    # cliente fecha a conexão
+    while True:
+        message = await raw_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _cancel_on_disconnect(raw_request: Request, work: Awaitable[Any]) -> Any:
+    """Aguarda `work`, cancelando-o se o cliente desconectar antes do fim."""
+    work_task = asyncio.ensure_future(work)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(raw_request))
+    try:
+        done, _ = await asyncio.wait(
+            {work_task, disconnect}, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        disconnect.cancel()
+        if not work_task.done():
+            work_task.cancel()
+    if work_task not in done:
+        # 499 (convenção do nginx): ninguém vai ler a resposta, mas o status
+        # separa essas requisições nos logs e nas métricas
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    return work_task.result()
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _traced_analysis(
+    request: TextRequest, mode: Optional[str], profile: bool, api_key: str
+) -> Tuple[dict, str]:
+    # Execução instrumentada: ignora cache e single-flight para que o trace
+    # reflita uma análise real
+    from app.core.tracing import Tracer
+
+    service = await text_analysis_service.aget()
+    tracer = Tracer(profile_interval=settings.TRACE_PROFILE_INTERVAL_MS / 1000)
+    async with admission.slot(api_key, measure=mode != LONG_MODE):
+        with tracer.activate(name="analyze", profile=profile):
+            result = await service.aanalyze_text(request.text, mode=mode)
+    trace_file = f"analyze_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json"
+    await asyncio.to_thread(tracer.write, f"{settings.TRACE_DIR}/{trace_file}")
+    return result, trace_file
+
 
 @router.post("/analyze", response_model=TextAnalysisResponse)
 async def analyze_text(
     request: TextRequest,
-    api_key: str = Depends(get_api_key)
+    response: Response,
+    raw_request: Request,
+    trace: bool = False,
+    profile: bool = False,
+    api_key: str = Depends(get_api_key),
 ):
     try:
-        # Validação do tamanho do texto
-        if len(request.text) < settings.MIN_TEXT_LENGTH:
+        # Validação do tamanho do texto (e escolha do modo para textos longos)
+        mode = _validate_text(request.text, request.mode)
+
+        # Rate limiting
+        await rate_limiter.acheck_rate_limit(api_key)
+
+        # Com `trace` (ou por amostragem), grava um trace Chrome JSON por nó;
+        # `profile` adiciona as amostras do profiler de pilha
+        trace = trace or profile or random.random() < settings.TRACE_SAMPLE_RATE
+
+        # Verificar cache (a chave inclui o modo: "graph", "fused" e "long"
+        # podem responder de forma diferente para o mesmo texto)
+        cache = await response_cache.aget()
+        cache_key = cache.make_key(request.text, api_key=api_key, mode=mode)
+        cached_response = None if trace else await cache.aget(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+        # Processar requisição e medir tempo; se o cliente desconectar antes,
+        # as chamadas ao LLM que faltam são canceladas
+        start_time = time.time()
+        if trace:
+            result, trace_file = await _cancel_on_disconnect(
+                raw_request, _traced_analysis(request, mode, profile, api_key)
+            )
+            response.headers["X-Trace-File"] = trace_file
+        else:
+            # Só a execução real passa pelo controle de admissão: requisições
+            # coalescidas no single-flight não ocupam vaga
+            service = await text_analysis_service.aget()
+            result = await _cancel_on_disconnect(
+                raw_request,
+                inflight_analyses.do(
+                    cache_key,
+                    lambda: _analyze_resumable(
+                        service, cache_key, api_key, request.text, mode
+                    ),
+                ),
+            )
+        processing_time = time.time() - start_time
+
+        # Criar resposta
+        analysis_response = _build_response(result)
+
+        # Armazenar no cache (a remoção LRU respeita os limites configurados)
+        await cache.aset(cache_key, analysis_response)
+
+        # Logging
+        api_logger.log_request(
+            api_key=api_key,
+            request_length=len(request.text),
+            processing_time=processing_time,
+            response=result,
+        )
+
+        return analysis_response
+
+    except Exception as e:
+        api_logger.log_error(api_key, e)
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/analyze/stream")
+async def analyze_text_stream(
+    request: TextRequest,
+    stream_tokens: bool = False,
+    api_key: str = Depends(get_api_key),
+):
+    # Server-Sent Events: cada campo é enviado assim que seu nó termina
+    # (eventos "classification", "entities" e "summary"; com stream_tokens,
+    # também "summary_token"), seguido de "done" com a resposta completa.
+    # Sempre usa os nós do grafo, independentemente do modo de análise.
+    try:
+        _validate_text(request.text, GRAPH_MODE)
+        await rate_limiter.acheck_rate_limit(api_key)
+    except HTTPException as e:
+        api_logger.log_error(api_key, e)
+        raise e
+
+    cache = await response_cache.aget()
+    cache_key = cache.make_key(request.text, api_key=api_key, mode=GRAPH_MODE)
+    cached_response = await cache.aget(cache_key)
+    if cached_response is None:
+        # Com a fila de admissão cheia, o 503 sai antes de abrir o stream
+        try:
+            admission.check_capacity()
+        except HTTPException as e:
+            api_logger.log_error(api_key, e)
+            raise e
+
+    async def event_stream() -> AsyncIterator[str]:
+        if cached_response is not None:
+            for field, value in cached_response.model_dump().items():
+                yield _sse_event(field, value)
+            yield _sse_event("done", cached_response.model_dump())
+            return
+
+        start_time = time.time()
+        result = {"text": request.text}
+        try:
+            service = await text_analysis_service.aget()
+            async with admission.slot(api_key):
+                async for field, value in service.astream_fields(
+                    request.text, stream_summary_tokens=stream_tokens
+                ):
+                    if field != "summary_token":
+                        result[field] = value
+                    yield _sse_event(field, value)
+        except Exception as e:
+            api_logger.log_error(api_key, e)
+            yield _sse_event("error", {"detail": str(e)})
+            return
+        processing_time = time.time() - start_time
+
+        response = _build_response(result)
+        await cache.aset(cache_key, response)
+        api_logger.log_request(
+            api_key=api_key,
+            request_length=len(request.text),
+            processing_time=processing_time,
+            response=result,
+        )
+        yield _sse_event("done", response.model_dump())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/analyze/batch", response_model=BatchAnalysisResponse)
+async def analyze_batch(request: BatchTextRequest, api_key: str = Depends(get_api_key)):
+    try:
+        if not request.items:
+            raise HTTPException(
+                status_code=400, detail="Batch must contain at least one item"
+            )
+        if len(request.items) > settings.MAX_BATCH_ITEMS:
             raise HTTPException(
                 status_code=400,
-                detail=f"Text must be at least {settings.MIN_TEXT_LENGTH} characters long"
+                detail=f"Batch must not exceed {settings.MAX_BATCH_ITEMS} items",
             )
-        if len(request.text) > settings.MAX_TEXT_LENGTH:
+
+        start_time = time.time()
+        results = [BatchItemResult(index=index) for index in range(len(request.items))]
+
+        # Agrupa os itens válidos por chave de cache (texto e modo resolvido):
+        # textos repetidos no lote são analisados uma única vez
+        cache = await response_cache.aget()
+        indices_by_key: Dict[str, List[int]] = {}
+        modes_by_key: Dict[str, str] = {}
+        for index, item in enumerate(request.items):
+            try:
+                mode = _validate_text(item.text, item.mode)
+            except HTTPException as e:
+                results[index].error = e.detail
+                continue
+            cache_key = cache.make_key(item.text, api_key=api_key, mode=mode)
+            indices_by_key.setdefault(cache_key, []).append(index)
+            modes_by_key[cache_key] = mode
+
+        misses: List[Tuple[str, str, str]] = []
+        for cache_key, indices in indices_by_key.items():
+            cached_response = await cache.aget(cache_key)
+            if cached_response is None:
+                misses.append(
+                    (cache_key, request.items[indices[0]].text, modes_by_key[cache_key])
+                )
+                continue
+            for index in indices:
+                results[index].result = cached_response
+                results[index].cached = True
+
+        # O rate limit e a admissão cobram uma unidade por texto único fora do
+        # cache, de uma só vez: repetidos, já cacheados e inválidos não contam.
+        # Uma cobrança acima da capacidade do bucket nunca seria aceita, então
+        # é um erro do lote e não um 429
+        if len(misses) > rate_limiter.capacity:
             raise HTTPException(
                 status_code=400,
-                detail=f"Text must not exceed {settings.MAX_TEXT_LENGTH} characters"
+                detail=(
+                    f"Batch has {len(misses)} uncached unique texts; the rate limit "
+                    f"allows at most {rate_limiter.requests_per_minute} per request"
+                ),
             )
+        if misses:
+            await rate_limiter.acheck_rate_limit(api_key, cost=len(misses))
 
-        # Rate limiting
-        rate_limiter.check_rate_limit(api_key)
+        # Processa as faltas com concorrência limitada; com `pack`, textos curtos
+        # no modo "graph" (um prompt por nó, o que aanalyze_packed implementa)
+        # são agrupados em um único prompt por nó, e os demais seguem no seu modo
+        if misses:
+            admission.check_capacity()
+        service = await text_analysis_service.aget() if misses else None
+        semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+        singles = misses
+        packs: List[List[Tuple[str, str, str]]] = []
+        if request.pack:
+            packable = [
+                miss[2] == GRAPH_MODE and len(miss[1]) <= settings.BATCH_PACK_MAX_CHARS
+                for miss in misses
+            ]
+            short = [miss for miss, ok in zip(misses, packable) if ok]
+            singles = [miss for miss, ok in zip(misses, packable) if not ok]
+            for start in range(0, len(short), settings.BATCH_PACK_MAX_ITEMS):
+                pack = short[start : start + settings.BATCH_PACK_MAX_ITEMS]
+                if len(pack) == 1:
+                    singles.append(pack[0])
+                else:
+                    packs.append(pack)
 
-        # Verificar cache
-        cache_key = f"{api_key}:{request.text}"
-        if cache_key in response_cache:
-            return response_cache[cache_key]
+        async def analyze_single(cache_key: str, text: str, mode: str) -> dict:
+            async with semaphore:
+                return await inflight_analyses.do(
+                    cache_key,
+                    lambda: _analyze_resumable(service, cache_key, api_key, text, mode),
+                )
 
-        # Processar requisição e medir tempo
-        start_time = time.time()
-        result = text_analysis_service.analyze_text(request.text)
-        processing_time = time.time() - start_time
+        async def analyze_pack(pack: List[Tuple[str, str, str]]) -> list:
+            # Um pacote ocupa uma vaga, mas pesa na fila justa pelo número de
+            # textos, como os mesmos textos analisados um a um
+            async with semaphore, admission.slot(
+                api_key, cost=len(pack), measure=False
+            ):
+                return await service.aanalyze_packed([text for _, text, _ in pack])
 
-        # Criar resposta
-        response = TextAnalysisResponse(
-            classification=result["classification"],
-            entities=result["entities"],
-            summary=result["summary"]
+        single_outcomes, pack_outcomes = await asyncio.gather(
+            asyncio.gather(
+                *(
+                    analyze_single(cache_key, text, mode)
+                    for cache_key, text, mode in singles
+                ),
+                return_exceptions=True,
+            ),
+            asyncio.gather(
+                *(analyze_pack(pack) for pack in packs), return_exceptions=True
+            ),
         )
 
-        # Armazenar no cache
-        response_cache[cache_key] = response
-        
-        # Limpar cache se necessário
-        if len(response_cache) > settings.MAX_CACHE_ITEMS:
-            response_cache.clear()
+        outcomes = {
+            cache_key: outcome
+            for (cache_key, _, _), outcome in zip(singles, single_outcomes)
+        }
+        for pack, outcome in zip(packs, pack_outcomes):
+            if isinstance(outcome, Exception):
+                outcome = [outcome] * len(pack)
+            outcomes.update(
+                {
+                    cache_key: item_outcome
+                    for (cache_key, _, _), item_outcome in zip(pack, outcome)
+                }
+            )
 
-        # Logging
-        api_logger.log_request(
+        for cache_key, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                error = (
+                    outcome.detail
+                    if isinstance(outcome, HTTPException)
+                    else str(outcome)
+                )
+                for index in indices_by_key[cache_key]:
+                    results[index].error = error
+                continue
+            response = _build_response(outcome)
+            await cache.aset(cache_key, response)
+            for index in indices_by_key[cache_key]:
+                results[index].result = response
+        processing_time = time.time() - start_time
+
+        api_logger.log_batch_request(
             api_key=api_key,
-            request_data=request.dict(),
+            items=len(request.items),
+            unique_items=len(indices_by_key),
+            cached_items=len(indices_by_key) - len(misses),
+            packs=len(packs),
+            errors=sum(1 for item_result in results if item_result.error),
             processing_time=processing_time,
-            response=result
         )
 
-        return response
+        return BatchAnalysisResponse(results=results)
 
     except Exception as e:
         api_logger.log_error(api_key, e)
         if isinstance(e, HTTPException):
             raise e
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
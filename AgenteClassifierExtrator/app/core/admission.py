@@ -0,0 +1,266 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_REJECTIONS
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Pesos por API key no formato "chave:peso,chave:peso"."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, separator, weight = item.rpartition(":")
+        if not separator or not key:
+            raise ValueError(
+                f"Invalid admission weight '{item}'. Expected 'key:weight'"
+            )
+        weights[key.strip()] = float(weight)
+        if weights[key.strip()] <= 0:
+            raise ValueError(f"Admission weight for '{key.strip()}' must be positive")
+    return weights
+
+
+class _Waiter:
+    __slots__ = ("key", "future", "enqueued_at")
+
+    def __init__(self, key: str, future: asyncio.Future):
+        self.key = key
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    Controle de admissão na frente do LLM: no máximo `limit` análises
+    executando ao mesmo tempo, e as demais aguardam em uma fila limitada.
+
+    O limite segue AIMD a partir da latência observada: cada análise que
+    termina abaixo de `target_latency` soma `increase / limit` (cerca de +1
+    por janela de `limit` análises), e uma acima do alvo multiplica o limite
+    por `decrease`, no máximo uma vez por janela (só contam análises admitidas
+    depois da última redução).
+
+    A fila é justa entre API keys (weighted fair queuing, na variante
+    self-clocked): cada pedido recebe uma etiqueta de término
+    `max(V, última etiqueta da key) + custo / peso` e sai o de menor etiqueta,
+    então uma key com muitos pedidos não atrasa as demais. Com a fila cheia,
+    ou depois de `queue_timeout` na fila, a requisição recebe 503 com
+    Retry-After.
+
+    Todo o estado é do event loop; não há locks.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 16,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        target_latency: float = 10.0,
+        increase: float = 1.0,
+        decrease: float = 0.7,
+        max_queue: int = 100,
+        queue_timeout: float = 30.0,
+        weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+        enabled: bool = True,
+    ):
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= max_limit")
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self.enabled = enabled
+
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.increases = 0
+        self.decreases = 0
+        # Média móvel da latência, usada para estimar o Retry-After
+        self.latency_ewma = target_latency / 2
+        self._last_decrease = 0.0
+        self._heap: List[Tuple[float, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        # Tempo virtual (etiqueta do último pedido admitido) e última etiqueta por key
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+
+    @property
+    def capacity(self) -> int:
+        return max(int(self.limit), 1)
+
+    def retry_after(self) -> int:
+        # Tempo estimado para a fila atual escoar
+        return max(math.ceil((self.queued + 1) / self.capacity * self.latency_ewma), 1)
+
+    def _reject(self, reason: str) -> HTTPException:
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is overloaded. Please retry later.",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    def check_capacity(self) -> None:
+        """Rejeita na hora, sem enfileirar, se um novo pedido não caberia na fila."""
+        if (
+            self.enabled
+            and self.in_flight >= self.capacity
+            and self.queued >= self.max_queue
+        ):
+            raise self._reject("queue_full")
+
+    async def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Aguarda uma vaga e devolve o instante da admissão (para `release`)."""
+        if not self.enabled:
+            return time.perf_counter()
+        if self.in_flight < self.capacity and not self.queued:
+            return self._admit(waited=0.0)
+        self.check_capacity()
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(key, loop.create_future())
+        finish = max(
+            self._virtual_time, self._last_finish.get(key, 0.0)
+        ) + cost / self.weights.get(key, self.default_weight)
+        self._last_finish[key] = finish
+        heapq.heappush(self._heap, (finish, next(self._sequence), waiter))
+        self.queued += 1
+
+        timer = (
+            loop.call_later(self.queue_timeout, self._expire, waiter)
+            if self.queue_timeout > 0
+            else None
+        )
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # A vaga foi concedida no mesmo instante do cancelamento
+                self.release(time.perf_counter(), measure=False)
+            else:
+                self.queued -= 1
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        return waiter.future.result()
+
+    def _expire(self, waiter: _Waiter) -> None:
+        if waiter.future.done():
+            return
+        self.queued -= 1
+        ADMISSION_QUEUE_WAIT.observe(
+            time.perf_counter() - waiter.enqueued_at, outcome="timeout"
+        )
+        waiter.future.set_exception(self._reject("queue_timeout"))
+
+    def _admit(self, waited: float) -> float:
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_QUEUE_WAIT.observe(waited, outcome="admitted")
+        return time.perf_counter()
+
+    def _dispatch(self) -> None:
+        while self._heap and self.in_flight < self.capacity:
+            finish, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                # Cancelado ou expirado enquanto estava na fila
+                continue
+            self._virtual_time = finish
+            self.queued -= 1
+            waiter.future.set_result(
+                self._admit(waited=time.perf_counter() - waiter.enqueued_at)
+            )
+        if not self._heap:
+            # Fila vazia: as etiquetas antigas não importam mais
+            self._last_finish.clear()
+
+    def release(self, admitted_at: float, measure: bool = True) -> None:
+        """Libera a vaga; com `measure`, a duração alimenta o ajuste do limite."""
+        if not self.enabled:
+            return
+        self.in_flight -= 1
+        if measure:
+            self._observe(admitted_at, time.perf_counter() - admitted_at)
+        self._dispatch()
+
+    def _observe(self, admitted_at: float, latency: float) -> None:
+        self.latency_ewma += 0.2 * (latency - self.latency_ewma)
+        if latency > self.target_latency:
+            if admitted_at > self._last_decrease and self.limit > self.min_limit:
+                self.limit = max(self.limit * self.decrease, self.min_limit)
+                self._last_decrease = time.perf_counter()
+                self.decreases += 1
+        elif self.in_flight + 1 >= self.capacity and self.limit < self.max_limit:
+            # Só cresce quando o limite atual estava de fato em uso
+            self.limit = min(self.limit + self.increase / self.limit, self.max_limit)
+            self.increases += 1
+
+    @asynccontextmanager
+    async def slot(
+        self, key: str, cost: float = 1.0, measure: bool = True
+    ) -> AsyncIterator[None]:
+        admitted_at = await self.acquire(key, cost)
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            # Falhas e cancelamentos não dizem nada sobre a latência do provedor
+            self.release(admitted_at, measure=measure and completed)
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        cost: float = 1.0,
+        measure: bool = True,
+    ) -> Any:
+        async with self.slot(key, cost, measure=measure):
+            return await fn()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "latency_ewma": self.latency_ewma,
+        }
+
+
+def create_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+        min_limit=settings.ADMISSION_MIN_LIMIT,
+        max_limit=settings.ADMISSION_MAX_LIMIT,
+        target_latency=settings.ADMISSION_TARGET_LATENCY,
+        increase=settings.ADMISSION_INCREASE,
+        decrease=settings.ADMISSION_DECREASE,
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        weights=parse_weights(settings.ADMISSION_KEY_WEIGHTS),
+        enabled=settings.ADMISSION_ENABLED,
+    )
+
+
+admission = create_admission_controller()
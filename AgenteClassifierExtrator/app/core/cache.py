@@ -0,0 +1,384 @@
+import asyncio
+import hashlib
+import itertools
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+
+def estimate_size(value: Any) -> int:
+    # Tamanho aproximado em bytes da entrada serializada
+    if isinstance(value, BaseModel):
+        return len(value.model_dump_json().encode("utf-8"))
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+
+
+class ResponseCache:
+    """Cache LRU em memória com TTL por entrada e limite de memória em bytes."""
+
+    def __init__(
+        self,
+        ttl: int,
+        max_items: int,
+        max_bytes: int,
+        share_across_keys: bool = False,
+        sizeof: Callable[[Any], int] = estimate_size,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.share_across_keys = share_across_keys
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, text: str, api_key: Optional[str] = None, mode: Optional[str] = None) -> str:
+        # A chave é um hash do conteúdo: não guarda o texto completo em memória.
+        # O resultado depende do modo de análise, que entra no hash. Não
+        # depende de quem chamou, então com share_across_keys a mesma entrada
+        # atende a todas as API keys.
+        content = text if mode is None else f"{mode}\0{text}"
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if self.share_across_keys or api_key is None:
+            return digest
+        scope = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        return f"{scope}:{digest}"
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    async def aget(self, key: str) -> Optional[Any]:
+        # Mesma interface assíncrona do TieredCache; em memória não há espera
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.set(key, value, ttl=ttl)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        size = self._sizeof(value) + len(key)
+        if size > self.max_bytes:
+            # Entrada maior que o cache inteiro: não vale a pena armazenar, e
+            # o valor antigo da mesma chave não pode continuar sendo servido
+            self.delete(key)
+            return
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(value, size, expires_at)
+            self.current_bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "items": len(self._entries),
+            "bytes": self.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self) -> None:
+        # Só memória: nada a liberar (mesma interface do TieredCache)
+        pass
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+
+    def _evict(self) -> None:
+        # Remove as entradas menos usadas até respeitar os dois limites,
+        # descartando primeiro as que já expiraram
+        now = self._clock()
+        while self._entries and (
+            len(self._entries) > self.max_items or self.current_bytes > self.max_bytes
+        ):
+            key, entry = next(iter(self._entries.items()))
+            self._remove(key)
+            if entry.expires_at <= now:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+
+class CacheBackend(ABC):
+    """Armazenamento compartilhado (L2) de entradas serializadas do cache."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Retorna (valor, segundos restantes de TTL) ou None."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Backend em SQLite no modo WAL, compartilhado por todos os workers do host.
+
+    No WAL leitores não bloqueiam o escritor, e cada thread usa sua própria
+    conexão. Os prazos usam o relógio de parede para valer entre processos.
+    Com o arquivo travado por outro worker, cada operação espera no máximo
+    `busy_timeout` segundos antes de falhar com sqlite3.OperationalError.
+
+    O arquivo e a tabela só são criados no primeiro acesso (já nas threads do
+    L2), e não na construção: criar o backend não abre o SQLite.
+    """
+
+    # Limpeza de expirados e do excesso de itens a cada N escritas
+    PURGE_EVERY = 256
+
+    def __init__(
+        self,
+        path: str,
+        max_items: int,
+        busy_timeout: float = 0.25,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.max_items = max_items
+        self.busy_timeout = busy_timeout
+        self._clock = clock
+        self._local = threading.local()
+        # Conexões de todas as threads, para que close() feche todas
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._writes = itertools.count(1)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            # Fechada por close(), que pode rodar em outra thread
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            with self._lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS cache ("
+                        "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+                    )
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+                    )
+                    self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        remaining = expires_at - self._clock()
+        if remaining <= 0:
+            return None
+        return value, remaining
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, self._clock() + ttl)
+        )
+        # next() em itertools.count não perde incrementos entre threads (CPython)
+        if next(self._writes) % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge(self) -> None:
+        # Remove expirados e, se ainda passar do limite, os que expiram antes
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (self._clock(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_items,)
+        )
+
+    def close(self) -> None:
+        # Fecha as conexões de todas as threads, não só a da thread atual; um
+        # acesso depois disso abre uma conexão nova
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+
+class TieredCache:
+    """
+    Cache em dois níveis: o ResponseCache em memória (L1) na frente de um
+    CacheBackend compartilhado (L2). Acertos no L2 promovem a entrada ao L1.
+
+    Nas versões assíncronas (`aget`/`aset`, usadas pela API), o L2 roda em
+    threads próprias, fora do event loop: uma leitura que falha (arquivo
+    travado por outro worker) conta como falta, e a escrita no L2 é feita em
+    segundo plano (write-behind), descartada se já houver `max_pending_writes`
+    escritas na fila.
+    """
+
+    def __init__(
+        self,
+        l1: ResponseCache,
+        l2: CacheBackend,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+        l2_threads: int = 4,
+        max_pending_writes: int = 1000
+    ):
+        self.l1 = l1
+        self.l2 = l2
+        self._dumps = dumps
+        self._loads = loads
+        self.max_pending_writes = max_pending_writes
+        self._executor = ThreadPoolExecutor(max_workers=l2_threads, thread_name_prefix="cache-l2")
+        self._pending_writes: Set[asyncio.Future] = set()
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        self.l2_writes_dropped = 0
+
+    def make_key(self, text: str, api_key: Optional[str] = None, mode: Optional[str] = None) -> str:
+        return self.l1.make_key(text, api_key=api_key, mode=mode)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        return self._promote(key, self.l2.get(key))
+
+    def _promote(self, key: str, entry: Optional[Tuple[bytes, float]]) -> Optional[Any]:
+        if entry is None:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        data, remaining_ttl = entry
+        value = self._loads(data)
+        self.l1.set(key, value, ttl=max(1, int(remaining_ttl)))
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.l1.ttl if ttl is None else ttl
+        self.l1.set(key, value, ttl=ttl)
+        self.l2.set(key, self._dumps(value), ttl)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        loop = asyncio.get_running_loop()
+        try:
+            entry = await loop.run_in_executor(self._executor, self.l2.get, key)
+        except sqlite3.Error:
+            self.l2_errors += 1
+            entry = None
+        return self._promote(key, entry)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.l1.ttl if ttl is None else ttl
+        self.l1.set(key, value, ttl=ttl)
+        if len(self._pending_writes) >= self.max_pending_writes:
+            self.l2_writes_dropped += 1
+            return
+        write = asyncio.get_running_loop().run_in_executor(
+            self._executor, self.l2.set, key, self._dumps(value), ttl
+        )
+        self._pending_writes.add(write)
+        write.add_done_callback(self._write_done)
+
+    def _write_done(self, write: asyncio.Future) -> None:
+        self._pending_writes.discard(write)
+        if not write.cancelled() and write.exception() is not None:
+            self.l2_errors += 1
+
+    def delete(self, key: str) -> None:
+        self.l1.delete(key)
+        self.l2.delete(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.l1.stats(),
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_errors": self.l2_errors,
+            "l2_writes_dropped": self.l2_writes_dropped,
+        }
+
+    def close(self) -> None:
+        # Termina as escritas pendentes antes de fechar
+        self._executor.shutdown(wait=True)
+        self.l2.close()
@@ -1,7 +1,8 @@
 import os
 from typing import Optional
-from pydantic_settings import BaseSettings
+
 from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
 
 load_dotenv()
 
@@ -9,25 +10,176 @@ load_dotenv()
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Text Analysis API"
     PROJECT_VERSION: str = "1.0.0"
-    
+
     # API Keys
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
-    
+    API_KEY: str = os.getenv("API_KEY", "your-api-key-here")
+
     # Model Settings
     MODEL_NAME: str = os.getenv("MODEL_NAME", "deepseek-chat")
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0"))
-    
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "https://api.deepseek.com")
+
+    # LLM HTTP Client (pool de conexões persistentes compartilhado pelos modelos)
+    LLM_CONNECT_TIMEOUT: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_READ_TIMEOUT: float = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+    LLM_WRITE_TIMEOUT: float = float(os.getenv("LLM_WRITE_TIMEOUT", "10"))
+    LLM_POOL_TIMEOUT: float = float(os.getenv("LLM_POOL_TIMEOUT", "10"))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+    # HTTP/2 multiplexa as chamadas em poucas conexões (requer o pacote h2)
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "false").lower() == "true"
+    # Conexões abertas na inicialização da API, antes da primeira requisição
+    LLM_WARMUP_CONNECTIONS: int = int(os.getenv("LLM_WARMUP_CONNECTIONS", "4"))
+
+    # Startup
+    # Com "true", o worker só aceita conexões depois do aquecimento (serviço
+    # construído e conexões abertas); por padrão ele sobe na hora e /ready
+    # responde 503 até o fim do aquecimento
+    WARM_UP_BLOCKING: bool = os.getenv("WARM_UP_BLOCKING", "false").lower() == "true"
+    # Intervalo (s) entre as novas tentativas de um aquecimento que falhou;
+    # 0 desativa (o serviço ainda pode ser construído pela primeira requisição)
+    WARM_UP_RETRY_INTERVAL: float = float(os.getenv("WARM_UP_RETRY_INTERVAL", "10"))
+
+    # Workflow Settings
+    # "parallel" executa classificação, entidades e resumo ao mesmo tempo;
+    # "sequential" mantém a cadeia original (útil para testes A/B)
+    WORKFLOW_TOPOLOGY: str = os.getenv("WORKFLOW_TOPOLOGY", "parallel")
+    # "graph" usa um nó (e uma chamada ao LLM) por campo; "fused" obtém os três
+    # campos em uma única chamada. Pode ser sobrescrito por requisição.
+    ANALYSIS_MODE: str = os.getenv("ANALYSIS_MODE", "graph")
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
-    
+    # "memory" aplica o limite por worker; "sqlite" compartilha os buckets entre
+    # todos os workers do host
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH: str = os.getenv(
+        "RATE_LIMIT_SQLITE_PATH", "cache/rate_limit.sqlite3"
+    )
+    # Espera máxima (s) pelo arquivo travado por outro worker; depois disso a
+    # requisição é liberada (fail open) ou rejeitada com 429
+    RATE_LIMIT_SQLITE_BUSY_TIMEOUT: float = float(
+        os.getenv("RATE_LIMIT_SQLITE_BUSY_TIMEOUT", "0.05")
+    )
+    RATE_LIMIT_FAIL_OPEN: bool = (
+        os.getenv("RATE_LIMIT_FAIL_OPEN", "true").lower() == "true"
+    )
+
+    # Admission Control (análises simultâneas enviadas ao LLM, por worker)
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    # O limite começa em ADMISSION_INITIAL_LIMIT e se ajusta (AIMD) entre o
+    # mínimo e o máximo conforme a latência fica abaixo ou acima do alvo
+    ADMISSION_INITIAL_LIMIT: int = int(os.getenv("ADMISSION_INITIAL_LIMIT", "16"))
+    ADMISSION_MIN_LIMIT: int = int(os.getenv("ADMISSION_MIN_LIMIT", "2"))
+    ADMISSION_MAX_LIMIT: int = int(os.getenv("ADMISSION_MAX_LIMIT", "64"))
+    ADMISSION_TARGET_LATENCY: float = float(os.getenv("ADMISSION_TARGET_LATENCY", "10"))
+    ADMISSION_INCREASE: float = float(os.getenv("ADMISSION_INCREASE", "1"))
+    ADMISSION_DECREASE: float = float(os.getenv("ADMISSION_DECREASE", "0.7"))
+    # Pedidos aguardando vaga; acima disso (ou após o timeout) a resposta é 503
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+    # Pesos da fila justa por API key ("chave:peso,chave:peso"); as demais têm peso 1
+    ADMISSION_KEY_WEIGHTS: str = os.getenv("ADMISSION_KEY_WEIGHTS", "")
+
     # Cache Settings
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour in seconds
     MAX_CACHE_ITEMS: int = int(os.getenv("MAX_CACHE_ITEMS", "1000"))
-    
+    CACHE_MAX_BYTES: int = int(
+        os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+    )  # 64 MB
+    # O resultado da análise não depende de quem chamou: com "true" a mesma
+    # entrada do cache atende a todas as API keys
+    CACHE_SHARED_ACROSS_KEYS: bool = (
+        os.getenv("CACHE_SHARED_ACROSS_KEYS", "false").lower() == "true"
+    )
+    # Tempo (s) que os campos prontos de uma análise cancelada ficam guardados
+    PARTIAL_RESULT_TTL: int = int(os.getenv("PARTIAL_RESULT_TTL", "600"))
+    # "memory" mantém o cache só no processo; "sqlite" adiciona um segundo nível
+    # em disco compartilhado pelos workers do host e preservado entre reinícios
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_SQLITE_PATH: str = os.getenv(
+        "CACHE_SQLITE_PATH", "cache/analysis_cache.sqlite3"
+    )
+    CACHE_SQLITE_MAX_ITEMS: int = int(os.getenv("CACHE_SQLITE_MAX_ITEMS", "100000"))
+    # Espera máxima (s) pelo arquivo travado por outro worker; depois disso a
+    # leitura conta como falta e a escrita é descartada
+    CACHE_SQLITE_BUSY_TIMEOUT: float = float(
+        os.getenv("CACHE_SQLITE_BUSY_TIMEOUT", "0.25")
+    )
+
     # Validation
     MAX_TEXT_LENGTH: int = int(os.getenv("MAX_TEXT_LENGTH", "5000"))
     MIN_TEXT_LENGTH: int = int(os.getenv("MIN_TEXT_LENGTH", "10"))
-    
+
+    # Local Classifier (caminho rápido da classificação; vazio desativa)
+    LOCAL_CLASSIFIER_PATH: str = os.getenv("LOCAL_CLASSIFIER_PATH", "")
+    LOCAL_CLASSIFIER_THRESHOLD: float = float(
+        os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9")
+    )
+    # Fração das respostas do caminho rápido conferidas com o LLM em segundo plano
+    LOCAL_CLASSIFIER_SHADOW_RATE: float = float(
+        os.getenv("LOCAL_CLASSIFIER_SHADOW_RATE", "0.05")
+    )
+    # Grava o texto e a classificação do LLM (dados de treino do classificador
+    # local) em logs/labels_AAAAMMDD.log, com o texto cortado e mascarado
+    LOG_CLASSIFICATION_TEXTS: bool = (
+        os.getenv("LOG_CLASSIFICATION_TEXTS", "false").lower() == "true"
+    )
+    # O classificador local só usa os primeiros 2000 caracteres do texto
+    LOG_CLASSIFICATION_MAX_CHARS: int = int(
+        os.getenv("LOG_CLASSIFICATION_MAX_CHARS", "2000")
+    )
+
+    # Gazetteer (catálogo de entidades conhecidas; vazio desativa)
+    GAZETTEER_PATH: str = os.getenv("GAZETTEER_PATH", "")
+    # "merge" junta o catálogo às entidades do LLM; "gazetteer" dispensa o LLM
+    ENTITY_EXTRACTION_MODE: str = os.getenv("ENTITY_EXTRACTION_MODE", "merge")
+
+    # Long Documents (modo "long", map-reduce sobre trechos)
+    LONG_MAX_TEXT_LENGTH: int = int(os.getenv("LONG_MAX_TEXT_LENGTH", "1000000"))
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "4000"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    CHUNK_CONCURRENCY: int = int(os.getenv("CHUNK_CONCURRENCY", "8"))
+    CLASSIFICATION_SAMPLE_CHUNKS: int = int(
+        os.getenv("CLASSIFICATION_SAMPLE_CHUNKS", "3")
+    )
+
+    # Logging
+    LOG_DIR: str = os.getenv("LOG_DIR", "logs")
+    LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))  # 50 MB
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "10"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Com mais de LOG_SAMPLING_THRESHOLD registros na fila, só uma fração
+    # LOG_SAMPLE_RATE dos registros INFO é mantida
+    LOG_SAMPLING_THRESHOLD: int = int(os.getenv("LOG_SAMPLING_THRESHOLD", "1000"))
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+    # Batch Settings
+    MAX_BATCH_ITEMS: int = int(os.getenv("MAX_BATCH_ITEMS", "50"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    # Textos até este tamanho podem ser empacotados, até N por prompt
+    BATCH_PACK_MAX_CHARS: int = int(os.getenv("BATCH_PACK_MAX_CHARS", "1000"))
+    BATCH_PACK_MAX_ITEMS: int = int(os.getenv("BATCH_PACK_MAX_ITEMS", "8"))
+
+    # Metrics
+    # Diretório compartilhado pelos workers do uvicorn para agregar as métricas
+    # em /metrics; vazio exporta só as métricas do próprio processo
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+    # Tracing
+    # Traces Chrome JSON por requisição (parâmetro `trace` do /analyze ou uma
+    # fração TRACE_SAMPLE_RATE das requisições) gravados em TRACE_DIR
+    TRACE_DIR: str = os.getenv("TRACE_DIR", "traces")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    TRACE_PROFILE_INTERVAL_MS: float = float(
+        os.getenv("TRACE_PROFILE_INTERVAL_MS", "5")
+    )
+
     class Config:
         env_file = ".env"
 
@@ -38,4 +190,5 @@ class Settings(BaseSettings):
         if self.API_KEY == "your-api-key-here":
             raise ValueError("API_KEY must be set in environment variables")
 
-settings = Settings()
\ No newline at end of file
+
+settings = Settings()
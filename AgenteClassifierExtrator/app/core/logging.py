@@ -1,65 +1,322 @@
-import logging
+import atexit
 import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class JSONLineFormatter(logging.Formatter):
+    """Serializa cada registro como uma linha JSON (executado na thread de escrita)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        log_data = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.msg,
+        }
+        payload = getattr(record, "payload", None)
+        if payload:
+            log_data.update(payload)
+        return json.dumps(log_data, ensure_ascii=False)
+
+
+# Dados pessoais substituídos nos textos do log de rótulos, na ordem em que
+# são aplicados (documentos e números longos antes dos telefones). Telefone
+# só com DDD, para não mascarar intervalos de anos como "2022-2023"
+_REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\b\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}\b"), "<cnpj>"),
+    (re.compile(r"\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b"), "<cpf>"),
+    (re.compile(r"\b(?:\d[ -]?){12,18}\d\b"), "<numero>"),
+    (re.compile(r"(?:\+55\s?)?\(\d{2}\)\s?9?\d{4}[-\s]?\d{4}\b|(?:\+55\s?)?\b\d{2}\s9?\d{4}[-\s]?\d{4}\b"), "<telefone>"),
+]
+
+
+def redact_text(text: str, max_chars: int) -> str:
+    """Corta o texto em `max_chars` caracteres e mascara e-mails, CPF/CNPJ, telefones e números longos."""
+    text = text[:max_chars]
+    for pattern, placeholder in _REDACTIONS:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+class LabelFormatter(JSONLineFormatter):
+    """Linha JSON do log de rótulos, com o texto cortado e mascarado na thread de escrita."""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = getattr(record, "payload", None)
+        if payload and "text" in payload:
+            record.payload = {**payload, "text": redact_text(payload["text"], self.max_chars)}
+        return super().format(record)
+
+
+class DailyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Grava em logs/<prefixo>_AAAAMMDD.log e troca de arquivo quando a data muda,
+    além de rotacionar por tamanho dentro do mesmo dia (.1, .2, ...).
+    """
+
+    def __init__(self, log_dir: str, prefix: str, max_bytes: int, backup_count: int):
+        self.log_dir = Path(log_dir)
+        self.prefix = prefix
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.current_date = datetime.now().strftime("%Y%m%d")
+        super().__init__(
+            self._path_for(self.current_date),
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True
+        )
+
+    def _path_for(self, date: str) -> str:
+        return str(self.log_dir / f"{self.prefix}_{date}.log")
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if datetime.fromtimestamp(record.created).strftime("%Y%m%d") != self.current_date:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        date = datetime.now().strftime("%Y%m%d")
+        if date == self.current_date:
+            # Mesmo dia: rotação por tamanho
+            super().doRollover()
+            return
+        # Novo dia: passa a escrever no arquivo da nova data
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.current_date = date
+        self.baseFilename = self._path_for(date)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo: a serialização fica para a thread do
+    QueueListener. Com a fila cheia o registro é descartado (e contado) em vez
+    de bloquear a requisição.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoadSamplingFilter(logging.Filter):
+    """
+    Sob carga (fila acima de `threshold`), mantém só uma amostra dos registros
+    INFO; avisos e erros passam sempre.
+    """
+
+    def __init__(self, log_queue: queue.Queue, threshold: int, sample_rate: float):
+        super().__init__()
+        self.log_queue = log_queue
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.log_queue.qsize() < self.threshold:
+            return True
+        if random.random() < self.sample_rate:
+            return True
+        self.sampled_out += 1
+        return False
+
 
 class APILogger:
-    def __init__(self):
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 10,
+        queue_size: int = 10000,
+        sampling_threshold: int = 1000,
+        sample_rate: float = 0.1,
+        label_max_chars: int = 2000
+    ):
         self.logger = logging.getLogger("api_logger")
         self.logger.setLevel(logging.INFO)
-        
-        # Criar diretório de logs se não existir
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        
-        # Handler para arquivo
-        file_handler = logging.FileHandler(
-            f"logs/api_{datetime.now().strftime('%Y%m%d')}.log"
-        )
-        file_handler.setLevel(logging.INFO)
-        
-        # Handler para console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formato do log
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        self.logger.propagate = False
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        # O caminho da requisição só enfileira; formatação e escrita ficam
+        # na thread do listener
+        self.log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = NonBlockingQueueHandler(self.log_queue)
+        self.sampling_filter = LoadSamplingFilter(self.log_queue, sampling_threshold, sample_rate)
+        self.queue_handler.addFilter(self.sampling_filter)
+        self.logger.addHandler(self.queue_handler)
+
+        # Pares texto/rótulo: arquivo próprio (labels_AAAAMMDD.log), fora do
+        # console e da amostragem, para não perder dados de treino sob carga
+        # nem misturar o texto das requisições ao log geral
+        self.label_logger = logging.getLogger("api_logger.labels")
+        self.label_logger.setLevel(logging.INFO)
+        self.label_logger.propagate = False
+        self.label_max_chars = label_max_chars
+        self.label_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.label_queue_handler = NonBlockingQueueHandler(self.label_queue)
+        self.label_logger.addHandler(self.label_queue_handler)
+
+        # Diretório, arquivo e thread de escrita só são criados em start()
+        # (chamado na inicialização da API ou no primeiro registro)
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.label_listener: Optional[logging.handlers.QueueListener] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.listener is not None:
+                return
+            formatter = JSONLineFormatter()
+            file_handler = DailyRotatingFileHandler(self.log_dir, "api", self.max_bytes, self.backup_count)
+            file_handler.setLevel(logging.INFO)
+            file_handler.setFormatter(formatter)
+
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(formatter)
+
+            listener = logging.handlers.QueueListener(
+                self.log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            listener.start()
+
+            label_handler = DailyRotatingFileHandler(self.log_dir, "labels", self.max_bytes, self.backup_count)
+            label_handler.setFormatter(LabelFormatter(self.label_max_chars))
+            label_listener = logging.handlers.QueueListener(self.label_queue, label_handler)
+            label_listener.start()
+
+            atexit.register(self.stop)
+            self.label_listener = label_listener
+            self.listener = listener
+
+    def stop(self) -> None:
+        # Esvazia as filas e encerra as threads de escrita
+        for listener in (self.listener, self.label_listener):
+            if listener is not None and listener._thread is not None:
+                listener.stop()
+
+    def _log(self, level: int, event: str, payload: Dict[str, Any]) -> None:
+        if self.listener is None:
+            self.start()
+        self.logger.log(level, event, extra={"payload": payload})
 
     def log_request(
         self,
         api_key: str,
-        request_data: Dict[str, Any],
+        request_length: int,
         processing_time: float,
         response: Dict[str, Any]
     ) -> None:
-        log_data = {
-            "timestamp": datetime.now().isoformat(),
+        self._log(logging.INFO, "API Request", {
             "api_key": api_key[-8:],  # Últimos 8 caracteres da chave
-            "request_length": len(request_data.get("text", "")),
+            "request_length": request_length,
             "processing_time_ms": round(processing_time * 1000, 2),
             "response_type": {
                 "classification": response.get("classification"),
                 "entities_count": len(response.get("entities", [])),
                 "summary_length": len(response.get("summary", ""))
             }
-        }
-        self.logger.info(f"API Request: {json.dumps(log_data)}")
+        })
+
+    def log_batch_request(
+        self,
+        api_key: str,
+        items: int,
+        unique_items: int,
+        cached_items: int,
+        packs: int,
+        errors: int,
+        processing_time: float
+    ) -> None:
+        self._log(logging.INFO, "API Batch Request", {
+            "api_key": api_key[-8:],
+            "items": items,
+            "unique_items": unique_items,
+            "cached_items": cached_items,
+            "packs": packs,
+            "errors": errors,
+            "processing_time_ms": round(processing_time * 1000, 2)
+        })
+
+    def log_fused_analysis(self, stats: Dict[str, Any]) -> None:
+        self._log(logging.INFO, "Fused Analysis", stats)
+
+    def log_long_document_analysis(self, stats: Dict[str, Any]) -> None:
+        self._log(logging.INFO, "Long Document Analysis", stats)
+
+    def log_classification_label(self, text: str, classification: str) -> None:
+        # Par texto/rótulo do LLM, usado para treinar o classificador local.
+        # Vai só para o log de rótulos; o texto é cortado e mascarado na escrita
+        if self.listener is None:
+            self.start()
+        self.label_logger.info("Classification Label", extra={"payload": {
+            "text": text,
+            "classification": classification
+        }})
+
+    def log_llm_warm_up(self, requested: int, warmed: int, elapsed: float) -> None:
+        self._log(logging.INFO, "LLM Warm-up", {
+            "requested_connections": requested,
+            "warmed_connections": warmed,
+            "elapsed_ms": round(elapsed * 1000, 2)
+        })
+
+    def log_startup_error(self, error: Exception) -> None:
+        self._log(logging.ERROR, "Startup Error", {
+            "error_type": type(error).__name__,
+            "error_message": str(error)
+        })
 
     def log_error(self, api_key: str, error: Exception) -> None:
-        log_data = {
-            "timestamp": datetime.now().isoformat(),
+        self._log(logging.ERROR, "API Error", {
             "api_key": api_key[-8:],
             "error_type": type(error).__name__,
             "error_message": str(error)
+        })
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            "queued": self.queue_handler.queue.qsize(),
+            "dropped": self.queue_handler.dropped,
+            "sampled_out": self.sampling_filter.sampled_out,
+            "labels_dropped": self.label_queue_handler.dropped,
         }
-        self.logger.error(f"API Error: {json.dumps(log_data)}")
 
-api_logger = APILogger() 
\ No newline at end of file
+
+api_logger = APILogger(
+    log_dir=settings.LOG_DIR,
+    max_bytes=settings.LOG_MAX_BYTES,
+    backup_count=settings.LOG_BACKUP_COUNT,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    sampling_threshold=settings.LOG_SAMPLING_THRESHOLD,
+    sample_rate=settings.LOG_SAMPLE_RATE,
+    label_max_chars=settings.LOG_CLASSIFICATION_MAX_CHARS
+)
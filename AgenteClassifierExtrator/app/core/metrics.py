@@ -0,0 +1,450 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+class Sample(NamedTuple):
+    """Valor lido por um coletor no momento da exportação."""
+
+    name: str
+    kind: str  # "counter" ou "gauge"
+    documentation: str
+    labels: Dict[str, str]
+    value: float
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Um lock por métrica: sem disputa global entre métricas diferentes
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(labels), value] for labels, value in self._values.items()]
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": samples,
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        # Contagens por faixa (não acumuladas); a soma acumulada é feita na exportação
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            entry["buckets"][index] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [
+                [list(labels), {**value, "buckets": list(value["buckets"])}]
+                for labels, value in self._values.items()
+            ]
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "bounds": list(self.buckets),
+            "samples": samples,
+        }
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas do processo, exportado no formato texto do Prometheus.
+
+    Com `enable_multiprocess`, cada worker grava periodicamente um snapshot em
+    um diretório compartilhado e a exportação soma os snapshots de todos os
+    workers. Gauges de workers que não estão mais vivos são ignorados.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+        self.multiprocess_dir: Optional[Path] = None
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        # Coletores leem contadores que já existem em outros componentes
+        # (cache, single-flight, logger) só no momento da exportação
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        metrics = {
+            name: metric.snapshot() for name, metric in list(self._metrics.items())
+        }
+        for collector in self._collectors:
+            for sample in collector():
+                entry = metrics.setdefault(
+                    sample.name,
+                    {
+                        "type": sample.kind,
+                        "help": sample.documentation,
+                        "labelnames": sorted(sample.labels),
+                        "samples": [],
+                    },
+                )
+                entry["samples"].append(
+                    [
+                        [str(sample.labels[name]) for name in entry["labelnames"]],
+                        sample.value,
+                    ]
+                )
+        return {"pid": os.getpid(), "metrics": metrics}
+
+    # Agregação entre workers
+
+    def enable_multiprocess(self, directory: str, flush_interval: float = 5.0) -> None:
+        self.multiprocess_dir = Path(directory)
+        self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+        self.flush()
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop,
+                args=(flush_interval,),
+                name="metrics-flush",
+                daemon=True,
+            )
+            self._flush_thread.start()
+
+    def _flush_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        if self.multiprocess_dir is None:
+            return
+        path = self.multiprocess_dir / f"worker_{os.getpid()}.json"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def _snapshots(self) -> List[Dict[str, Any]]:
+        own = self.snapshot()
+        if self.multiprocess_dir is None:
+            return [own]
+        self.flush()
+        snapshots = [own]
+        for path in self.multiprocess_dir.glob("worker_*.json"):
+            if path.stem == f"worker_{own['pid']}":
+                continue
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(snapshot.get("pid", -1)):
+                # Contadores de workers encerrados continuam valendo; gauges não
+                snapshot["metrics"] = {
+                    name: metric
+                    for name, metric in snapshot["metrics"].items()
+                    if metric["type"] != "gauge"
+                }
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for snapshot in self._snapshots():
+            for name, metric in snapshot["metrics"].items():
+                target = merged.setdefault(name, {**metric, "values": {}})
+                for labels, value in metric["samples"]:
+                    key = tuple(labels)
+                    if metric["type"] == "histogram":
+                        current = target["values"].get(key)
+                        if current is None or len(current["buckets"]) != len(
+                            value["buckets"]
+                        ):
+                            target["values"][key] = {
+                                **value,
+                                "buckets": list(value["buckets"]),
+                            }
+                            continue
+                        current["buckets"] = [
+                            a + b for a, b in zip(current["buckets"], value["buckets"])
+                        ]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                    else:
+                        target["values"][key] = target["values"].get(key, 0.0) + value
+
+        lines: List[str] = []
+        for name in sorted(merged):
+            metric = merged[name]
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric["labelnames"]
+            for labels, value in sorted(metric["values"].items()):
+                if metric["type"] != "histogram":
+                    lines.append(
+                        f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}"
+                    )
+                    continue
+                cumulative = 0
+                for bound, count in zip(
+                    list(metric["bounds"]) + ["+Inf"], value["buckets"]
+                ):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _format_value(bound)
+                    bucket_labels = _format_labels(labelnames + ["le"], labels + (le,))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(
+                    f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(value['sum'])}"
+                )
+                lines.append(
+                    f"{name}_count{_format_labels(labelnames, labels)} {value['count']}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = (
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por endpoint (até o fim do corpo da resposta).",
+    ["endpoint", "method", "status"],
+)
+RESPONSE_START_LATENCY = REGISTRY.histogram(
+    "http_response_start_seconds",
+    "Latência das requisições HTTP por endpoint até o início da resposta (status e cabeçalhos).",
+    ["endpoint", "method", "status"],
+)
+NODE_LATENCY = REGISTRY.histogram(
+    "analysis_node_duration_seconds",
+    "Latência de cada nó do workflow de análise.",
+    ["node"],
+)
+NODE_CANCELLATIONS = REGISTRY.counter(
+    "analysis_node_cancelled_total",
+    "Execuções de nós do workflow canceladas antes de terminar (chamadas ao LLM poupadas).",
+    ["node"],
+)
+ANALYSIS_CANCELLATIONS = REGISTRY.counter(
+    "analysis_cancelled_total",
+    "Análises canceladas porque o cliente desconectou, por campos já prontos no cancelamento.",
+    ["completed_fields"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens consumidos nas chamadas ao LLM.", ["node", "kind"]
+)
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    "rate_limit_rejections_total", "Requisições rejeitadas pelo rate limiter."
+)
+RATE_LIMIT_STORE_ERRORS = REGISTRY.counter(
+    "rate_limit_store_errors_total",
+    "Verificações do rate limiter decididas por RATE_LIMIT_FAIL_OPEN porque o armazenamento falhou (SQLite travado).",
+)
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "admission_queue_wait_seconds",
+    "Tempo na fila do controle de admissão até a vaga para o LLM (ou até expirar).",
+    ["outcome"],
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "admission_rejections_total",
+    "Requisições rejeitadas com 503 pelo controle de admissão.",
+    ["reason"],
+)
+LOCAL_CLASSIFIER_PREDICTIONS = REGISTRY.counter(
+    "local_classifier_predictions_total",
+    "Predições do classificador local: respondidas no caminho rápido ou repassadas ao LLM.",
+    ["outcome"],
+)
+LOCAL_CLASSIFIER_AGREEMENT = REGISTRY.counter(
+    "local_classifier_agreement_total",
+    "Comparações entre o classificador local e o LLM (caminho rápido amostrado ou predições repassadas).",
+    ["path", "result"],
+)
+
+# Nó do workflow em execução, usado para atribuir o uso de tokens
+current_node: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_node", default=""
+)
+
+
+@contextmanager
+def track_node(node: str) -> Iterator[None]:
+    """Mede a latência de um trecho atribuído a um nó do workflow."""
+    token = current_node.set(node)
+    start = time.perf_counter()
+    cancelled = False
+    try:
+        yield
+    except asyncio.CancelledError:
+        # Trabalho interrompido (ex.: cliente desconectado) não entra na latência
+        cancelled = True
+        NODE_CANCELLATIONS.inc(node=node)
+        raise
+    finally:
+        if not cancelled:
+            NODE_LATENCY.observe(time.perf_counter() - start, node=node)
+        current_node.reset(token)
+
+
+def observe_node(node: str) -> Callable:
+    """Decorador equivalente a `track_node` para funções síncronas ou assíncronas."""
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with track_node(node):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with track_node(node):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,30 +1,256 @@
-from fastapi import HTTPException, status
-from datetime import datetime, timedelta
-from typing import Dict, Tuple
+import asyncio
+import hashlib
+import math
+import sqlite3
+import threading
 import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_REJECTIONS, RATE_LIMIT_STORE_ERRORS
+
+# O bucket reabastece a capacidade inteira em um minuto: uma chave ociosa por
+# esse tempo está com o bucket cheio, e descartá-la não muda o resultado
+IDLE_TIMEOUT = 60.0
+
+
+class RateLimitStore(ABC):
+    """Estado dos token buckets por chave."""
+
+    # Consumo com E/S (disco, travas entre processos): roda fora do event loop
+    blocking = False
+
+    @abstractmethod
+    def consume(
+        self, key: str, cost: int, capacity: float, refill_rate: float
+    ) -> Tuple[bool, float]:
+        """Tenta consumir `cost` tokens; retorna (permitido, segundos até caber)."""
+
+
+def _refill(
+    tokens: float, updated_at: float, now: float, capacity: float, refill_rate: float
+) -> float:
+    return min(capacity, tokens + (now - updated_at) * refill_rate)
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    Buckets no próprio processo, em ordem de último uso: chaves ociosas há mais
+    de `idle_timeout` (tempo suficiente para o bucket encher de novo) são
+    descartadas a partir do início da fila, sem varrer o dicionário.
+    """
+
+    def __init__(
+        self, idle_timeout: float, clock: Callable[[], float] = time.monotonic
+    ):
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(
+        self, key: str, cost: int, capacity: float, refill_rate: float
+    ) -> Tuple[bool, float]:
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+            else:
+                bucket[0] = _refill(bucket[0], bucket[1], now, capacity, refill_rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+
+            allowed = bucket[0] >= cost
+            if allowed:
+                bucket[0] -= cost
+            retry_after = 0.0 if allowed else (cost - bucket[0]) / refill_rate
+
+            self._evict_idle(now)
+            return allowed, retry_after
+
+    def _evict_idle(self, now: float) -> None:
+        while self._buckets:
+            key, (_, updated_at) = next(iter(self._buckets.items()))
+            if now - updated_at <= self.idle_timeout:
+                break
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Buckets em um arquivo SQLite (modo WAL) compartilhado por todos os workers
+    do host, para que o limite valha para o processo inteiro e não por worker.
+    Cada consumo é uma transação BEGIN IMMEDIATE de uma linha; com o arquivo
+    travado por outro worker, espera no máximo `busy_timeout` segundos antes de
+    falhar com sqlite3.OperationalError.
+    """
+
+    blocking = True
+
+    # Remoção das chaves ociosas a cada N consumos
+    PURGE_EVERY = 1024
+
+    def __init__(
+        self,
+        path: str,
+        idle_timeout: float,
+        busy_timeout: float = 0.05,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.busy_timeout = busy_timeout
+        # Relógio de parede: precisa ser o mesmo para todos os processos
+        self._clock = clock
+        self._local = threading.local()
+        self._calls = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def consume(
+        self, key: str, cost: int, capacity: float, refill_rate: float
+    ) -> Tuple[bool, float]:
+        # A chave da API não é gravada em disco, só o seu hash
+        key = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = self._clock()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = (
+                capacity
+                if row is None
+                else _refill(row[0], row[1], now, capacity, refill_rate)
+            )
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            self._calls += 1
+            if self._calls % self.PURGE_EVERY == 0:
+                conn.execute(
+                    "DELETE FROM buckets WHERE updated_at < ?",
+                    (now - self.idle_timeout,),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        retry_after = 0.0 if allowed else (cost - tokens) / refill_rate
+        return allowed, retry_after
+
 
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 60):
+    """
+    Token bucket por API key: até `requests_per_minute` requisições em rajada,
+    reabastecido continuamente à mesma taxa. Cada verificação é O(1).
+
+    Se o armazenamento falhar (SQLite travado além do `busy_timeout`), a
+    requisição é liberada com `fail_open` ou rejeitada com Retry-After de 1 s.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        store: Optional[RateLimitStore] = None,
+        fail_open: bool = True,
+    ):
         self.requests_per_minute = requests_per_minute
-        self.requests: Dict[str, list] = {}
+        self.capacity = float(requests_per_minute)
+        self.refill_rate = requests_per_minute / 60.0
+        self.store = (
+            store if store is not None else InMemoryRateLimitStore(IDLE_TIMEOUT)
+        )
+        self.fail_open = fail_open
+        self.rejections = 0
+        self.store_errors = 0
+        # Só criado para armazenamentos com E/S, usados fora do event loop
+        self._executor = (
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="rate-limit")
+            if self.store.blocking
+            else None
+        )
 
-    def check_rate_limit(self, api_key: str) -> None:
-        current_time = datetime.now()
-        if api_key not in self.requests:
-            self.requests[api_key] = []
+    def _consume(self, api_key: str, cost: int) -> Tuple[bool, float]:
+        try:
+            return self.store.consume(api_key, cost, self.capacity, self.refill_rate)
+        except sqlite3.Error:
+            self.store_errors += 1
+            RATE_LIMIT_STORE_ERRORS.inc()
+            return self.fail_open, 0.0 if self.fail_open else 1.0
 
-        # Remove requests older than 1 minute
-        self.requests[api_key] = [
-            req_time for req_time in self.requests[api_key]
-            if current_time - req_time < timedelta(minutes=1)
-        ]
+    def check_rate_limit(self, api_key: str, cost: int = 1) -> None:
+        # Um lote consome `cost` unidades de uma vez: ou cabe inteiro, ou é rejeitado
+        self._enforce(*self._consume(api_key, cost))
 
-        if len(self.requests[api_key]) >= self.requests_per_minute:
+    async def acheck_rate_limit(self, api_key: str, cost: int = 1) -> None:
+        """Versão para os handlers assíncronos: o SQLite roda fora do event loop."""
+        if self._executor is None:
+            allowed, retry_after = self._consume(api_key, cost)
+        else:
+            allowed, retry_after = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._consume, api_key, cost
+            )
+        self._enforce(allowed, retry_after)
+
+    def _enforce(self, allowed: bool, retry_after: float) -> None:
+        if not allowed:
+            self.rejections += 1
+            RATE_LIMIT_REJECTIONS.inc()
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please try again in a minute."
+                detail="Rate limit exceeded. Please try again in a minute.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
             )
 
-        self.requests[api_key].append(current_time)
+    def stats(self) -> Dict[str, int]:
+        return {"rejections": self.rejections, "store_errors": self.store_errors}
+
+
+def create_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        store = SQLiteRateLimitStore(
+            settings.RATE_LIMIT_SQLITE_PATH,
+            idle_timeout=IDLE_TIMEOUT,
+            busy_timeout=settings.RATE_LIMIT_SQLITE_BUSY_TIMEOUT,
+        )
+        return RateLimiter(
+            settings.RATE_LIMIT_PER_MINUTE,
+            store=store,
+            fail_open=settings.RATE_LIMIT_FAIL_OPEN,
+        )
+    if settings.RATE_LIMIT_BACKEND != "memory":
+        raise ValueError(f"Invalid RATE_LIMIT_BACKEND '{settings.RATE_LIMIT_BACKEND}'")
+    return RateLimiter(settings.RATE_LIMIT_PER_MINUTE)
+
 
-rate_limiter = RateLimiter() 
\ No newline at end of file
+rate_limiter = create_rate_limiter()
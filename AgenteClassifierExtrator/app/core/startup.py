@@ -0,0 +1,231 @@
+"""
+Inicialização da API: componentes construídos sob demanda, estado de
+prontidão (exposto em /ready) e relatório do custo de importação por módulo.
+
+Relatório de partida (importação da API e aquecimento, por pacote):
+    python -m app.core.startup --top 15
+    python -m app.core.startup --budget-ms 1500 --ready-budget-ms 4000
+
+Só usa a biblioteca padrão: é importado antes de todo o resto em app.main.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyResource(Generic[T]):
+    """
+    Componente construído uma única vez, no aquecimento da API ou na primeira
+    requisição que precisar dele, o que vier antes. Falhas não ficam
+    memorizadas: a próxima chamada tenta de novo.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+        self._on_built: List[Callable[[], None]] = []
+
+    def on_built(self, callback: Callable[[], None]) -> None:
+        """Registra uma função chamada quando a construção termina com sucesso."""
+        self._on_built.append(callback)
+
+    @property
+    def built(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+                    for callback in self._on_built:
+                        callback()
+        return self._value
+
+    async def aget(self) -> T:
+        if self._value is not None:
+            return self._value
+        # A construção (imports pesados, compilação do grafo, leitura de
+        # modelos) roda fora do event loop
+        return await asyncio.to_thread(self.get)
+
+    def set(self, value: T) -> None:
+        """Substitui o componente (testes e benchmarks)."""
+        self._value = value
+
+
+class StartupState:
+    """Fases da inicialização, com duração e resultado, e o estado de prontidão."""
+
+    STARTING = "starting"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        # Instante em que a importação da API começou (este módulo é o primeiro)
+        self.started_at = time.perf_counter()
+        self.import_seconds: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+        self.status = self.STARTING
+        self.phases: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.status == self.READY
+
+    def mark_imported(self) -> None:
+        self.import_seconds = time.perf_counter() - self.started_at
+
+    def mark_ready(self) -> None:
+        if self.ready:
+            return
+        self.ready_seconds = time.perf_counter() - self.started_at
+        self.status = self.READY
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Dict[str, Any]]:
+        # O bloco pode acrescentar detalhes ao dicionário da fase
+        entry: Dict[str, Any] = {"status": "running"}
+        self.phases[name] = entry
+        start_time = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = f"{type(e).__name__}: {e}"
+            if not self.ready:
+                self.status = self.FAILED
+            raise
+        else:
+            entry["status"] = "done"
+        finally:
+            entry["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+
+    def report(self) -> Dict[str, Any]:
+        def milliseconds(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 2)
+
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "import_ms": milliseconds(self.import_seconds),
+            "time_to_ready_ms": milliseconds(self.ready_seconds),
+            "uptime_s": round(time.perf_counter() - self.started_at, 3),
+            "phases": self.phases,
+        }
+
+
+STARTUP = StartupState()
+
+
+# --- Relatório de custo de importação ---------------------------------------
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+_PHASE_MARKER = "--- app.main imported ---"
+
+# Importa a API e constrói o serviço, como o aquecimento faz, separando as
+# duas fases no stderr
+_PROFILE_SCRIPT = f"""
+import sys, time, json
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+sys.stderr.write({_PHASE_MARKER!r} + "\\n")
+from app.api.endpoints import text_analysis_service
+text_analysis_service.get()
+ready = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "warm_up_ms": (ready - imported) * 1000}}))
+"""
+
+
+def _aggregate(lines: List[str]) -> Tuple[float, Dict[str, float], List[Tuple[str, float]]]:
+    # Soma o tempo próprio de cada módulo no pacote de nível superior; devolve
+    # também os módulos de nível superior da fase com o tempo acumulado
+    total = 0.0
+    packages: Dict[str, float] = {}
+    roots: List[Tuple[str, float]] = []
+    for line in lines:
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        own, cumulative, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        total += own / 1000
+        package = name.split(".")[0]
+        if package == "app":
+            # Os módulos da própria API aparecem individualmente
+            package = ".".join(name.split(".")[:3])
+        packages[package] = packages.get(package, 0.0) + own / 1000
+        if len(indent) == 1:
+            roots.append((name, cumulative / 1000))
+    return total, packages, roots
+
+
+def profile_startup(env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Executa a partida em um processo novo com `-X importtime` e agrega o custo por pacote."""
+    process_env = {**os.environ, **(env or {})}
+    # A configuração exige as chaves; os valores não importam para a medição
+    process_env.setdefault("OPENAI_API_KEY", "startup-report")
+    process_env.setdefault("API_KEY", "startup-report")
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROFILE_SCRIPT],
+        cwd=project_root, env=process_env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-4000:])
+    stderr = completed.stderr.splitlines()
+    marker = stderr.index(_PHASE_MARKER)
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    report = {"import_ms": round(timings["import_ms"], 1), "warm_up_ms": round(timings["warm_up_ms"], 1), "phases": {}}
+    for phase, lines in (("import", stderr[:marker]), ("warm_up", stderr[marker + 1:])):
+        total, packages, roots = _aggregate(lines)
+        report["phases"][phase] = {
+            "modules_ms": round(total, 1),
+            "packages_ms": {name: round(value, 1) for name, value in sorted(packages.items(), key=lambda item: -item[1])},
+            "top_level_ms": {name: round(value, 1) for name, value in sorted(roots, key=lambda item: -item[1])},
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Relatório do custo de partida da API")
+    parser.add_argument("--top", type=int, default=15, help="Pacotes mostrados por fase")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Limite para importar app.main")
+    parser.add_argument("--ready-budget-ms", type=float, default=None, help="Limite para importar e aquecer")
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório completo em JSON")
+    args = parser.parse_args()
+
+    report = profile_startup()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import app.main: {report['import_ms']:.1f} ms   warm-up: {report['warm_up_ms']:.1f} ms")
+        for phase, data in report["phases"].items():
+            print(f"\n[{phase}] {data['modules_ms']:.1f} ms in module bodies (-X importtime)")
+            for name, value in list(data["packages_ms"].items())[:args.top]:
+                print(f"  {value:>9.1f} ms  {name}")
+
+    over_budget = []
+    if args.budget_ms is not None and report["import_ms"] > args.budget_ms:
+        over_budget.append(f"import {report['import_ms']:.0f} ms > {args.budget_ms:.0f} ms")
+    ready_ms = report["import_ms"] + report["warm_up_ms"]
+    if args.ready_budget_ms is not None and ready_ms > args.ready_budget_ms:
+        over_budget.append(f"ready {ready_ms:.0f} ms > {args.ready_budget_ms:.0f} ms")
+    if over_budget:
+        print("\nover budget: " + "; ".join(over_budget), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
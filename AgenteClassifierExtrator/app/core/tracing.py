@@ -0,0 +1,418 @@
+import contextvars
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.tracers.context import register_configure_hook
+from langgraph.graph import StateGraph
+
+
+class Span:
+    """Trecho medido de uma execução, com o tempo e os tokens gastos no LLM."""
+
+    def __init__(self, name: str, category: str, lane: int, start: float, parent: Optional["Span"] = None):
+        self.name = name
+        self.category = category
+        self.lane = lane
+        self.start = start
+        self.parent = parent
+        self.end: Optional[float] = None
+        # Um filho por vez ocupa a mesma linha do pai no visualizador
+        self.lane_claimed = False
+        # Intervalos das chamadas de LLM contidas no span (podem se sobrepor
+        # quando os nós rodam em paralelo)
+        self.llm_intervals: List[Tuple[float, float]] = []
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.args: Dict[str, Any] = {}
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def llm_time(self) -> float:
+        # Tempo de parede com ao menos uma chamada de LLM em andamento
+        total = 0.0
+        current_start = current_end = None
+        for start, end in sorted(self.llm_intervals):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    total += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            total += current_end - current_start
+        return total
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "wall_time_ms": round(self.duration * 1000, 3),
+            "llm_time_ms": round(self.llm_time * 1000, 3),
+            # Tempo fora do LLM: montagem do prompt, parsing e overhead do grafo
+            "overhead_ms": round((self.duration - self.llm_time) * 1000, 3),
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            **self.args,
+        }
+
+
+# Tracer e span ativos no contexto atual (propagados para tasks e threads
+# filhas junto com o contexto)
+current_tracer: contextvars.ContextVar[Optional["Tracer"]] = contextvars.ContextVar(
+    "current_tracer", default=None
+)
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+# Callback do tracer ativo: o langchain o adiciona a toda chamada de LLM feita
+# no contexto, mesmo quando o nó não repassa o config para o modelo
+_tracer_callback: contextvars.ContextVar[Optional[BaseCallbackHandler]] = contextvars.ContextVar(
+    "tracer_callback", default=None
+)
+register_configure_hook(_tracer_callback, inheritable=True)
+
+
+class SamplingProfiler:
+    """Amostra periodicamente a pilha de uma thread (por padrão, a que o inicia)."""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: List[Tuple[float, Tuple[str, ...]]] = []
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        self._thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples.append((time.perf_counter(), tuple(reversed(stack))))
+
+
+class TracerCallback(BaseCallbackHandler):
+    """Registra cada chamada de LLM como um span e a atribui aos spans que a contêm."""
+
+    run_inline = True
+
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self._llm_spans: Dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID, name: str) -> None:
+        self._llm_spans[run_id] = self.tracer.start_span(name, category="llm")
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs.get("name") or "llm")
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs.get("name") or "chat_model")
+
+    def _end(self, run_id: UUID, response: Optional[LLMResult]) -> None:
+        span = self._llm_spans.pop(run_id, None)
+        if span is None:
+            return
+        usage = ((response.llm_output if response else None) or {}).get("token_usage") or {}
+        span.llm_calls = 1
+        span.prompt_tokens = usage.get("prompt_tokens") or 0
+        span.completion_tokens = usage.get("completion_tokens") or 0
+        self.tracer.finish_span(span)
+        interval = (span.start, span.end)
+        span.llm_intervals.append(interval)
+        parent = span.parent
+        while parent is not None:
+            parent.llm_intervals.append(interval)
+            parent.llm_calls += 1
+            parent.prompt_tokens += span.prompt_tokens
+            parent.completion_tokens += span.completion_tokens
+            parent = parent.parent
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, response)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, None)
+
+
+class Tracer:
+    """
+    Coleta spans de uma execução e os exporta no formato Chrome trace JSON
+    (abrir em chrome://tracing ou https://ui.perfetto.dev).
+
+    Uso:
+        tracer = Tracer()
+        with tracer.activate(profile=True):
+            result = workflow.invoke(state)
+        tracer.write("traces/analise.json")
+
+    Só os grafos instrumentados com `instrument_graph` geram spans por nó; as
+    chamadas de LLM feitas dentro do contexto ativo são sempre registradas.
+    """
+
+    def __init__(self, profile_interval: float = 0.005):
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self.profile_interval = profile_interval
+        self.profiler: Optional[SamplingProfiler] = None
+        self._lanes = 0
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, category: str = "node") -> Span:
+        # Spans são exibidos como "threads" no visualizador: o filho herda a
+        # linha do pai, e irmãos simultâneos (nós paralelos) ganham linhas novas
+        parent = current_span.get()
+        with self._lock:
+            if parent is not None and not parent.lane_claimed:
+                parent.lane_claimed = True
+                lane = parent.lane
+            else:
+                self._lanes += 1
+                lane = self._lanes
+        return Span(name, category, lane, time.perf_counter(), parent=parent)
+
+    def finish_span(self, span: Span) -> None:
+        span.end = time.perf_counter()
+        with self._lock:
+            if span.parent is not None and span.parent.lane == span.lane:
+                span.parent.lane_claimed = False
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, category: str = "node", **args: Any) -> Iterator[Span]:
+        span = self.start_span(name, category)
+        span.args.update(args)
+        token = current_span.set(span)
+        try:
+            yield span
+        finally:
+            current_span.reset(token)
+            self.finish_span(span)
+
+    @contextmanager
+    def activate(self, name: str = "request", profile: bool = False) -> Iterator["Tracer"]:
+        tracer_token = current_tracer.set(self)
+        callback_token = _tracer_callback.set(TracerCallback(self))
+        if profile:
+            self.profiler = SamplingProfiler(self.profile_interval)
+            self.profiler.start()
+        try:
+            with self.span(name, category="request"):
+                yield self
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
+            _tracer_callback.reset(callback_token)
+            current_tracer.reset(tracer_token)
+
+    def node_summaries(self) -> Dict[str, Dict[str, Any]]:
+        return {span.name: span.summary() for span in self.spans if span.category == "node"}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        def micros(instant: float) -> float:
+            return round((instant - self.origin) * 1_000_000, 3)
+
+        events: List[Dict[str, Any]] = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": micros(span.start),
+                "dur": round(span.duration * 1_000_000, 3),
+                "pid": 1,
+                "tid": span.lane,
+                "args": span.summary(),
+            }
+            for span in sorted(self.spans, key=lambda span: span.start)
+        ]
+        trace: Dict[str, Any] = {"traceEvents": events, "displayTimeUnit": "ms"}
+
+        if self.profiler is not None and self.profiler.samples:
+            # Amostras do profiler no formato stackFrames/samples do Chrome trace
+            frame_ids: Dict[Tuple[str, ...], int] = {}
+            stack_frames: Dict[str, Dict[str, Any]] = {}
+            samples = []
+            for instant, stack in self.profiler.samples:
+                parent = None
+                for depth in range(1, len(stack) + 1):
+                    prefix = stack[:depth]
+                    if prefix not in frame_ids:
+                        frame_ids[prefix] = len(frame_ids) + 1
+                        frame = {"name": prefix[-1], "category": "python"}
+                        if parent is not None:
+                            frame["parent"] = str(parent)
+                        stack_frames[str(frame_ids[prefix])] = frame
+                    parent = frame_ids[prefix]
+                if parent is not None:
+                    samples.append({
+                        "cpu": 0,
+                        "tid": 0,
+                        "ts": micros(instant),
+                        "name": "sample",
+                        "sf": str(parent),
+                        "weight": 1,
+                    })
+            trace["stackFrames"] = stack_frames
+            trace["samples"] = samples
+        return trace
+
+    def write(self, path: str) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace(), ensure_ascii=False))
+        return path
+
+
+class TracedNode(Runnable):
+    """
+    Envolve um nó do grafo e, quando há um tracer ativo, registra um span com o
+    tempo total, o tempo no LLM e os tokens do nó. Sem tracer ativo, apenas
+    delega para o nó original.
+    """
+
+    def __init__(self, name: str, node: Runnable):
+        self.name = name
+        self.node = node
+
+    def __repr__(self) -> str:
+        return f"TracedNode({self.name})"
+
+    @property
+    def InputType(self) -> Any:
+        return self.node.InputType
+
+    @property
+    def OutputType(self) -> Any:
+        return self.node.OutputType
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        tracer = current_tracer.get()
+        if tracer is None:
+            return self.node.invoke(input, config, **kwargs)
+        with tracer.span(self.name):
+            return self.node.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        tracer = current_tracer.get()
+        if tracer is None:
+            return await self.node.ainvoke(input, config, **kwargs)
+        with tracer.span(self.name):
+            return await self.node.ainvoke(input, config, **kwargs)
+
+
+class NamedLambda(RunnableLambda):
+    """
+    RunnableLambda identificado pelo nome, sem ler o código-fonte da função.
+
+    A cada execução o langchain serializa o runnable para os callbacks
+    (dumpd), mesmo sem nenhum callback registrado. Para um RunnableLambda
+    isso significa inspect.getsource + ast.parse no __repr__ (a fonte do
+    lambda), em `deps` (variáveis não locais) e nos schemas de entrada e
+    saída, de novo a cada requisição e para cada nó.
+    """
+
+    def __repr__(self) -> str:
+        # functools.partial (usado pelo langgraph) não tem __name__: usa o da função
+        func = getattr(self, "func", None) or getattr(self, "afunc", None)
+        name = self.name or getattr(getattr(func, "func", func), "__name__", "...")
+        return f"{type(self).__name__}({name})"
+
+    @property
+    def deps(self) -> List[Runnable]:
+        # Os nós do grafo não chamam outros runnables por closure
+        return []
+
+    # Tipos e schemas vêm de inspect.signature/getsource sobre a função, que
+    # não muda: calculados uma vez por nó
+    def _cached(self, key: str, compute: Callable[[], Any]) -> Any:
+        if key not in self.__dict__:
+            self.__dict__[key] = compute()
+        return self.__dict__[key]
+
+    @property
+    def InputType(self) -> Any:
+        return self._cached("_input_type", lambda: super(NamedLambda, self).InputType)
+
+    @property
+    def OutputType(self) -> Any:
+        return self._cached("_output_type", lambda: super(NamedLambda, self).OutputType)
+
+    def get_input_schema(self, config: Optional[RunnableConfig] = None) -> Any:
+        return self._cached("_input_schema", lambda: super(NamedLambda, self).get_input_schema(config))
+
+    def get_output_schema(self, config: Optional[RunnableConfig] = None) -> Any:
+        return self._cached("_output_schema", lambda: super(NamedLambda, self).get_output_schema(config))
+
+
+_NAMED_LAMBDA_CLASSES: Dict[type, type] = {}
+
+
+def name_lambdas(runnable: Runnable) -> Runnable:
+    """
+    Troca a classe dos RunnableLambda criados pelo próprio langgraph
+    na compilação (leitura e escrita dos canais, coerção do estado) por uma
+    subclasse de `NamedLambda`. Chamar sobre o grafo já compilado.
+    """
+    seen = set()
+    pending: List[Any] = [runnable]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, (list, tuple)):
+            pending.extend(current)
+        elif isinstance(current, dict):
+            pending.extend(current.values())
+        elif isinstance(current, Runnable):
+            if isinstance(current, RunnableLambda) and not isinstance(current, NamedLambda):
+                cls = type(current)
+                if cls not in _NAMED_LAMBDA_CLASSES:
+                    # Mesmo nome e mesmo layout da classe original, só com os
+                    # métodos de NamedLambda na frente
+                    _NAMED_LAMBDA_CLASSES[cls] = type(
+                        cls.__name__, (NamedLambda, cls), {"__module__": cls.__module__}
+                    )
+                current.__class__ = _NAMED_LAMBDA_CLASSES[cls]
+            pending.extend(vars(current).values())
+    return runnable
+
+
+def instrument_graph(graph: StateGraph) -> StateGraph:
+    """
+    Envolve todos os nós já registrados com `add_node` em um `TracedNode`.
+    Deve ser chamado antes de `compile()`; serve para qualquer StateGraph.
+    """
+    for name, node in list(graph.nodes.items()):
+        if not isinstance(node, TracedNode):
+            graph.nodes[name] = TracedNode(name, node)
+    return graph
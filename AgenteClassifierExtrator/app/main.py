@@ -1,11 +1,95 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+# Primeiro import: marca o início da partida para o relatório de /ready
+from app.core.startup import STARTUP  # isort: skip
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import router
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.api.endpoints import response_cache, router, text_analysis_service
 from app.core.config import settings
+from app.core.logging import api_logger
+from app.core.metrics import REGISTRY, REQUEST_LATENCY, RESPONSE_START_LATENCY, Sample
+
+# O serviço construído por uma requisição (depois de um aquecimento que
+# falhou) também deixa a API pronta
+text_analysis_service.on_built(STARTUP.mark_ready)
+
+
+async def warm_up(attempt: int = 1) -> bool:
+    # Constrói o serviço (imports pesados e compilação do grafo) fora do event
+    # loop e abre as conexões com o provedor do LLM antes das requisições, para
+    # que o handshake TCP+TLS não caia no tempo de resposta
+    try:
+        with STARTUP.phase("response_cache"):
+            await response_cache.aget()
+        with STARTUP.phase("text_analysis_service") as phase:
+            phase["attempt"] = attempt
+            await text_analysis_service.aget()
+        with STARTUP.phase("llm_connections") as phase:
+            from app.core.llm_client import get_http_clients
+
+            start_time = time.perf_counter()
+            warmed = await get_http_clients().awarm_up(
+                settings.LLM_BASE_URL,
+                settings.OPENAI_API_KEY,
+                settings.LLM_WARMUP_CONNECTIONS,
+            )
+            phase["warmed"] = warmed
+            api_logger.log_llm_warm_up(
+                settings.LLM_WARMUP_CONNECTIONS,
+                warmed,
+                time.perf_counter() - start_time,
+            )
+    except Exception as e:
+        # A API continua no ar: /ready informa a falha e as requisições tentam
+        # construir o serviço de novo
+        api_logger.log_startup_error(e)
+        return False
+    STARTUP.mark_ready()
+    return True
+
+
+async def retry_warm_up(attempt: int = 1) -> None:
+    # Novas tentativas em segundo plano, até o aquecimento (ou uma requisição)
+    # construir o serviço
+    while settings.WARM_UP_RETRY_INTERVAL > 0 and not STARTUP.ready:
+        await asyncio.sleep(settings.WARM_UP_RETRY_INTERVAL)
+        attempt += 1
+        if await warm_up(attempt):
+            return
+
+
+async def warm_up_in_background() -> None:
+    if not await warm_up():
+        await retry_warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    api_logger.start()
+    if settings.WARM_UP_BLOCKING:
+        warm_up_task = None if await warm_up() else asyncio.create_task(retry_warm_up())
+    else:
+        # O worker já aceita conexões; /ready responde 503 até o fim do aquecimento
+        warm_up_task = asyncio.create_task(warm_up_in_background())
+    yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    if response_cache.built:
+        # Com o segundo nível em SQLite, termina as escritas pendentes
+        await asyncio.to_thread(response_cache.get().close)
+    if text_analysis_service.built:
+        from app.core.llm_client import close_http_clients
+
+        await close_http_clients()
+
 
 app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.PROJECT_VERSION
+    title=settings.PROJECT_NAME, version=settings.PROJECT_VERSION, lifespan=lifespan
 )
 
 # Configurar CORS
@@ -17,5 +101,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas agregadas entre os workers do uvicorn
+if settings.METRICS_DIR:
+    REGISTRY.enable_multiprocess(settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL)
+
+
+class RequestLatencyMiddleware:
+    """
+    Middleware ASGI puro: mede a latência até o início da resposta (status e
+    cabeçalhos) e até o último pedaço do corpo, observando o `send`. Não
+    envolve a resposta como o BaseHTTPMiddleware, então não bufferiza o SSE
+    nem esconde do endpoint a desconexão do cliente.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status = "500"
+        finished = False
+
+        def observe(histogram) -> None:
+            # Usa o template da rota (e não o caminho) para manter a
+            # cardinalidade baixa; o roteador o grava no scope compartilhado
+            route = scope.get("route")
+            histogram.observe(
+                time.perf_counter() - start_time,
+                endpoint=route.path if route is not None else "unmatched",
+                method=scope["method"],
+                status=status,
+            )
+
+        async def send_and_observe(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                observe(RESPONSE_START_LATENCY)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                finished = True
+                observe(REQUEST_LATENCY)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        finally:
+            # Exceção ou cliente desconectado antes do fim do corpo
+            if not finished:
+                observe(REQUEST_LATENCY)
+
+
+app.add_middleware(RequestLatencyMiddleware)
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    # Prontidão para o balanceador: 200 só depois do aquecimento
+    return JSONResponse(STARTUP.report(), status_code=200 if STARTUP.ready else 503)
+
+
+def _collect_startup_metrics():
+    yield Sample(
+        "startup_ready",
+        "gauge",
+        "1 quando o aquecimento da API terminou.",
+        {},
+        1.0 if STARTUP.ready else 0.0,
+    )
+    for name, phase in list(STARTUP.phases.items()):
+        if "elapsed_ms" in phase:
+            yield Sample(
+                "startup_phase_seconds",
+                "gauge",
+                "Duração de cada fase da inicialização.",
+                {"phase": name},
+                phase["elapsed_ms"] / 1000,
+            )
+
+
+REGISTRY.register_collector(_collect_startup_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 # Incluir rotas
-app.include_router(router, prefix="/api/v1") 
\ No newline at end of file
+app.include_router(router, prefix="/api/v1")
+
+STARTUP.mark_imported()
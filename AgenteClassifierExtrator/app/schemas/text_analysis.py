@@ -1,10 +1,29 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
 class TextRequest(BaseModel):
     text: str
+    # "graph" executa um nó por campo; "fused" pede os três campos em uma única
+    # chamada ao LLM; "long" divide o texto em trechos (map-reduce) e aceita
+    # até LONG_MAX_TEXT_LENGTH caracteres. Quando omitido, vale o ANALYSIS_MODE
+    # da configuração, ou "long" para textos acima de MAX_TEXT_LENGTH.
+    mode: Optional[Literal["graph", "fused", "long"]] = None
 
 class TextAnalysisResponse(BaseModel):
     classification: str
     entities: List[str]
-    summary: str 
\ No newline at end of file
+    summary: str
+
+class BatchTextRequest(BaseModel):
+    items: List[TextRequest]
+    # Empacota vários textos curtos em um único prompt por nó
+    pack: bool = False
+
+class BatchItemResult(BaseModel):
+    index: int
+    result: Optional[TextAnalysisResponse] = None
+    error: Optional[str] = None
+    cached: bool = False
+
+class BatchAnalysisResponse(BaseModel):
+    results: List[BatchItemResult]
@@ -0,0 +1,187 @@
+import re
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Remove as marcas combinantes que sobram depois da decomposição NFD
+# (acentos, til, cedilha), mantendo os demais caracteres. O plano básico
+# multilíngue cobre todas as marcas usadas em português.
+_COMBINING_MARKS = {
+    codepoint: None
+    for codepoint in range(0x10000)
+    if unicodedata.combining(chr(codepoint))
+}
+
+
+def normalize(text: str) -> str:
+    """Forma usada no casamento: sem acentos e sem diferença de maiúsculas."""
+    return unicodedata.normalize("NFD", text).translate(_COMBINING_MARKS).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+class Gazetteer:
+    """
+    Índice de entidades conhecidas: um autômato Aho-Corasick sobre tokens
+    (palavras normalizadas), que encontra todas as entradas do catálogo em uma
+    única passada linear pelo texto. Trabalhar com palavras em vez de
+    caracteres garante que só palavras inteiras casem ("Rio" não casa dentro
+    de "Riozinho") e mantém o autômato pequeno mesmo com milhões de entradas.
+
+    As transições ficam em um único dicionário indexado por
+    `(estado << 32) | token` e os demais dados por estado em arrays compactos,
+    evitando um objeto por nó.
+    """
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.names: List[str] = []
+        self._transitions: Dict[int, int] = {}
+        self._parent = array("i", [0])
+        self._token = array("i", [0])
+        self._depth = array("i", [0])
+        self._output = array("i", [-1])  # entrada que termina no estado (ou -1)
+        self._fail = array("i", [0])
+        self._dictionary_link = array("i", [0])  # próximo estado terminal via falhas
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str, aliases: Iterable[str] = ()) -> None:
+        """Adiciona uma entrada; os apelidos casam e devolvem o nome canônico."""
+        if self._built:
+            raise RuntimeError("Gazetteer already built")
+        index = len(self.names)
+        self.names.append(name)
+        for form in (name, *aliases):
+            tokens = tokenize(form)
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                token_id = self.vocabulary.setdefault(token, len(self.vocabulary))
+                key = (state << 32) | token_id
+                child = self._transitions.get(key)
+                if child is None:
+                    child = len(self._depth)
+                    self._transitions[key] = child
+                    self._parent.append(state)
+                    self._token.append(token_id)
+                    self._depth.append(self._depth[state] + 1)
+                    self._output.append(-1)
+                state = child
+            if self._output[state] == -1:
+                self._output[state] = index
+
+    def build(self) -> "Gazetteer":
+        """Calcula os links de falha; deve ser chamado depois de todos os add()."""
+        transitions, parents, tokens = self._transitions, self._parent, self._token
+        state_count = len(self._depth)
+        fail = self._fail = array("i", bytes(4 * state_count))
+        dictionary_link = self._dictionary_link = array("i", bytes(4 * state_count))
+        output = self._output
+
+        # Falhas processadas em ordem de profundidade: a do pai já está pronta
+        for child in sorted(range(1, state_count), key=self._depth.__getitem__):
+            parent = parents[child]
+            if parent == 0:
+                continue
+            token_id = tokens[child]
+            state = fail[parent]
+            while True:
+                target = transitions.get((state << 32) | token_id)
+                if target is not None:
+                    fail[child] = target
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            target = fail[child]
+            dictionary_link[child] = target if output[target] != -1 else dictionary_link[target]
+
+        # Pai e token de cada estado só servem para a construção
+        self._parent = self._token = array("i")
+        self._built = True
+        return self
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Retorna (token inicial, token final, nome canônico) das ocorrências,
+        preferindo a mais à esquerda e, entre elas, a mais longa, sem sobreposição.
+        """
+        if not self._built:
+            raise RuntimeError("Gazetteer must be built before searching")
+        transitions, fail, output = self._transitions, self._fail, self._output
+        dictionary_link, depth, vocabulary = self._dictionary_link, self._depth, self.vocabulary
+
+        matches = []
+        state = 0
+        for position, token in enumerate(tokenize(text)):
+            token_id = vocabulary.get(token)
+            if token_id is None:
+                # Palavra fora do catálogo: nenhuma entrada pode continuar
+                state = 0
+                continue
+            while True:
+                target = transitions.get((state << 32) | token_id)
+                if target is not None:
+                    state = target
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            match_state = state if output[state] != -1 else dictionary_link[state]
+            while match_state:
+                matches.append((position - depth[match_state] + 1, position + 1, output[match_state]))
+                match_state = dictionary_link[match_state]
+
+        selected = []
+        last_end = 0
+        for start, end, index in sorted(matches, key=lambda match: (match[0], -match[1])):
+            if start >= last_end:
+                selected.append((start, end, self.names[index]))
+                last_end = end
+        return selected
+
+    def entities(self, text: str) -> List[str]:
+        """Nomes canônicos encontrados no texto, sem repetição, na ordem em que aparecem."""
+        seen: Dict[str, None] = {}
+        for _, _, name in self.find(text):
+            seen.setdefault(name, None)
+        return list(seen)
+
+    def canonical(self, name: str) -> Optional[str]:
+        """Nome canônico quando `name` inteiro é uma entrada (ou apelido) do catálogo."""
+        state = 0
+        for token in tokenize(name):
+            token_id = self.vocabulary.get(token)
+            state = self._transitions.get((state << 32) | token_id) if token_id is not None else None
+            if state is None:
+                return None
+        return self.names[self._output[state]] if state and self._output[state] != -1 else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        """
+        Uma entrada por linha: o nome canônico seguido, opcionalmente, de
+        apelidos separados por tabulação. Linhas vazias e iniciadas por # são
+        ignoradas.
+        """
+        gazetteer = cls()
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                line = line.rstrip("\n")
+                if not line.strip() or line.startswith("#"):
+                    continue
+                name, *aliases = [field.strip() for field in line.split("\t")]
+                gazetteer.add(name, [alias for alias in aliases if alias])
+        return gazetteer.build()
+
+
+def load_gazetteer(path: Optional[str]) -> Optional[Gazetteer]:
+    return Gazetteer.from_file(path) if path else None
@@ -0,0 +1,262 @@
+"""
+Classificador local (n-gramas com hashing + regressão logística em NumPy)
+treinado com as classificações já feitas pelo LLM.
+
+Treino e avaliação:
+    python -m app.services.local_classifier train --data "logs/labels_*.log" --output models/classifier.npz
+    python -m app.services.local_classifier evaluate --model models/classifier.npz --data dataset.jsonl --thresholds 0.8 0.9
+
+Os dados são linhas JSON com "text" e "label" (ou "classification", como nos
+eventos "Classification Label" do log de rótulos, gravados com
+LOG_CLASSIFICATION_TEXTS=true).
+"""
+import argparse
+import glob
+import json
+import random
+import re
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LABELS = ("Notícias", "Blog", "Pesquisa", "Outro")
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _strip_accents(text: str) -> str:
+    # Decomposição NFKD + descarte do que não é ASCII: remove os acentos
+    # bem mais rápido do que filtrar caractere a caractere
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+_CANONICAL_LABELS = {_strip_accents(label).casefold(): label for label in LABELS}
+
+
+def normalize_label(raw: str) -> Optional[str]:
+    # O LLM às vezes responde "Categoria: Notícias." ou com outra caixa
+    words = _WORD_PATTERN.findall(_strip_accents(raw).casefold())
+    for word in words:
+        if word in _CANONICAL_LABELS:
+            return _CANONICAL_LABELS[word]
+    return None
+
+
+class HashedNGramClassifier:
+    """
+    Regressão logística multinomial sobre unigramas e bigramas de palavras
+    projetados por hashing em `n_features` dimensões. Só os primeiros
+    `max_chars` caracteres do texto são usados, o que mantém a predição abaixo
+    de um milissegundo independentemente do tamanho do texto.
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[str] = LABELS,
+        n_features: int = 2 ** 18,
+        max_chars: int = 2000,
+        weights: Optional[np.ndarray] = None,
+        bias: Optional[np.ndarray] = None
+    ):
+        self.labels = tuple(labels)
+        self.n_features = n_features
+        self.max_chars = max_chars
+        self.weights = weights if weights is not None else np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(self.labels), dtype=np.float32)
+        # Memoriza o hash dos tokens já vistos: o vocabulário se repete muito
+        self._hash_cache: Dict[str, int] = {}
+
+    def _hash(self, token: str) -> int:
+        index = self._hash_cache.get(token)
+        if index is None:
+            index = zlib.crc32(token.encode("utf-8")) % self.n_features
+            if len(self._hash_cache) < 1_000_000:
+                self._hash_cache[token] = index
+        return index
+
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Vetor esparso (índices, valores) com tf sublinear e norma L2 unitária
+        words = _WORD_PATTERN.findall(_strip_accents(text[:self.max_chars]).lower())
+        tokens = words + [first + " " + second for first, second in zip(words, words[1:])]
+        if not tokens:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        hashes = np.fromiter(map(self._hash, tokens), dtype=np.int64, count=len(tokens))
+        indices, counts = np.unique(hashes, return_counts=True)
+        values = (1.0 + np.log(counts)).astype(np.float32)
+        values /= np.linalg.norm(values)
+        return indices, values
+
+    def _probabilities(self, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        scores = values @ self.weights[indices] + self.bias
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Retorna o rótulo mais provável e a sua probabilidade."""
+        probabilities = self._probabilities(*self.features(text))
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        epochs: int = 10,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        seed: int = 0
+    ) -> "HashedNGramClassifier":
+        # SGD por amostra com atualização esparsa: só as linhas dos n-gramas
+        # presentes no texto são tocadas
+        label_index = {label: index for index, label in enumerate(self.labels)}
+        samples = [
+            (self.features(text), label_index[label])
+            for text, label in zip(texts, labels)
+        ]
+        order = list(range(len(samples)))
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + epoch)
+            for position in order:
+                (indices, values), target = samples[position]
+                if not len(indices):
+                    continue
+                gradient = self._probabilities(indices, values)
+                gradient[target] -= 1.0
+                self.weights[indices] -= rate * (
+                    np.outer(values, gradient) + l2 * self.weights[indices]
+                )
+                self.bias -= rate * gradient
+        return self
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.array(self.labels),
+            n_features=self.n_features,
+            max_chars=self.max_chars
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNGramClassifier":
+        data = np.load(path)
+        return cls(
+            labels=[str(label) for label in data["labels"]],
+            n_features=int(data["n_features"]),
+            max_chars=int(data["max_chars"]),
+            weights=data["weights"],
+            bias=data["bias"]
+        )
+
+
+def load_dataset(patterns: Iterable[str]) -> Tuple[List[str], List[str]]:
+    # Lê arquivos JSONL (ou logs da API); linhas sem texto ou com rótulo fora
+    # das quatro categorias são ignoradas. Textos repetidos ficam uma vez só.
+    dataset: Dict[str, str] = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(record, dict):
+                        continue
+                    text = record.get("text")
+                    label = normalize_label(str(record.get("label") or record.get("classification") or ""))
+                    if text and label:
+                        dataset[text] = label
+    return list(dataset.keys()), list(dataset.values())
+
+
+def evaluate(
+    classifier: HashedNGramClassifier,
+    texts: Sequence[str],
+    labels: Sequence[str],
+    threshold: float
+) -> Dict[str, float]:
+    hits = agreements = total_agreements = 0
+    start = time.perf_counter()
+    predictions = [classifier.predict(text) for text in texts]
+    elapsed = time.perf_counter() - start
+    for (predicted, confidence), label in zip(predictions, labels):
+        total_agreements += predicted == label
+        if confidence >= threshold:
+            hits += 1
+            agreements += predicted == label
+    count = max(len(texts), 1)
+    return {
+        "samples": len(texts),
+        "threshold": threshold,
+        # Fração que o caminho rápido responderia sem chamar o LLM
+        "fast_path_hit_rate": hits / count,
+        # Concordância com o LLM nas respostas do caminho rápido
+        "fast_path_agreement": agreements / hits if hits else 0.0,
+        "overall_agreement": total_agreements / count,
+        "predict_us": elapsed / count * 1_000_000,
+    }
+
+
+def _split(texts: List[str], labels: List[str], holdout: float, seed: int):
+    order = list(range(len(texts)))
+    random.Random(seed).shuffle(order)
+    cut = int(len(order) * (1 - holdout))
+    train, test = order[:cut], order[cut:]
+    return (
+        [texts[i] for i in train], [labels[i] for i in train],
+        [texts[i] for i in test], [labels[i] for i in test],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Treino e avaliação do classificador local")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train")
+    train_parser.add_argument("--data", nargs="+", required=True, help="Arquivos JSONL ou padrões glob")
+    train_parser.add_argument("--output", default="models/classifier.npz")
+    train_parser.add_argument("--features", type=int, default=2 ** 18)
+    train_parser.add_argument("--epochs", type=int, default=10)
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="Fração reservada para avaliação")
+    train_parser.add_argument("--threshold", type=float, default=0.9)
+    train_parser.add_argument("--seed", type=int, default=0)
+
+    evaluate_parser = subparsers.add_parser("evaluate")
+    evaluate_parser.add_argument("--model", required=True)
+    evaluate_parser.add_argument("--data", nargs="+", required=True)
+    evaluate_parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9, 0.95])
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        texts, labels = load_dataset(args.data)
+        if not texts:
+            raise SystemExit("No labeled samples found")
+        train_texts, train_labels, test_texts, test_labels = _split(texts, labels, args.holdout, args.seed)
+        classifier = HashedNGramClassifier(n_features=args.features)
+        start = time.perf_counter()
+        classifier.fit(train_texts, train_labels, epochs=args.epochs, seed=args.seed)
+        print(f"trained on {len(train_texts)} samples in {time.perf_counter() - start:.1f}s")
+        if test_texts:
+            print(json.dumps(evaluate(classifier, test_texts, test_labels, args.threshold), indent=2))
+        classifier.save(args.output)
+        print(f"model saved to {args.output}")
+        return
+
+    classifier = HashedNGramClassifier.load(args.model)
+    texts, labels = load_dataset(args.data)
+    for threshold in args.thresholds:
+        print(json.dumps(evaluate(classifier, texts, labels, threshold)))
+
+
+if __name__ == "__main__":
+    main()
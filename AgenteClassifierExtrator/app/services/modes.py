@@ -0,0 +1,22 @@
+"""
+Constantes de configuração do serviço de análise, em um módulo leve: quem só
+precisa dos nomes (validação na API, benchmarks) não importa langchain.
+"""
+
+# Topologias suportadas pelo workflow
+SEQUENTIAL_TOPOLOGY = "sequential"
+PARALLEL_TOPOLOGY = "parallel"
+WORKFLOW_TOPOLOGIES = (SEQUENTIAL_TOPOLOGY, PARALLEL_TOPOLOGY)
+
+# Modos de análise: um nó por campo, uma única chamada para os três campos ou
+# map-reduce sobre trechos para documentos longos
+GRAPH_MODE = "graph"
+FUSED_MODE = "fused"
+LONG_MODE = "long"
+ANALYSIS_MODES = (GRAPH_MODE, FUSED_MODE, LONG_MODE)
+
+# Uso do catálogo de entidades (gazetteer): mesclar com as entidades do LLM ou
+# dispensar o LLM na extração de entidades
+ENTITY_MERGE_MODE = "merge"
+ENTITY_GAZETTEER_MODE = "gazetteer"
+ENTITY_EXTRACTION_MODES = (ENTITY_MERGE_MODE, ENTITY_GAZETTEER_MODE)
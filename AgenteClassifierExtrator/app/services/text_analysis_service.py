@@ -1,8 +1,56 @@
-from typing import TypedDict, List
-from langgraph.graph import StateGraph, END
+import asyncio
+import contextvars
+import functools
+import json
+import random
+import re
+import time
+from collections import Counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+)
+
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableLambda, RunnableParallel
+from langgraph.graph import END, StateGraph
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.llm_client import TokenUsageCallback, create_chat_model
+from app.core.logging import api_logger
+from app.core.metrics import (
+    LOCAL_CLASSIFIER_AGREEMENT,
+    LOCAL_CLASSIFIER_PREDICTIONS,
+    observe_node,
+    track_node,
+)
+from app.core.tracing import NamedLambda, TracedNode, instrument_graph, name_lambdas
+from app.schemas.text_analysis import TextAnalysisResponse
+from app.services.gazetteer import Gazetteer
+from app.services.local_classifier import HashedNGramClassifier, normalize_label
+from app.services.modes import (
+    ANALYSIS_MODES,
+    ENTITY_EXTRACTION_MODES,
+    ENTITY_GAZETTEER_MODE,
+    ENTITY_MERGE_MODE,
+    FUSED_MODE,
+    GRAPH_MODE,
+    LONG_MODE,
+    PARALLEL_TOPOLOGY,
+    SEQUENTIAL_TOPOLOGY,
+    WORKFLOW_TOPOLOGIES,
+)
+
 
 class State(TypedDict):
     text: str
@@ -11,55 +59,715 @@ class State(TypedDict):
     summary: str
 
 
+# Campos já produzidos pela análise em curso no modo "graph"; se ela for
+# cancelada, o chamador ainda tem os campos prontos para reaproveitar
+completed_fields: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "completed_fields", default=None
+)
+
+
+def records_fields(func: Callable) -> Callable:
+    """Copia o estado parcial devolvido por um nó para `completed_fields`."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> dict:
+        fields = await func(*args, **kwargs)
+        collected = completed_fields.get()
+        if collected is not None:
+            collected.update(fields)
+        return fields
+
+    return wrapper
+
+
+class GraphNode(NamedLambda):
+    # O RunnableLambda padrão relê o código-fonte da função (inspect.getsource)
+    # a cada execução para serializar o grafo para os callbacks; com vários
+    # nós por requisição isso domina o custo de CPU e limita a vazão do
+    # caminho assíncrono. O nome do nó é suficiente.
+    pass
+
+
+# Instruções do modo empacotado: vários textos em um único prompt por nó
+PACKED_INSTRUCTIONS = {
+    "classification": "Classifique cada um dos textos numerados abaixo em uma das categorias: Notícias, Blog, Pesquisa ou Outro. Responda APENAS com um objeto JSON que mapeia o número de cada texto para a sua categoria.",
+    "entities": "Extraia todas as entidades (Pessoa, Organização, Local) de cada um dos textos numerados abaixo. Responda APENAS com um objeto JSON que mapeia o número de cada texto para a lista das suas entidades.",
+    "summary": "Resuma cada um dos textos numerados abaixo em uma frase curta. Responda APENAS com um objeto JSON que mapeia o número de cada texto para o seu resumo.",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Aproximação de ~4 caracteres por token, suficiente para os relatórios
+    # de economia sem depender do tokenizer do modelo
+    return max(1, len(text) // 4)
+
+
+def extract_json_object(content: str) -> Optional[dict]:
+    # Alguns modelos envolvem o JSON em cercas de código; pega só o objeto
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def split_into_chunks(text: str, chunk_size: int, overlap: int) -> List[str]:
+    # Janelas de até chunk_size caracteres com `overlap` caracteres repetidos
+    # entre trechos vizinhos, para que entidades na fronteira não se percam.
+    # Sempre que possível o corte cai em fim de frase ou, no mínimo, em espaço.
+    if overlap >= chunk_size:
+        raise ValueError("Chunk overlap must be smaller than the chunk size")
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            window_start = start + chunk_size // 2
+            cut = max(
+                text.rfind(". ", window_start, end), text.rfind("\n", window_start, end)
+            )
+            if cut == -1:
+                cut = text.rfind(" ", window_start, end)
+            if cut != -1:
+                end = cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        next_start = end - overlap
+        space = text.find(" ", next_start, end)
+        start = max(space + 1 if space != -1 else next_start, start + 1)
+    return chunks
+
+
+def sample_chunk_indices(chunk_count: int, samples: int) -> List[int]:
+    # Índices espaçados uniformemente, sempre incluindo o primeiro e o último
+    if chunk_count <= samples:
+        return list(range(chunk_count))
+    if samples == 1:
+        return [0]
+    return sorted(
+        {round(i * (chunk_count - 1) / (samples - 1)) for i in range(samples)}
+    )
+
+
+def merge_entities(entity_lists: List[List[str]]) -> List[str]:
+    # Junta as entidades de todos os trechos mantendo a primeira grafia vista;
+    # duplicatas são comparadas sem diferenciar maiúsculas e espaços extras
+    merged = {}
+    for entities in entity_lists:
+        for entity in entities:
+            entity = " ".join(entity.split()).strip(" .;")
+            if entity:
+                merged.setdefault(entity.casefold(), entity)
+    return list(merged.values())
+
+
 class TextAnalysisService:
-    def __init__(self, openai_api_key: str):
-        self.llm = ChatOpenAI(api_key=openai_api_key, model="deepseek-chat", temperature=0, base_url="https://api.deepseek.com")
+    def __init__(
+        self,
+        openai_api_key: str,
+        topology: str = PARALLEL_TOPOLOGY,
+        llm: Optional[BaseChatModel] = None,
+        default_mode: str = GRAPH_MODE,
+        chunk_size: int = 4000,
+        chunk_overlap: int = 200,
+        chunk_concurrency: int = 8,
+        classification_sample_chunks: int = 3,
+        local_classifier: Optional[HashedNGramClassifier] = None,
+        local_classifier_threshold: float = 0.9,
+        local_classifier_shadow_rate: float = 0.0,
+        record_classification_labels: bool = False,
+        gazetteer: Optional[Gazetteer] = None,
+        entity_mode: str = ENTITY_MERGE_MODE,
+        model: str = "deepseek-chat",
+        base_url: str = "https://api.deepseek.com",
+    ):
+        if topology not in WORKFLOW_TOPOLOGIES:
+            raise ValueError(
+                f"Invalid workflow topology '{topology}'. "
+                f"Expected one of: {', '.join(WORKFLOW_TOPOLOGIES)}"
+            )
+        self._check_mode(default_mode)
+        if entity_mode not in ENTITY_EXTRACTION_MODES:
+            raise ValueError(
+                f"Invalid entity extraction mode '{entity_mode}'. "
+                f"Expected one of: {', '.join(ENTITY_EXTRACTION_MODES)}"
+            )
+        self.topology = topology
+        self.default_mode = default_mode
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunk_concurrency = chunk_concurrency
+        self.classification_sample_chunks = classification_sample_chunks
+        self.local_classifier = local_classifier
+        self.local_classifier_threshold = local_classifier_threshold
+        self.local_classifier_shadow_rate = local_classifier_shadow_rate
+        self.record_classification_labels = record_classification_labels
+        self.gazetteer = gazetteer
+        self.entity_mode = entity_mode
+        self._shadow_tasks: Set[asyncio.Task] = set()
+        # Sem modelo explícito, usa o pool de conexões compartilhado
+        self.llm = llm or create_chat_model(
+            openai_api_key,
+            model=model,
+            base_url=base_url,
+            temperature=0,
+            callbacks=[TokenUsageCallback()],
+        )
         self.workflow = self._create_workflow()
 
-    def _classification_node(self, state: State):
+    def _classification_message(self, state: State) -> HumanMessage:
         prompt = PromptTemplate(
             input_variables=["text"],
-            template="Classifique o seguinte texto em uma das categorias: Notícias, Blog, Pesquisa ou Outro.\n\nTexto:{text}\n\nCategoria:"
+            template="Classifique o seguinte texto em uma das categorias: Notícias, Blog, Pesquisa ou Outro.\n\nTexto:{text}\n\nCategoria:",
         )
-        message = HumanMessage(content=prompt.format(text=state["text"]))
-        classification = self.llm.predict_messages([message]).content.strip()
-        return {"classification": classification}
+        return HumanMessage(content=prompt.format(text=state["text"]))
 
-    def _entity_extraction_node(self, state: State):
+    def _entity_extraction_message(self, state: State) -> HumanMessage:
         prompt = PromptTemplate(
             input_variables=["text"],
-            template="Extraia todas as entidades (Pessoa, Organização, Local) do seguinte texto. Forneça o resultado como uma lista separada por vírgulas.\n\nTexto:{text}\n\nEntidades:"
+            template="Extraia todas as entidades (Pessoa, Organização, Local) do seguinte texto. Forneça o resultado como uma lista separada por vírgulas.\n\nTexto:{text}\n\nEntidades:",
         )
-        message = HumanMessage(content=prompt.format(text=state["text"]))
-        entities = self.llm.predict_messages([message]).content.strip().split(", ")
-        return {"entities": entities}
+        return HumanMessage(content=prompt.format(text=state["text"]))
 
-    def _summarization_node(self, state: State):
+    def _summarization_message(self, state: State) -> HumanMessage:
+        prompt = PromptTemplate(
+            input_variables=["text"],
+            template="Resuma o seguinte texto em uma frase curta.\n\nTexto:{text}\n\nResumo:",
+        )
+        return HumanMessage(content=prompt.format(text=state["text"]))
+
+    def _fused_message(self, state: State) -> HumanMessage:
         prompt = PromptTemplate(
             input_variables=["text"],
-            template="Resuma o seguinte texto em uma frase curta.\n\nTexto:{text}\n\nResumo:"
+            template=(
+                "Analise o seguinte texto e responda APENAS com um objeto JSON contendo as chaves:\n"
+                '- "classification": uma das categorias Notícias, Blog, Pesquisa ou Outro\n'
+                '- "entities": lista com todas as entidades (Pessoa, Organização, Local) do texto\n'
+                '- "summary": resumo do texto em uma frase curta\n\n'
+                "Texto:{text}\n\nJSON:"
+            ),
         )
-        message = HumanMessage(content=prompt.format(text=state["text"]))
+        return HumanMessage(content=prompt.format(text=state["text"]))
+
+    def _local_classification(
+        self, state: State
+    ) -> Tuple[Optional[str], Optional[str]]:
+        # Retorna (rótulo do caminho rápido, predição local repassada ao LLM)
+        if self.local_classifier is None:
+            return None, None
+        label, confidence = self.local_classifier.predict(state["text"])
+        if confidence >= self.local_classifier_threshold:
+            LOCAL_CLASSIFIER_PREDICTIONS.inc(outcome="fast_path")
+            return label, None
+        LOCAL_CLASSIFIER_PREDICTIONS.inc(outcome="deferred")
+        return None, label
+
+    def _record_llm_classification(
+        self,
+        state: State,
+        classification: str,
+        local_label: Optional[str],
+        path: str = "deferred",
+    ) -> None:
+        if local_label is not None:
+            agreed = normalize_label(classification) == local_label
+            LOCAL_CLASSIFIER_AGREEMENT.inc(
+                path=path, result="agree" if agreed else "disagree"
+            )
+        if self.record_classification_labels:
+            api_logger.log_classification_label(state["text"], classification)
+
+    async def _ashadow_classification(self, state: State, local_label: str) -> None:
+        message = self._classification_message(state)
+        classification = (await self.llm.apredict_messages([message])).content.strip()
+        self._record_llm_classification(
+            state, classification, local_label, path="fast_path"
+        )
+
+    @observe_node("classification")
+    def _classification_node(self, state: State):
+        fast_label, local_label = self._local_classification(state)
+        if fast_label is not None:
+            return {"classification": fast_label}
+        message = self._classification_message(state)
+        classification = self.llm.predict_messages([message]).content.strip()
+        self._record_llm_classification(state, classification, local_label)
+        return {"classification": classification}
+
+    @records_fields
+    @observe_node("classification")
+    async def _aclassification_node(self, state: State):
+        fast_label, local_label = self._local_classification(state)
+        if fast_label is not None:
+            if random.random() < self.local_classifier_shadow_rate:
+                # Confere uma amostra do caminho rápido com o LLM, fora da requisição
+                task = asyncio.ensure_future(
+                    self._ashadow_classification(state, fast_label)
+                )
+                self._shadow_tasks.add(task)
+                task.add_done_callback(self._shadow_tasks.discard)
+            return {"classification": fast_label}
+        message = self._classification_message(state)
+        classification = (await self.llm.apredict_messages([message])).content.strip()
+        self._record_llm_classification(state, classification, local_label)
+        return {"classification": classification}
+
+    @observe_node("entities")
+    def _entity_extraction_node(self, state: State):
+        if self.gazetteer is not None and self.entity_mode == ENTITY_GAZETTEER_MODE:
+            return {"entities": self.gazetteer.entities(state["text"])}
+        message = self._entity_extraction_message(state)
+        entities = self.llm.predict_messages([message]).content.strip().split(", ")
+        return {"entities": self._merge_known_entities(state, entities)}
+
+    @records_fields
+    @observe_node("entities")
+    async def _aentity_extraction_node(self, state: State):
+        if self.gazetteer is not None and self.entity_mode == ENTITY_GAZETTEER_MODE:
+            return {"entities": self.gazetteer.entities(state["text"])}
+        message = self._entity_extraction_message(state)
+        entities = (
+            (await self.llm.apredict_messages([message])).content.strip().split(", ")
+        )
+        return {"entities": self._merge_known_entities(state, entities)}
+
+    def _merge_known_entities(self, state: State, entities: List[str]) -> List[str]:
+        # As entradas do catálogo vêm primeiro, e entidades do LLM que são
+        # apelidos de uma entrada passam para a grafia canônica
+        if self.gazetteer is None:
+            return entities
+        entities = [self.gazetteer.canonical(entity) or entity for entity in entities]
+        return merge_entities([self.gazetteer.entities(state["text"]), entities])
+
+    @observe_node("summary")
+    def _summarization_node(self, state: State):
+        message = self._summarization_message(state)
         summary = self.llm.predict_messages([message]).content.strip()
         return {"summary": summary}
 
+    @records_fields
+    @observe_node("summary")
+    async def _asummarization_node(self, state: State):
+        message = self._summarization_message(state)
+        summary = (await self.llm.apredict_messages([message])).content.strip()
+        return {"summary": summary}
+
+    def _reduce_summaries_message(self, summaries: List[str]) -> HumanMessage:
+        prompt = PromptTemplate(
+            input_variables=["summaries"],
+            template="Os resumos abaixo são de trechos consecutivos de um mesmo documento. Combine-os em um único resumo de uma frase curta.\n\nResumos:\n{summaries}\n\nResumo:",
+        )
+        return HumanMessage(
+            content=prompt.format(
+                summaries="\n".join(f"- {summary}" for summary in summaries)
+            )
+        )
+
+    def _packed_message(self, field: str, texts: List[str]) -> HumanMessage:
+        prompt = PromptTemplate(
+            input_variables=["instruction", "texts"],
+            template="{instruction}\n\n{texts}\n\nJSON:",
+        )
+        numbered = "\n\n".join(
+            f"[{number}]\n{text}" for number, text in enumerate(texts, start=1)
+        )
+        return HumanMessage(
+            content=prompt.format(
+                instruction=PACKED_INSTRUCTIONS[field], texts=numbered
+            )
+        )
+
+    def _parse_fused_response(self, content: str) -> dict:
+        data = extract_json_object(content)
+        if data is None:
+            return {}
+
+        try:
+            return TextAnalysisResponse.model_validate(data).model_dump()
+        except ValidationError:
+            pass
+
+        # Validação campo a campo: aproveita o que veio correto e deixa o
+        # restante para os nós de fallback
+        fields = {}
+        for name, field in TextAnalysisResponse.model_fields.items():
+            if name not in data:
+                continue
+            try:
+                fields[name] = TypeAdapter(field.annotation).validate_python(data[name])
+            except ValidationError:
+                continue
+        return fields
+
+    def _fallback_nodes(self) -> dict:
+        # Nó do grafo (e o construtor do seu prompt) que produz cada campo
+        return {
+            "classification": (
+                self._aclassification_node,
+                self._classification_message,
+            ),
+            "entities": (
+                self._aentity_extraction_node,
+                self._entity_extraction_message,
+            ),
+            "summary": (self._asummarization_node, self._summarization_message),
+        }
+
+    async def _afill_missing_fields(self, state: State, fields: dict) -> List[str]:
+        # Campos ausentes ou inválidos caem para o nó equivalente do grafo
+        fallbacks = self._fallback_nodes()
+        missing = [name for name in fallbacks if name not in fields]
+        partial_states = await asyncio.gather(
+            *(fallbacks[name][0](state) for name in missing)
+        )
+        for partial_state in partial_states:
+            fields.update(partial_state)
+        return missing
+
+    async def _afused_analysis(self, text: str) -> dict:
+        state = {"text": text}
+        start_time = time.time()
+
+        message = self._fused_message(state)
+        with track_node("fused"):
+            response = await self.llm.apredict_messages([message])
+        fused_call_time = time.time() - start_time
+        fields = self._parse_fused_response(response.content)
+
+        missing = await self._afill_missing_fields(state, fields)
+        fallbacks = self._fallback_nodes()
+        processing_time = time.time() - start_time
+
+        # Comparação com o modo grafo: tokens de entrada das três chamadas
+        # separadas e latência do caminho crítico da topologia configurada
+        graph_input_tokens = sum(
+            estimate_tokens(build(state).content) for _, build in fallbacks.values()
+        )
+        fused_input_tokens = estimate_tokens(message.content) + sum(
+            estimate_tokens(fallbacks[name][1](state).content) for name in missing
+        )
+        graph_critical_path_calls = 3 if self.topology == SEQUENTIAL_TOPOLOGY else 1
+        api_logger.log_fused_analysis(
+            {
+                "fallback_fields": missing,
+                "llm_calls": 1 + len(missing),
+                "llm_calls_saved": len(fallbacks) - 1 - len(missing),
+                "input_tokens_est": fused_input_tokens,
+                "input_tokens_saved_est": graph_input_tokens - fused_input_tokens,
+                "processing_time_ms": round(processing_time * 1000, 2),
+                "latency_saved_est_ms": round(
+                    (fused_call_time * graph_critical_path_calls - processing_time)
+                    * 1000,
+                    2,
+                ),
+            }
+        )
+
+        return {"text": text, **fields}
+
+    async def _areduce_summaries(
+        self, summaries: List[str], semaphore: asyncio.Semaphore
+    ) -> Tuple[str, int, int]:
+        # Redução em árvore: agrupa resumos até o tamanho de um trecho, resume
+        # cada grupo em paralelo e repete até sobrar um. Retorna o resumo, o
+        # número de rodadas e o número de chamadas ao LLM.
+        async def reduce_group(group: List[str]) -> str:
+            async with semaphore:
+                with track_node("summary_reduce"):
+                    message = self._reduce_summaries_message(group)
+                    return (await self.llm.apredict_messages([message])).content.strip()
+
+        rounds = calls = 0
+        while len(summaries) > 1:
+            groups: List[List[str]] = [[]]
+            group_length = 0
+            for summary in summaries:
+                if (
+                    len(groups[-1]) >= 2
+                    and group_length + len(summary) > self.chunk_size
+                ):
+                    groups.append([])
+                    group_length = 0
+                groups[-1].append(summary)
+                group_length += len(summary)
+            summaries = list(
+                await asyncio.gather(*(reduce_group(group) for group in groups))
+            )
+            rounds += 1
+            calls += len(groups)
+        return summaries[0], rounds, calls
+
+    async def _along_document_analysis(self, text: str) -> dict:
+        # Map-reduce: entidades e resumos por trecho (com concorrência
+        # limitada), classificação por voto entre alguns trechos amostrados.
+        # O custo de cada chamada fica limitado pelo tamanho do trecho.
+        start_time = time.time()
+        chunks = split_into_chunks(text, self.chunk_size, self.chunk_overlap)
+        sampled = sample_chunk_indices(len(chunks), self.classification_sample_chunks)
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def run_node(node, chunk: str) -> dict:
+            async with semaphore:
+                return await node({"text": chunk})
+
+        classification_states, entity_states, summary_states = await asyncio.gather(
+            asyncio.gather(
+                *(
+                    run_node(self._aclassification_node, chunks[index])
+                    for index in sampled
+                )
+            ),
+            asyncio.gather(
+                *(run_node(self._aentity_extraction_node, chunk) for chunk in chunks)
+            ),
+            asyncio.gather(
+                *(run_node(self._asummarization_node, chunk) for chunk in chunks)
+            ),
+        )
+
+        votes = Counter(state["classification"] for state in classification_states)
+        entity_lists = [state["entities"] for state in entity_states]
+        entities = merge_entities(entity_lists)
+        summary, reduce_rounds, reduce_calls = await self._areduce_summaries(
+            [state["summary"] for state in summary_states], semaphore
+        )
+        processing_time = time.time() - start_time
+
+        api_logger.log_long_document_analysis(
+            {
+                "text_length": len(text),
+                "chunks": len(chunks),
+                "classification_chunks": len(sampled),
+                "classification_votes": dict(votes),
+                "entities_raw": sum(len(entity_list) for entity_list in entity_lists),
+                "entities_unique": len(entities),
+                "reduce_rounds": reduce_rounds,
+                "llm_calls": len(sampled) + 2 * len(chunks) + reduce_calls,
+                "processing_time_ms": round(processing_time * 1000, 2),
+            }
+        )
+
+        return {
+            "text": text,
+            "classification": votes.most_common(1)[0][0],
+            "entities": entities,
+            "summary": summary,
+        }
+
+    async def _apacked_field(self, field: str, texts: List[str]) -> Dict[int, Any]:
+        message = self._packed_message(field, texts)
+        with track_node(f"packed_{field}"):
+            response = await self.llm.apredict_messages([message])
+        data = extract_json_object(response.content) or {}
+
+        adapter = TypeAdapter(TextAnalysisResponse.model_fields[field].annotation)
+        values = {}
+        for number, value in data.items():
+            try:
+                index = int(str(number).strip("[] ")) - 1
+            except ValueError:
+                continue
+            if not 0 <= index < len(texts):
+                continue
+            try:
+                values[index] = adapter.validate_python(value)
+            except ValidationError:
+                continue
+        return values
+
+    async def _acomplete_packed_item(self, text: str, fields: dict) -> dict:
+        await self._afill_missing_fields({"text": text}, fields)
+        return {"text": text, **fields}
+
+    def _nodes(self) -> Dict[str, GraphNode]:
+        # Cada nó tem uma versão síncrona (invoke) e uma assíncrona (ainvoke),
+        # assim o mesmo grafo compilado atende aos dois caminhos
+        return {
+            "classification_node": GraphNode(
+                self._classification_node,
+                afunc=self._aclassification_node,
+                name="classification_node",
+            ),
+            "entity_extraction": GraphNode(
+                self._entity_extraction_node,
+                afunc=self._aentity_extraction_node,
+                name="entity_extraction",
+            ),
+            "summarization": GraphNode(
+                self._summarization_node,
+                afunc=self._asummarization_node,
+                name="summarization",
+            ),
+        }
+
+    def _join_node(self, partial_states: dict) -> dict:
+        # Junta os estados parciais produzidos pelos ramos paralelos
+        merged = {}
+        for partial_state in partial_states.values():
+            merged.update(partial_state)
+        return merged
+
     def _create_workflow(self) -> StateGraph:
+        if self.topology == PARALLEL_TOPOLOGY:
+            return self._create_parallel_workflow()
+        return self._create_sequential_workflow()
+
+    def _create_parallel_workflow(self) -> StateGraph:
         workflow = StateGraph(State)
-        
+
+        # Os três nós não dependem da saída uns dos outros: o fan-out os executa
+        # ao mesmo tempo e o join mescla os estados parciais antes do END.
+        # (langgraph 0.0.20 não permite várias arestas chegando ao mesmo nó
+        # em um único passo, por isso o fan-out/join fica dentro de um nó.)
+        # Os ramos também são instrumentados para aparecerem no trace por nó
+        fan_out = RunnableParallel(
+            {name: TracedNode(name, node) for name, node in self._nodes().items()}
+        )
+        join = GraphNode(self._join_node, name="join")
+        workflow.add_node("analysis", fan_out | join)
+
+        workflow.set_entry_point("analysis")
+        workflow.add_edge("analysis", END)
+
+        return name_lambdas(instrument_graph(workflow).compile())
+
+    def _create_sequential_workflow(self) -> StateGraph:
+        workflow = StateGraph(State)
+
         # Adicionar nós ao grafo
-        workflow.add_node("classification_node", self._classification_node)
-        workflow.add_node("entity_extraction", self._entity_extraction_node)
-        workflow.add_node("summarization", self._summarization_node)
-        
+        for name, node in self._nodes().items():
+            workflow.add_node(name, node)
+
         # Adicionar arestas ao grafo
         workflow.set_entry_point("classification_node")
         workflow.add_edge("classification_node", "entity_extraction")
         workflow.add_edge("entity_extraction", "summarization")
         workflow.add_edge("summarization", END)
-        
-        return workflow.compile()
+
+        return name_lambdas(instrument_graph(workflow).compile())
 
     def analyze_text(self, text: str) -> dict:
         state_input = {"text": text}
         result = self.workflow.invoke(state_input)
-        return result 
\ No newline at end of file
+        return result
+
+    def _check_mode(self, mode: str) -> None:
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(
+                f"Invalid analysis mode '{mode}'. "
+                f"Expected one of: {', '.join(ANALYSIS_MODES)}"
+            )
+
+    async def aanalyze_text(
+        self, text: str, mode: Optional[str] = None, partial: Optional[dict] = None
+    ) -> dict:
+        # Versão assíncrona: não bloqueia o event loop enquanto aguarda o LLM.
+        # No modo "graph", `partial` recebe cada campo assim que o seu nó
+        # termina, e os campos que já vierem nele não são recalculados.
+        mode = mode or self.default_mode
+        self._check_mode(mode)
+        if mode == FUSED_MODE:
+            return await self._afused_analysis(text)
+        if mode == LONG_MODE:
+            return await self._along_document_analysis(text)
+
+        state_input = {"text": text}
+        if partial is None:
+            return await self.workflow.ainvoke(state_input)
+        token = completed_fields.set(partial)
+        try:
+            if not partial:
+                return await self.workflow.ainvoke(state_input)
+            # Retomada de uma análise cancelada: só os nós que faltam
+            fields = dict(partial)
+            await self._afill_missing_fields(state_input, fields)
+            return {**state_input, **fields}
+        finally:
+            completed_fields.reset(token)
+
+    async def aanalyze_packed(self, texts: List[str]) -> List[Union[dict, Exception]]:
+        # Um único prompt por nó para todos os textos do pacote. Itens que não
+        # vierem válidos na resposta empacotada são completados pelo nó
+        # original; erros são devolvidos por item, na posição do texto.
+        packed_fields = await asyncio.gather(
+            *(self._apacked_field(field, texts) for field in PACKED_INSTRUCTIONS),
+            return_exceptions=True,
+        )
+        fields_per_item = [{} for _ in texts]
+        for field, values in zip(PACKED_INSTRUCTIONS, packed_fields):
+            if isinstance(values, Exception):
+                continue
+            for index, value in values.items():
+                fields_per_item[index][field] = value
+
+        return await asyncio.gather(
+            *(
+                self._acomplete_packed_item(text, fields)
+                for text, fields in zip(texts, fields_per_item)
+            ),
+            return_exceptions=True,
+        )
+
+    async def astream_fields(
+        self, text: str, stream_summary_tokens: bool = False
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        # Executa os três nós de forma independente e emite cada campo como
+        # (nome, valor) assim que o seu nó termina. Com stream_summary_tokens,
+        # os pedaços do resumo saem como ("summary_token", texto) antes do
+        # campo "summary" completo.
+        state = {"text": text}
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run_node(node) -> None:
+            for field, value in (await node(state)).items():
+                await queue.put((field, value))
+
+        @observe_node("summary")
+        async def stream_summary() -> None:
+            message = self._summarization_message(state)
+            chunks = []
+            async for chunk in self.llm.astream([message]):
+                chunks.append(chunk.content)
+                await queue.put(("summary_token", chunk.content))
+            await queue.put(("summary", "".join(chunks).strip()))
+
+        tasks = [
+            asyncio.ensure_future(run_node(self._aclassification_node)),
+            asyncio.ensure_future(run_node(self._aentity_extraction_node)),
+            asyncio.ensure_future(
+                stream_summary()
+                if stream_summary_tokens
+                else run_node(self._asummarization_node)
+            ),
+        ]
+        pending_fields = {"classification", "entities", "summary"}
+        try:
+            while pending_fields:
+                getter = asyncio.ensure_future(queue.get())
+                # Acorda com o próximo campo ou com a falha de algum nó
+                done, _ = await asyncio.wait(
+                    [getter, *(task for task in tasks if not task.done())],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if getter not in done:
+                    getter.cancel()
+                    for task in done:
+                        task.result()
+                    continue
+                field, value = getter.result()
+                pending_fields.discard(field)
+                yield field, value
+        finally:
+            # Consumidor desistiu (ou algum nó falhou): não deixa chamadas órfãs
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,80 @@
+"""
+Benchmark de concorrência do TextAnalysisService contra um LLM falso local.
+
+Compara o caminho assíncrono (aanalyze_text) com o caminho síncrono chamado de
+dentro do event loop (o comportamento antigo do endpoint /analyze), mostrando
+como a vazão escala com o número de requisições simultâneas em um único worker.
+
+Uso:
+    python benchmarks/concurrency_benchmark.py --latency 0.2 --levels 1 10 100 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("API_KEY", "benchmark")
+
+from app.services.text_analysis_service import (  # noqa: E402
+    PARALLEL_TOPOLOGY,
+    WORKFLOW_TOPOLOGIES,
+    TextAnalysisService,
+)
+from benchmarks.fake_llm import FakeChatModel  # noqa: E402
+
+SAMPLE_TEXT = (
+    "Maria Silva, presidente do Banco Central, anunciou hoje em Brasília "
+    "novas medidas para conter a inflação."
+)
+
+
+async def run_level(service: TextAnalysisService, concurrency: int, use_async: bool) -> float:
+    async def one_request() -> None:
+        if use_async:
+            await service.aanalyze_text(SAMPLE_TEXT)
+        else:
+            # Chamada bloqueante dentro do event loop, como no endpoint antigo
+            service.analyze_text(SAMPLE_TEXT)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência simulada por chamada ao LLM (s)")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--topology", choices=WORKFLOW_TOPOLOGIES, default=PARALLEL_TOPOLOGY)
+    parser.add_argument("--skip-sync", action="store_true", help="Não executa o caminho síncrono")
+    args = parser.parse_args()
+
+    service = TextAnalysisService(
+        "fake-key",
+        topology=args.topology,
+        llm=FakeChatModel(latency=args.latency),
+    )
+
+    # Aquecimento: a primeira execução paga imports e inicializações preguiçosas
+    service.analyze_text(SAMPLE_TEXT)
+    asyncio.run(service.aanalyze_text(SAMPLE_TEXT))
+
+    print(f"topology={args.topology} latency={args.latency}s")
+    print(f"{'concurrency':>12} {'async req/s':>12} {'sync req/s':>12}")
+    for level in args.levels:
+        async_rps = asyncio.run(run_level(service, level, use_async=True))
+        if args.skip_sync or level > 10:
+            # O caminho síncrono serializa tudo; níveis altos só tomariam tempo
+            sync_column = "-"
+        else:
+            sync_rps = asyncio.run(run_level(service, level, use_async=False))
+            sync_column = f"{sync_rps:.1f}"
+        print(f"{level:>12} {async_rps:>12.1f} {sync_column:>12}")
+
+
+if __name__ == "__main__":
+    main()
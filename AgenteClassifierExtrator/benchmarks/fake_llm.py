@@ -0,0 +1,69 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def fake_response(prompt: str) -> str:
+    """Resposta plausível para cada prompt do serviço (também usada pelo servidor falso)."""
+    if prompt.startswith("Analise o seguinte texto"):
+        # Modo fused: os três campos em um único objeto JSON
+        return json.dumps({
+            "classification": "Notícias",
+            "entities": ["Maria Silva", "Banco Central", "Brasília"],
+            "summary": "Resumo gerado pelo modelo falso.",
+        }, ensure_ascii=False)
+    if "textos numerados" in prompt:
+        # Modo empacotado: um objeto JSON indexado pelo número de cada texto
+        numbers = re.findall(r"^\[(\d+)\]$", prompt, re.MULTILINE)
+        if "Classifique" in prompt:
+            value = "Notícias"
+        elif "Extraia" in prompt:
+            value = ["Maria Silva", "Banco Central", "Brasília"]
+        else:
+            value = "Resumo gerado pelo modelo falso."
+        return json.dumps({number: value for number in numbers}, ensure_ascii=False)
+    if "Classifique" in prompt:
+        return "Notícias"
+    if "Extraia" in prompt:
+        return "Maria Silva, Banco Central, Brasília"
+    return "Resumo gerado pelo modelo falso."
+
+
+class FakeChatModel(BaseChatModel):
+    """LLM local que simula a latência do backend sem chamadas de rede."""
+
+    latency: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        content = fake_response(messages[-1].content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
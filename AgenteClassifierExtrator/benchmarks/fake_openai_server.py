@@ -0,0 +1,211 @@
+"""
+Servidor local compatível com a API de chat da OpenAI, para medir a API de
+ponta a ponta sem chamar o provedor real.
+
+A latência de cada resposta é o tempo até o primeiro token, sorteado de uma
+distribuição, mais a geração dos tokens da resposta a uma taxa (tokens/s)
+também sorteada por requisição. As respostas são as mesmas do LLM falso
+(`benchmarks/fake_llm.py`).
+
+Uso:
+    python benchmarks/fake_openai_server.py --port 8100 --ttft-dist lognormal --ttft-mean 0.3 --ttft-spread 0.15
+    LLM_BASE_URL=http://127.0.0.1:8100/v1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.fake_llm import fake_response  # noqa: E402
+
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# Pedaços com o espaço que os precede: juntos, reconstroem o texto original
+_TOKEN_PATTERN = re.compile(r"\s*\S+")
+
+
+class Distribution:
+    """Distribuição de valores não negativos definida pela média e pela dispersão."""
+
+    def __init__(self, kind: str = "fixed", mean: float = 0.0, spread: float = 0.0, rng: Optional[random.Random] = None):
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(f"Invalid distribution '{kind}'. Expected one of: {', '.join(DISTRIBUTIONS)}")
+        self.kind = kind
+        self.mean = mean
+        self.spread = spread
+        self.rng = rng or random.Random()
+
+    def sample(self) -> float:
+        if self.kind == "fixed" or self.mean <= 0:
+            value = self.mean
+        elif self.kind == "uniform":
+            value = self.rng.uniform(self.mean - self.spread, self.mean + self.spread)
+        elif self.kind == "normal":
+            value = self.rng.gauss(self.mean, self.spread)
+        elif self.kind == "lognormal":
+            # `spread` é o desvio padrão da própria distribuição (cauda longa à direita)
+            sigma = math.sqrt(math.log(1 + (self.spread / self.mean) ** 2))
+            value = self.rng.lognormvariate(math.log(self.mean) - sigma ** 2 / 2, sigma)
+        else:
+            value = self.rng.expovariate(1 / self.mean)
+        return max(value, 0.0)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "mean": self.mean, "spread": self.spread}
+
+
+def _prompt(body: Dict[str, Any]) -> str:
+    content = (body.get("messages") or [{}])[-1].get("content") or ""
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def create_app(
+    ttft: Distribution,
+    token_rate: Distribution,
+    model: str = "fake-chat-model"
+) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI-compatible server")
+    stats = {"requests": 0, "streamed": 0, "in_flight": 0, "max_in_flight": 0, "completion_tokens": 0}
+
+    def generation_delays(tokens: List[str]) -> List[float]:
+        # Atraso antes de cada token: o primeiro espera o TTFT, os demais 1/taxa
+        rate = token_rate.sample()
+        step = 1 / rate if rate > 0 else 0.0
+        return [ttft.sample()] + [step] * (len(tokens) - 1)
+
+    def usage(prompt: str, tokens: List[str]) -> Dict[str, int]:
+        prompt_tokens = max(len(prompt) // 4, 1)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+
+    def start_request(tokens: List[str]) -> None:
+        stats["requests"] += 1
+        stats["completion_tokens"] += len(tokens)
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    @app.get("/v1/models")
+    async def models() -> Dict[str, Any]:
+        return {"object": "list", "data": [{"id": model, "object": "model", "created": 0, "owned_by": "benchmark"}]}
+
+    @app.get("/stats")
+    async def server_stats() -> Dict[str, Any]:
+        return {**stats, "ttft": ttft.describe(), "token_rate": token_rate.describe()}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]) -> Any:
+        prompt = _prompt(body)
+        content = fake_response(prompt)
+        tokens = _TOKEN_PATTERN.findall(content) or [content]
+        delays = generation_delays(tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        start_request(tokens)
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(sum(delays))
+            finally:
+                stats["in_flight"] -= 1
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", model),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage(prompt, tokens),
+            }
+
+        stats["streamed"] += 1
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", model),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def stream() -> AsyncIterator[str]:
+            try:
+                for index, (token, delay) in enumerate(zip(tokens, delays)):
+                    await asyncio.sleep(delay)
+                    delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+                    yield chunk(delta)
+                yield chunk({}, finish_reason="stop")
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def add_latency_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opções do perfil de latência (compartilhadas com o teste de carga)."""
+    parser.add_argument("--ttft-dist", choices=DISTRIBUTIONS, default="lognormal", help="Distribuição do tempo até o primeiro token")
+    parser.add_argument("--ttft-mean", type=float, default=0.2, help="Tempo médio até o primeiro token (s)")
+    parser.add_argument("--ttft-spread", type=float, default=0.1, help="Dispersão do tempo até o primeiro token (s)")
+    parser.add_argument("--token-rate-dist", choices=DISTRIBUTIONS, default="normal", help="Distribuição da taxa de geração")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Tokens por segundo (0 = resposta instantânea)")
+    parser.add_argument("--token-rate-spread", type=float, default=10.0, help="Dispersão da taxa de geração")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def latency_arguments(args: argparse.Namespace) -> List[str]:
+    """As opções de latência de `args` como argumentos de linha de comando."""
+    options = [
+        "--ttft-dist", args.ttft_dist,
+        "--ttft-mean", str(args.ttft_mean),
+        "--ttft-spread", str(args.ttft_spread),
+        "--token-rate-dist", args.token_rate_dist,
+        "--token-rate", str(args.token_rate),
+        "--token-rate-spread", str(args.token_rate_spread),
+    ]
+    if args.seed is not None:
+        options += ["--seed", str(args.seed)]
+    return options
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app(
+        ttft=Distribution(args.ttft_dist, args.ttft_mean, args.ttft_spread, rng),
+        token_rate=Distribution(args.token_rate_dist, args.token_rate, args.token_rate_spread, rng),
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark do índice de entidades (Gazetteer) com catálogos grandes.
+
+Gera um catálogo sintético de pessoas, organizações e locais, mede o tempo de
+construção do autômato, a memória ocupada e o tempo de varredura de textos do
+tamanho máximo aceito pela API, comparando com a busca ingênua (todas as
+sequências de até N palavras do texto em um set).
+
+Uso:
+    python benchmarks/gazetteer_benchmark.py --entries 1000000 --texts 200
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.gazetteer import Gazetteer, tokenize  # noqa: E402
+
+FIRST_NAMES = [
+    "Ana", "João", "Maria", "José", "Antônio", "Francisca", "Luiz", "Márcia",
+    "Paulo", "Sérgio", "Fernanda", "Júlia", "Rafael", "Beatriz", "Gonçalo", "Inês",
+]
+SURNAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves",
+    "Pereira", "Lima", "Gomes", "Ribeiro", "Carvalho", "Araújo", "Conceição",
+]
+ORGANIZATION_WORDS = [
+    "Banco", "Companhia", "Instituto", "Fundação", "Grupo", "Associação",
+    "Indústrias", "Serviços", "Tecnologia", "Agrícola", "Nacional", "Paulista",
+]
+PLACE_WORDS = ["São", "Santa", "Vila", "Porto", "Rio", "Campo", "Nova", "Alto", "Barra", "Lagoa"]
+
+
+def synthetic_word(rng: random.Random) -> str:
+    # Sílabas aleatórias: um vocabulário grande, como o de um catálogo real
+    syllables = ["ba", "ca", "ção", "de", "fi", "go", "lu", "má", "ne", "po", "ri", "sa", "té", "vo", "xi", "zé"]
+    return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def synthetic_entry(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.5:
+        parts = [rng.choice(FIRST_NAMES), synthetic_word(rng), rng.choice(SURNAMES)]
+    elif kind < 0.8:
+        parts = [rng.choice(ORGANIZATION_WORDS), synthetic_word(rng), rng.choice(ORGANIZATION_WORDS)]
+    else:
+        parts = [rng.choice(PLACE_WORDS), synthetic_word(rng)]
+    return " ".join(parts[:rng.randint(2, len(parts))])
+
+
+def synthetic_text(rng: random.Random, entries: list, length: int) -> str:
+    words = []
+    filler = "o a de que em para com uma os anunciou hoje segundo reunião governo".split()
+    while sum(len(word) + 1 for word in words) < length:
+        if rng.random() < 0.05:
+            words.append(rng.choice(entries))
+        else:
+            words.append(rng.choice(filler))
+    return " ".join(words)[:length]
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--text-length", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = [synthetic_entry(rng) for _ in range(args.entries)]
+    texts = [synthetic_text(rng, entries, args.text_length) for _ in range(args.texts)]
+
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    gazetteer = Gazetteer()
+    for entry in entries:
+        gazetteer.add(entry)
+    gazetteer.build()
+    build_time = time.perf_counter() - start
+    print(f"entries={len(gazetteer)} vocabulary={len(gazetteer.vocabulary)}")
+    print(f"build: {build_time:.1f}s, max RSS +{max_rss_mb() - rss_before:.0f} MB")
+
+    start = time.perf_counter()
+    found = sum(len(gazetteer.find(text)) for text in texts)
+    scan_time = (time.perf_counter() - start) / len(texts)
+    print(f"automaton: {scan_time * 1000:.2f} ms/text ({args.text_length} chars), {found / len(texts):.1f} matches/text")
+
+    # Referência: todas as sequências de 1..N palavras do texto consultadas em um set
+    max_words = max(len(tokenize(entry)) for entry in entries[:10000])
+    known = {" ".join(tokenize(entry)) for entry in entries}
+    start = time.perf_counter()
+    for text in texts:
+        tokens = tokenize(text)
+        for i in range(len(tokens)):
+            for n in range(1, max_words + 1):
+                if " ".join(tokens[i:i + n]) in known:
+                    pass
+    naive_time = (time.perf_counter() - start) / len(texts)
+    print(f"naive n-gram set lookup (n<={max_words}): {naive_time * 1000:.2f} ms/text")
+
+
+if __name__ == "__main__":
+    main()
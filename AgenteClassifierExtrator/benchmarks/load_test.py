@@ -0,0 +1,373 @@
+"""
+Teste de carga HTTP da API contra um servidor local compatível com OpenAI.
+
+Sobe o servidor falso (benchmarks/fake_openai_server.py) e a API (uvicorn) em
+processos separados, com LLM_BASE_URL apontando para o servidor falso, e
+dispara /api/v1/analyze em taxa fixa (RPS, laço aberto: a latência é medida a
+partir do instante programado, incluindo a fila) e em concorrência fixa (laço
+fechado). Cada carga roda com uma fração de textos repetidos, para medir o
+efeito do cache. Os resultados vão para um arquivo JSON que pode ser comparado
+com o de outro commit.
+
+Uso:
+    python benchmarks/load_test.py --rps 10 50 --concurrency 1 20 --duration 10
+    python benchmarks/load_test.py --repeat-ratios 0 0.9 --ttft-mean 0.5 --output benchmarks/results/base.json
+    python benchmarks/load_test.py --compare benchmarks/results/base.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.fake_openai_server import add_latency_arguments, latency_arguments  # noqa: E402
+
+API_KEY = "benchmark"
+SAMPLE_TEXT = (
+    "Maria Silva, presidente do Banco Central, anunciou hoje em Brasília "
+    "novas medidas para conter a inflação."
+)
+# Métricas do /metrics usadas para medir o efeito do cache
+SERVER_COUNTERS = (
+    "cache_hits_total",
+    "cache_misses_total",
+    "cache_l2_hits_total",
+    "cache_l2_misses_total",
+    "singleflight_coalesced_total",
+)
+_SAMPLE_LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{[^}]*\})? (\S+)$")
+
+# (instante programado, latência em s, status, texto repetido?)
+Result = Tuple[float, float, str, bool]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", "."],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with code {process.returncode} before {url} was ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def _latency_summary(latencies: List[float]) -> Optional[Dict[str, float]]:
+    if not latencies:
+        return None
+    if len(latencies) == 1:
+        p50 = p95 = p99 = latencies[0]
+    else:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    return {
+        "count": len(latencies),
+        "mean": round(statistics.fmean(latencies) * 1000, 2),
+        "p50": round(p50 * 1000, 2),
+        "p95": round(p95 * 1000, 2),
+        "p99": round(p99 * 1000, 2),
+        "max": round(max(latencies) * 1000, 2),
+    }
+
+
+async def _scrape_counters(client: httpx.AsyncClient, api_url: str, llm_url: str) -> Dict[str, float]:
+    counters = dict.fromkeys(SERVER_COUNTERS, 0.0)
+    for line in (await client.get(f"{api_url}/metrics")).text.splitlines():
+        match = _SAMPLE_LINE.match(line)
+        if match and match.group(1) in counters:
+            counters[match.group(1)] += float(match.group(2))
+    counters["llm_requests"] = float((await client.get(f"{llm_url}/stats")).json()["requests"])
+    return counters
+
+
+async def run_fixed_rate(rps: float, duration: float, send: Callable[[float], Awaitable[None]]) -> None:
+    # Laço aberto: as requisições saem no horário programado, mesmo que as
+    # anteriores ainda não tenham terminado
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks = []
+    for index in range(max(int(rps * duration), 1)):
+        scheduled = start + index / rps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(scheduled)))
+    await asyncio.gather(*tasks)
+
+
+async def run_fixed_concurrency(concurrency: int, duration: float, send: Callable[[float], Awaitable[None]]) -> None:
+    # Laço fechado: cada cliente envia a próxima requisição quando a anterior termina
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def worker() -> None:
+        while loop.time() < deadline:
+            await send(loop.time())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    api_url: str,
+    llm_url: str,
+    kind: str,
+    load: float,
+    repeat_ratio: float,
+    args: argparse.Namespace,
+    index: int
+) -> Dict[str, Any]:
+    rng = random.Random((args.seed or 0) + index)
+    # Textos próprios do cenário: cada um começa com o cache frio
+    hot_texts = [f"{SAMPLE_TEXT} Tema recorrente {index}-{number}." for number in range(args.hot_texts)]
+    results: List[Result] = []
+    loop = asyncio.get_running_loop()
+    counter = 0
+
+    async def send(scheduled: float) -> None:
+        nonlocal counter
+        counter += 1
+        repeated = rng.random() < repeat_ratio
+        text = rng.choice(hot_texts) if repeated else f"{SAMPLE_TEXT} Referência {index}-{counter}."
+        body: Dict[str, Any] = {"text": text}
+        if args.mode:
+            body["mode"] = args.mode
+        try:
+            response = await client.post(f"{api_url}/api/v1/analyze", json=body, headers={"X-API-Key": API_KEY})
+            status = str(response.status_code)
+        except httpx.HTTPError as error:
+            status = f"error:{type(error).__name__}"
+        results.append((scheduled, loop.time() - scheduled, status, repeated))
+
+    before = await _scrape_counters(client, api_url, llm_url)
+    start = loop.time()
+    if kind == "rps":
+        await run_fixed_rate(load, args.duration, send)
+    else:
+        await run_fixed_concurrency(int(load), args.duration, send)
+    elapsed = loop.time() - start
+    # Com vários workers, as métricas chegam ao /metrics a cada METRICS_FLUSH_INTERVAL
+    if args.workers > 1:
+        await asyncio.sleep(1.0)
+    after = await _scrape_counters(client, api_url, llm_url)
+    delta = {name: after[name] - before[name] for name in after}
+
+    ok = [result for result in results if result[2] == "200"]
+    status_counts: Dict[str, int] = {}
+    for result in results:
+        status_counts[result[2]] = status_counts.get(result[2], 0) + 1
+    hits = delta["cache_hits_total"] + delta["cache_l2_hits_total"]
+    # Com o segundo nível, uma falta no L1 pode ser acerto no L2
+    misses = delta["cache_l2_misses_total"] if args.env.get("CACHE_BACKEND") == "sqlite" else delta["cache_misses_total"]
+    return {
+        "name": f"{kind}={load:g} repeat={repeat_ratio:g}",
+        "kind": kind,
+        "load": load,
+        "repeat_ratio": repeat_ratio,
+        "duration_s": round(elapsed, 3),
+        "requests": len(results),
+        "status_counts": status_counts,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": _latency_summary([result[1] for result in ok]),
+        "latency_ms_repeated": _latency_summary([result[1] for result in ok if result[3]]),
+        "latency_ms_unique": _latency_summary([result[1] for result in ok if not result[3]]),
+        "cache": {
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "coalesced": int(delta["singleflight_coalesced_total"]),
+        },
+        "llm_requests": int(delta["llm_requests"]),
+        "llm_requests_per_request": round(delta["llm_requests"] / len(ok), 3) if ok else 0.0,
+    }
+
+
+def _print_header() -> None:
+    print(f"{'scenario':<26} {'req':>6} {'err%':>6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'hit%':>6} {'llm/req':>8}")
+
+
+def _print_scenario(scenario: Dict[str, Any]) -> None:
+    latency = scenario["latency_ms"] or {"p50": float("nan"), "p95": float("nan"), "p99": float("nan")}
+    print(
+        f"{scenario['name']:<26} {scenario['requests']:>6} {scenario['error_rate'] * 100:>6.1f} "
+        f"{scenario['throughput_rps']:>8.1f} {latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} "
+        f"{scenario['cache']['hit_rate'] * 100:>6.1f} {scenario['llm_requests_per_request']:>8.2f}"
+    )
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> bool:
+    """Imprime a variação por cenário; retorna True se houve regressão além da tolerância."""
+    previous = {scenario["name"]: scenario for scenario in baseline["scenarios"]}
+    regressed = False
+    print(f"\ncomparison with {baseline.get('commit', '?')} (tolerance {tolerance:.0%})")
+    print(f"{'scenario':<26} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for scenario in current["scenarios"]:
+        old = previous.get(scenario["name"])
+        if old is None or not old["latency_ms"] or not scenario["latency_ms"]:
+            continue
+
+        def change(new: float, before: float) -> float:
+            return (new - before) / before if before else 0.0
+
+        throughput = change(scenario["throughput_rps"], old["throughput_rps"])
+        latencies = {q: change(scenario["latency_ms"][q], old["latency_ms"][q]) for q in ("p50", "p95", "p99")}
+        # Vazão menor ou cauda (p95/p99) maior do que a tolerância contam como regressão
+        flagged = throughput < -tolerance or latencies["p95"] > tolerance or latencies["p99"] > tolerance
+        regressed |= flagged
+        print(
+            f"{scenario['name']:<26} {throughput:>+9.1%} {latencies['p50']:>+9.1%} "
+            f"{latencies['p95']:>+9.1%} {latencies['p99']:>+9.1%}{'  REGRESSION' if flagged else ''}"
+        )
+    return regressed
+
+
+async def run_benchmark(args: argparse.Namespace, api_url: str, llm_url: str) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        # Aquecimento: imports preguiçosos e conexões da API com o servidor falso
+        for number in range(5):
+            await client.post(
+                f"{api_url}/api/v1/analyze",
+                json={"text": f"{SAMPLE_TEXT} Aquecimento {number}."},
+                headers={"X-API-Key": API_KEY}
+            )
+        loads = [("rps", rps) for rps in args.rps] + [("concurrency", level) for level in args.concurrency]
+        scenarios = []
+        _print_header()
+        for kind, load in loads:
+            for repeat_ratio in args.repeat_ratios:
+                scenario = await run_scenario(client, api_url, llm_url, kind, load, repeat_ratio, args, len(scenarios))
+                _print_scenario(scenario)
+                scenarios.append(scenario)
+                await asyncio.sleep(args.pause)
+        return scenarios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rps", type=float, nargs="*", default=[10, 50], help="Taxas fixas (requisições/s)")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 20], help="Níveis de concorrência fixa")
+    parser.add_argument("--repeat-ratios", type=float, nargs="+", default=[0.0, 0.8], help="Frações de textos repetidos")
+    parser.add_argument("--hot-texts", type=int, default=20, help="Textos distintos no conjunto repetido")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração de cada cenário (s)")
+    parser.add_argument("--pause", type=float, default=1.0, help="Pausa entre cenários (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout por requisição (s)")
+    parser.add_argument("--mode", choices=["graph", "fused"], default=None, help="Campo `mode` das requisições")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn")
+    parser.add_argument("--env", nargs="*", default=[], metavar="NAME=VALUE", help="Variáveis extras para a API (ex.: CACHE_BACKEND=sqlite)")
+    parser.add_argument("--output", default=None, help="Arquivo JSON dos resultados (padrão: benchmarks/results/)")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Variação tolerada na comparação (fração)")
+    add_latency_arguments(parser)
+    args = parser.parse_args()
+    args.env = dict(item.split("=", 1) for item in args.env)
+
+    llm_port, api_port = _free_port(), _free_port()
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    api_url = f"http://127.0.0.1:{api_port}"
+
+    with tempfile.TemporaryDirectory(prefix="load_test_") as workdir:
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "benchmark",
+            "API_KEY": API_KEY,
+            "LLM_BASE_URL": f"{llm_url}/v1",
+            # O teste mede a API, não o rate limiter
+            "RATE_LIMIT_PER_MINUTE": "1000000000",
+            "LOG_DIR": os.path.join(workdir, "logs"),
+            "CACHE_SQLITE_PATH": os.path.join(workdir, "cache.sqlite3"),
+            "RATE_LIMIT_SQLITE_PATH": os.path.join(workdir, "rate_limit.sqlite3"),
+            **({"METRICS_DIR": os.path.join(workdir, "metrics"), "METRICS_FLUSH_INTERVAL": "0.5"} if args.workers > 1 else {}),
+            **args.env,
+        }
+        server_log = open(os.path.join(workdir, "processes.log"), "w")
+        processes = []
+        try:
+            processes.append(subprocess.Popen(
+                [sys.executable, str(PROJECT_ROOT / "benchmarks" / "fake_openai_server.py"), "--port", str(llm_port), *latency_arguments(args)],
+                cwd=PROJECT_ROOT, stdout=server_log, stderr=subprocess.STDOUT
+            ))
+            _wait_until_ready(f"{llm_url}/stats", processes[0])
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port),
+                 "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+                cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=server_log
+            ))
+            # /ready só responde 200 depois do aquecimento da API
+            _wait_until_ready(f"{api_url}/ready", processes[1])
+            scenarios = asyncio.run(run_benchmark(args, api_url, llm_url))
+        except Exception:
+            server_log.flush()
+            sys.stderr.write(Path(server_log.name).read_text()[-4000:])
+            raise
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=10)
+            server_log.close()
+
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            name: value for name, value in vars(args).items()
+            if name not in ("output", "compare", "tolerance")
+        },
+        "scenarios": scenarios,
+    }
+    output = Path(args.output or PROJECT_ROOT / "benchmarks" / "results" / f"load_test_{commit}_{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"\nresults saved to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(baseline, results, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Microbenchmark do custo de RateLimiter.check_rate_limit com muitas chaves ativas.
+
+Compara o token bucket em memória, o backend compartilhado em SQLite e a
+implementação anterior (lista de datetimes por chave, O(limite) por chamada).
+
+Uso:
+    python benchmarks/rate_limiter_benchmark.py --keys 10000 --calls 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("API_KEY", "benchmark")
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.core.rate_limiter import (  # noqa: E402
+    IDLE_TIMEOUT,
+    RateLimiter,
+    SQLiteRateLimitStore,
+)
+
+
+class ListRateLimiter:
+    """Implementação anterior, mantida aqui só como referência de custo."""
+
+    def __init__(self, requests_per_minute: int = 60):
+        self.requests_per_minute = requests_per_minute
+        self.requests: Dict[str, List[datetime]] = {}
+
+    def check_rate_limit(self, api_key: str, cost: int = 1) -> None:
+        current_time = datetime.now()
+        if api_key not in self.requests:
+            self.requests[api_key] = []
+        self.requests[api_key] = [
+            req_time for req_time in self.requests[api_key]
+            if current_time - req_time < timedelta(minutes=1)
+        ]
+        if len(self.requests[api_key]) + cost > self.requests_per_minute:
+            raise HTTPException(status_code=429)
+        self.requests[api_key].extend([current_time] * cost)
+
+
+def measure(limiter, keys: List[str], calls: int) -> float:
+    sequence = [random.choice(keys) for _ in range(calls)]
+    # Aquece os buckets de todas as chaves antes de medir
+    for key in keys:
+        try:
+            limiter.check_rate_limit(key)
+        except HTTPException:
+            pass
+
+    start = time.perf_counter()
+    for key in sequence:
+        try:
+            limiter.check_rate_limit(key)
+        except HTTPException:
+            pass
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=1000, help="Requisições por minuto por chave")
+    args = parser.parse_args()
+
+    keys = [f"key-{index}" for index in range(args.keys)]
+    with tempfile.TemporaryDirectory() as tmp:
+        limiters = {
+            "token bucket (memória)": RateLimiter(args.limit),
+            "token bucket (sqlite)": RateLimiter(
+                args.limit,
+                store=SQLiteRateLimitStore(os.path.join(tmp, "rl.sqlite3"), IDLE_TIMEOUT)
+            ),
+            "lista de datetimes (anterior)": ListRateLimiter(args.limit),
+        }
+        print(f"keys={args.keys} calls={args.calls} limit={args.limit}/min")
+        for name, limiter in limiters.items():
+            # O SQLite faz uma transação por chamada: menos chamadas bastam
+            calls = args.calls // 10 if "sqlite" in name else args.calls
+            spread = measure(limiter, keys, calls)
+            # Uma chave no limite: a lista anterior percorre `limit` entradas por chamada
+            hot = measure(limiter, ["hot-key"], min(calls, args.limit * 5))
+            print(f"{name:>32}: {spread:8.2f} µs/check ({args.keys} chaves) {hot:8.2f} µs/check (chave saturada)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Adiciona o diretório raiz ao PYTHONPATH para importar os módulos do projeto
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# A configuração é lida na importação de app.core.config: as variáveis
+# obrigatórias precisam existir antes de qualquer import do app
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("API_KEY", "test-api-key")
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="text-analysis-logs-"))
@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.admission import AdmissionController, parse_weights
+
+
+def test_parse_weights():
+    """Testa o formato "chave:peso" dos pesos por API key."""
+    assert parse_weights("a:2, b:0.5") == {"a": 2.0, "b": 0.5}
+    assert parse_weights("") == {}
+    with pytest.raises(ValueError):
+        parse_weights("a")
+    with pytest.raises(ValueError):
+        parse_weights("a:0")
+
+
+def test_slow_latency_decreases_limit_once_per_window():
+    """Testa a redução multiplicativa, no máximo uma vez por janela."""
+    controller = AdmissionController(
+        initial_limit=10, min_limit=1, max_limit=20, target_latency=1.0, decrease=0.5
+    )
+
+    async def scenario():
+        first = await controller.acquire("key")
+        second = await controller.acquire("key")
+        # Ambas admitidas antes da redução: só a primeira conta
+        controller.release(first - 5)
+        controller.release(second - 5)
+
+    asyncio.run(scenario())
+    assert controller.limit == 5
+    assert controller.decreases == 1
+
+
+def test_fast_latency_increases_limit_when_in_use():
+    """Testa o aumento aditivo quando o limite está sendo usado."""
+    controller = AdmissionController(
+        initial_limit=2, max_limit=4, target_latency=1.0, increase=1.0
+    )
+
+    async def scenario():
+        first = await controller.acquire("key")
+        second = await controller.acquire("key")
+        controller.release(first)
+        controller.release(second)
+
+    asyncio.run(scenario())
+    # Primeira liberação com as duas vagas em uso: 2 + 1/2
+    assert controller.limit == 2.5
+    assert controller.increases == 1
+
+
+def test_limit_respects_bounds():
+    """Testa que o limite nunca sai do intervalo [min_limit, max_limit]."""
+    controller = AdmissionController(
+        initial_limit=2, min_limit=2, max_limit=4, target_latency=1.0, decrease=0.5
+    )
+
+    async def scenario():
+        admitted_at = await controller.acquire("key")
+        controller.release(admitted_at - 5)
+
+    asyncio.run(scenario())
+    assert controller.limit == 2
+
+
+def test_weighted_fair_queuing_order():
+    """Testa que uma key com muitos pedidos não atrasa a próxima key a chegar."""
+    controller = AdmissionController(initial_limit=1, max_limit=1, queue_timeout=0)
+    order = []
+
+    async def request(key: str, label: str):
+        async with controller.slot(key):
+            order.append(label)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        holder = await controller.acquire("holder")
+        tasks = [asyncio.create_task(request("a", f"a{index}")) for index in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("b", "b0")))
+        await asyncio.sleep(0)
+        controller.release(holder, measure=False)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["a0", "b0", "a1", "a2"]
+
+
+def test_weights_favor_heavier_keys():
+    """Testa que uma key com peso maior recebe mais vagas da fila."""
+    controller = AdmissionController(
+        initial_limit=1, max_limit=1, queue_timeout=0, weights={"b": 3}
+    )
+    order = []
+
+    async def request(key: str, label: str):
+        async with controller.slot(key):
+            order.append(label)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        holder = await controller.acquire("holder")
+        tasks = [asyncio.create_task(request("a", f"a{index}")) for index in range(2)]
+        tasks += [asyncio.create_task(request("b", f"b{index}")) for index in range(3)]
+        await asyncio.sleep(0)
+        controller.release(holder, measure=False)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    # Etiquetas: a = 1, 2; b = 1/3, 2/3, 1
+    assert order == ["b0", "b1", "a0", "b2", "a1"]
+
+
+def test_queue_full_rejects_with_retry_after():
+    """Testa o 503 com Retry-After quando a fila está cheia."""
+    controller = AdmissionController(
+        initial_limit=1, max_limit=1, max_queue=1, target_latency=4.0
+    )
+
+    async def scenario():
+        holder = await controller.acquire("key")
+        queued = asyncio.create_task(controller.acquire("key"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as error:
+            await controller.acquire("key")
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        controller.release(holder, measure=False)
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    # (1 na fila + 1) / 1 vaga * latência média inicial de 2 s
+    assert error.headers["Retry-After"] == "4"
+
+
+def test_queue_timeout_rejects():
+    """Testa que o pedido sai da fila com 503 depois de queue_timeout."""
+    controller = AdmissionController(initial_limit=1, max_limit=1, queue_timeout=0.01)
+
+    async def scenario():
+        holder = await controller.acquire("key")
+        with pytest.raises(HTTPException) as error:
+            await controller.acquire("key")
+        controller.release(holder, measure=False)
+        return error.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert controller.queued == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    """Testa que um pedido cancelado na fila não ocupa vaga."""
+    controller = AdmissionController(initial_limit=1, max_limit=1, queue_timeout=0)
+
+    async def scenario():
+        holder = await controller.acquire("key")
+        waiter = asyncio.create_task(controller.acquire("key"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        controller.release(holder, measure=False)
+
+    asyncio.run(scenario())
+    assert controller.queued == 0
+    assert controller.in_flight == 0
@@ -0,0 +1,215 @@
+import asyncio
+import pickle
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.cache import ResponseCache, SQLiteCacheBackend, TieredCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(clock=None, **kwargs):
+    options = {"ttl": 60, "max_items": 100, "max_bytes": 10_000, "sizeof": len}
+    options.update(kwargs)
+    return ResponseCache(clock=clock or FakeClock(), **options)
+
+
+def test_entry_expires_after_ttl():
+    """Testa que a entrada deixa de ser servida depois do TTL."""
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.set("key", "value")
+
+    clock.now += 59
+    assert cache.get("key") == "value"
+    clock.now += 1
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_ttl_per_entry():
+    """Testa que o TTL passado em set() substitui o padrão."""
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.set("short", "value", ttl=5)
+    cache.set("default", "value")
+
+    clock.now += 5
+    assert cache.get("short") is None
+    assert cache.get("default") == "value"
+
+
+def test_lru_eviction_by_bytes():
+    """Testa que o limite em bytes descarta as entradas menos usadas."""
+    # Tamanho de cada entrada: valor (10) + chave (1) = 11 bytes
+    cache = make_cache(max_bytes=33)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 10)
+    cache.set("c", "x" * 10)
+    assert cache.current_bytes == 33
+
+    # "a" passa a ser a mais recente; "b" é a próxima a sair
+    assert cache.get("a") is not None
+    cache.set("d", "x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.get("d") is not None
+    assert cache.current_bytes == 33
+    assert cache.stats()["evictions"] == 1
+
+
+def test_large_entry_is_not_stored():
+    """Testa que uma entrada maior que o cache inteiro não é armazenada nem despeja as demais."""
+    cache = make_cache(max_bytes=20)
+    cache.set("a", "x" * 5)
+    cache.set("big", "x" * 50)
+
+    assert cache.get("big") is None
+    assert cache.get("a") == "x" * 5
+
+
+def test_large_value_replaces_stale_entry():
+    """Testa que um valor grande demais remove o valor antigo da mesma chave."""
+    cache = make_cache(max_bytes=20)
+    cache.set("a", "x" * 5)
+    cache.set("a", "y" * 50)
+
+    assert cache.get("a") is None
+    assert cache.current_bytes == 0
+
+
+def test_eviction_by_item_count():
+    """Testa o limite de número de entradas."""
+    cache = make_cache(max_items=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.set("c", "3")
+
+    assert len(cache) == 2
+    assert cache.get("a") is None
+
+
+def test_make_key_depends_on_mode_and_api_key():
+    """Testa que o modo e a API key entram na chave, e que o escopo pode ser compartilhado."""
+    cache = make_cache()
+    assert cache.make_key("texto", "key-1", "graph") != cache.make_key("texto", "key-1", "fused")
+    assert cache.make_key("texto", "key-1", "graph") != cache.make_key("texto", "key-2", "graph")
+    assert cache.make_key("texto", "key-1", "graph") == cache.make_key("texto", "key-1", "graph")
+
+    shared = make_cache(share_across_keys=True)
+    assert shared.make_key("texto", "key-1", "graph") == shared.make_key("texto", "key-2", "graph")
+
+
+def make_tiered(tmp_path, clock=None):
+    l1 = make_cache(clock, sizeof=lambda value: len(pickle.dumps(value)))
+    l2 = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_items=100, busy_timeout=0.05)
+    return TieredCache(l1, l2, dumps=pickle.dumps, loads=pickle.loads)
+
+
+def test_sqlite_backend_opens_the_file_lazily(tmp_path):
+    """Testa que criar o backend não cria o arquivo; o primeiro acesso cria."""
+    path = tmp_path / "sub" / "cache.sqlite3"
+    backend = SQLiteCacheBackend(str(path), max_items=10)
+    assert not path.exists()
+
+    backend.set("key", b"value", ttl=60)
+    assert backend.get("key")[0] == b"value"
+    backend.close()
+
+
+def test_sqlite_backend_close_closes_every_thread_connection(tmp_path):
+    """Testa que close() fecha também as conexões abertas nas threads do L2."""
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_items=10)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        barrier = threading.Barrier(3)
+
+        def write(index):
+            barrier.wait()
+            backend.set(f"key-{index}", b"value", ttl=60)
+            return backend._connection()
+
+        connections = list(executor.map(write, range(3)))
+    assert len(set(map(id, connections))) == 3
+
+    backend.close()
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # Depois de fechado, um novo acesso abre outra conexão
+    assert backend.get("key-0")[0] == b"value"
+    backend.close()
+
+
+def test_tiered_cache_promotes_l2_hits(tmp_path):
+    """Testa que um acerto no L2 volta para o L1."""
+    cache = make_tiered(tmp_path)
+    cache.set("key", {"summary": "resumo"})
+    cache.l1.clear()
+
+    assert cache.get("key") == {"summary": "resumo"}
+    assert cache.l2_hits == 1
+    assert cache.l1.get("key") == {"summary": "resumo"}
+    cache.close()
+
+
+def test_tiered_cache_async_write_behind(tmp_path):
+    """Testa que aset grava no L1 na hora e no L2 em segundo plano."""
+    cache = make_tiered(tmp_path)
+
+    async def scenario():
+        await cache.aset("key", "value")
+        assert cache.l1.get("key") == "value"
+        await asyncio.gather(*cache._pending_writes)
+        cache.l1.clear()
+        return await cache.aget("key")
+
+    assert asyncio.run(scenario()) == "value"
+    cache.close()
+
+
+def test_tiered_cache_locked_l2_write_is_dropped(tmp_path):
+    """Testa que a escrita no L2 travado por outro processo falha em segundo plano, sem afetar o L1."""
+    cache = make_tiered(tmp_path)
+    lock = sqlite3.connect(str(tmp_path / "cache.sqlite3"), isolation_level=None)
+    lock.execute("BEGIN EXCLUSIVE")
+    try:
+        async def scenario():
+            await cache.aset("key", "value")
+            await asyncio.gather(*cache._pending_writes, return_exceptions=True)
+
+        asyncio.run(scenario())
+        assert cache.l2_errors == 1
+        assert cache.l1.get("key") == "value"
+    finally:
+        lock.execute("ROLLBACK")
+        lock.close()
+    cache.close()
+
+
+class FailingBackend(SQLiteCacheBackend):
+    def get(self, key):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_tiered_cache_l2_read_error_counts_as_miss(tmp_path):
+    """Testa que uma falha de leitura no L2 vira falta para o chamador."""
+    l1 = make_cache()
+    l2 = FailingBackend(str(tmp_path / "cache.sqlite3"), max_items=100)
+    cache = TieredCache(l1, l2, dumps=pickle.dumps, loads=pickle.loads)
+
+    assert asyncio.run(cache.aget("key")) is None
+    assert cache.l2_errors == 1
+    assert cache.l2_misses == 1
+    cache.close()
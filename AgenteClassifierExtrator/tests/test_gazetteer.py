@@ -0,0 +1,70 @@
+import pytest
+
+from app.services.gazetteer import Gazetteer, normalize
+
+
+def build(*entries):
+    gazetteer = Gazetteer()
+    for name, *aliases in entries:
+        gazetteer.add(name, aliases)
+    return gazetteer.build()
+
+
+def test_normalize_removes_accents_and_case():
+    """Testa a forma normalizada usada no casamento."""
+    assert normalize("São PAULO") == "sao paulo"
+
+
+def test_finds_entities_ignoring_accents_and_case():
+    """Testa o casamento sem diferenciar acentos e maiúsculas."""
+    gazetteer = build(("São Paulo",), ("Banco Central do Brasil", "Banco Central", "BC"))
+    text = "O banco central anunciou medidas em sao paulo; o BC confirmou."
+    assert gazetteer.entities(text) == ["Banco Central do Brasil", "São Paulo"]
+
+
+def test_matches_whole_words_only():
+    """Testa que uma entrada não casa dentro de outra palavra."""
+    gazetteer = build(("Rio",))
+    assert gazetteer.entities("Moro em Riozinho") == []
+    assert gazetteer.entities("Moro no Rio") == ["Rio"]
+
+
+def test_prefers_leftmost_longest_match():
+    """Testa que, entre sobreposições, vence a ocorrência mais à esquerda e mais longa."""
+    gazetteer = build(("Banco",), ("Banco Central",), ("Central do Brasil",))
+    assert gazetteer.find("o Banco Central do Brasil") == [(1, 3, "Banco Central")]
+
+
+def test_overlapping_entries_via_failure_links():
+    """Testa ocorrências encontradas pelos links de falha do autômato."""
+    gazetteer = build(("a b c",), ("b c d",), ("c",))
+    assert gazetteer.find("a b x b c d") == [(3, 6, "b c d")]
+    assert gazetteer.find("a b c d") == [(0, 3, "a b c")]
+
+
+def test_canonical_name():
+    """Testa a resolução de apelidos para o nome canônico."""
+    gazetteer = build(("Banco Central do Brasil", "BC"))
+    assert gazetteer.canonical("bc") == "Banco Central do Brasil"
+    assert gazetteer.canonical("Banco") is None
+    assert gazetteer.canonical("Outro") is None
+
+
+def test_must_be_built_before_searching_and_frozen_after():
+    """Testa a ordem obrigatória add() -> build() -> find()."""
+    gazetteer = Gazetteer()
+    gazetteer.add("Brasília")
+    with pytest.raises(RuntimeError):
+        gazetteer.find("Brasília")
+    gazetteer.build()
+    with pytest.raises(RuntimeError):
+        gazetteer.add("Recife")
+
+
+def test_from_file(tmp_path):
+    """Testa o formato do arquivo: nome canônico e apelidos separados por tabulação."""
+    path = tmp_path / "gazetteer.tsv"
+    path.write_text("# comentário\nBanco Central do Brasil\tBC\n\nSão Paulo\n", encoding="utf-8")
+    gazetteer = Gazetteer.from_file(str(path))
+    assert len(gazetteer) == 2
+    assert gazetteer.entities("BC e São Paulo") == ["Banco Central do Brasil", "São Paulo"]
@@ -0,0 +1,87 @@
+import json
+
+from app.services.local_classifier import HashedNGramClassifier, load_dataset, normalize_label
+
+TRAINING_DATA = [
+    ("O governo anunciou hoje a nova taxa de juros, informou o ministério", "Notícias"),
+    ("O presidente anunciou hoje medidas contra a inflação, informou a agência", "Notícias"),
+    ("A polícia informou hoje que o suspeito foi preso, segundo a reportagem", "Notícias"),
+    ("Neste post eu conto minha viagem e dou dicas pessoais para você", "Blog"),
+    ("Hoje no blog vou mostrar minha receita favorita, deixe seu comentário", "Blog"),
+    ("Oi pessoal, neste post compartilho minha rotina e minhas dicas", "Blog"),
+    ("Este estudo apresenta a metodologia, os resultados e a análise estatística da amostra", "Pesquisa"),
+    ("O artigo avalia a hipótese com um experimento controlado e análise estatística", "Pesquisa"),
+    ("Os resultados do estudo indicam correlação significativa na amostra analisada", "Pesquisa"),
+    ("Lista de compras: arroz, feijão, café e açúcar", "Outro"),
+    ("Lembrete: reunião de condomínio às oito, levar documentos", "Outro"),
+    ("Senha do wifi e horário de funcionamento da portaria", "Outro"),
+]
+
+
+def train() -> HashedNGramClassifier:
+    texts, labels = zip(*TRAINING_DATA)
+    return HashedNGramClassifier(n_features=2 ** 12).fit(texts, labels, epochs=30)
+
+
+def test_normalize_label():
+    """Testa a normalização das respostas do LLM para as quatro categorias."""
+    assert normalize_label("Categoria: Notícias.") == "Notícias"
+    assert normalize_label("noticias") == "Notícias"
+    assert normalize_label("PESQUISA") == "Pesquisa"
+    assert normalize_label("Não sei") is None
+
+
+def test_features_are_unit_norm_and_use_only_max_chars():
+    """Testa o vetor de n-gramas: norma unitária e só os primeiros max_chars caracteres."""
+    classifier = HashedNGramClassifier(n_features=2 ** 12, max_chars=20)
+    text = "uma frase qualquer " + "ignorado " * 100
+    indices, values = classifier.features(text)
+    assert abs(float((values ** 2).sum()) - 1.0) < 1e-5
+    assert indices.tolist() == classifier.features(text[:20])[0].tolist()
+
+    empty_indices, _ = classifier.features("!!!")
+    assert len(empty_indices) == 0
+
+
+def test_untrained_classifier_is_uniform():
+    """Testa que, sem treino, nenhuma categoria passa do limiar do caminho rápido."""
+    _, confidence = HashedNGramClassifier(n_features=2 ** 12).predict("qualquer texto")
+    assert abs(confidence - 0.25) < 1e-6
+
+
+def test_fit_and_predict():
+    """Testa que o classificador aprende os exemplos de treino."""
+    classifier = train()
+    for text, label in TRAINING_DATA:
+        assert classifier.predict(text)[0] == label
+    label, confidence = classifier.predict("O ministério informou hoje a nova taxa, anunciou o governo")
+    assert label == "Notícias"
+    assert confidence > 0.5
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """Testa que o modelo salvo e carregado faz as mesmas predições."""
+    classifier = train()
+    path = str(tmp_path / "classifier.npz")
+    classifier.save(path)
+    loaded = HashedNGramClassifier.load(path)
+
+    text = "Neste post eu mostro minha rotina"
+    assert loaded.labels == classifier.labels
+    assert loaded.predict(text) == classifier.predict(text)
+
+
+def test_load_dataset_reads_label_log_and_jsonl(tmp_path):
+    """Testa a leitura dos eventos do log de rótulos e de JSONL com "label"."""
+    log = tmp_path / "labels_20240101.log"
+    log.write_text("\n".join([
+        json.dumps({"event": "Classification Label", "text": "texto um", "classification": "Categoria: Blog"}),
+        "linha inválida",
+        json.dumps({"text": "texto dois", "classification": "desconhecida"}),
+    ]), encoding="utf-8")
+    dataset = tmp_path / "dataset.jsonl"
+    dataset.write_text(json.dumps({"text": "texto três", "label": "Pesquisa"}) + "\n", encoding="utf-8")
+
+    texts, labels = load_dataset([str(tmp_path / "labels_*.log"), str(dataset)])
+    assert texts == ["texto um", "texto três"]
+    assert labels == ["Blog", "Pesquisa"]
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.services.modes import LONG_MODE
+from app.services.text_analysis_service import (
+    TextAnalysisService,
+    merge_entities,
+    sample_chunk_indices,
+    split_into_chunks,
+)
+from benchmarks.fake_llm import FakeChatModel
+
+SENTENCE = "Maria Silva, presidente do Banco Central, anunciou hoje novas medidas em Brasília. "
+
+
+def make_service(**kwargs) -> TextAnalysisService:
+    return TextAnalysisService("test-key", llm=FakeChatModel(latency=0.0), **kwargs)
+
+
+def test_short_text_is_a_single_chunk():
+    """Testa que um texto menor que o trecho não é dividido."""
+    assert split_into_chunks("  texto curto  ", chunk_size=100, overlap=10) == ["texto curto"]
+
+
+def test_chunks_respect_size_and_cover_the_text():
+    """Testa o tamanho máximo dos trechos e que nenhum trecho do texto se perde."""
+    text = SENTENCE * 40
+    chunks = split_into_chunks(text, chunk_size=300, overlap=50)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert chunks[0].startswith("Maria Silva")
+    assert text.strip().endswith(chunks[-1])
+    # Cortes em fim de frase sempre que possível
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_neighbouring_chunks_overlap():
+    """Testa que trechos vizinhos repetem o fim do anterior, para não perder entidades na fronteira."""
+    words = " ".join(f"palavra{index}" for index in range(200))
+    chunks = split_into_chunks(words, chunk_size=120, overlap=30)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        first_word = current.split()[0]
+        assert first_word in previous.split()
+
+
+def test_overlap_must_be_smaller_than_chunk():
+    """Testa a validação da sobreposição."""
+    with pytest.raises(ValueError):
+        split_into_chunks("texto", chunk_size=10, overlap=10)
+
+
+def test_sample_chunk_indices_includes_first_and_last():
+    """Testa a amostragem uniforme dos trechos usados na classificação."""
+    assert sample_chunk_indices(10, 3) == [0, 4, 9]
+    assert sample_chunk_indices(2, 3) == [0, 1]
+    assert sample_chunk_indices(10, 1) == [0]
+
+
+def test_merge_entities_deduplicates_ignoring_case_and_spaces():
+    """Testa a junção das entidades dos trechos mantendo a primeira grafia."""
+    merged = merge_entities([["Maria Silva", "Banco Central"], ["maria  silva", "Brasília."], [" "]])
+    assert merged == ["Maria Silva", "Banco Central", "Brasília"]
+
+
+def test_reduce_summaries_in_rounds():
+    """Testa a redução em árvore: grupos do tamanho de um trecho, resumidos até sobrar um."""
+    service = make_service(chunk_size=100)
+    summaries = ["x" * 40] * 6
+
+    summary, rounds, calls = asyncio.run(service._areduce_summaries(summaries, asyncio.Semaphore(4)))
+
+    # 1ª rodada: 3 grupos de 2; 2ª rodada: os 3 resumos curtos cabem em um grupo
+    assert (rounds, calls) == (2, 4)
+    assert summary == "Resumo gerado pelo modelo falso."
+
+
+def test_reduce_always_makes_progress_with_long_summaries():
+    """Testa que cada grupo tem ao menos dois resumos, mesmo maiores que o trecho."""
+    service = make_service(chunk_size=100)
+    _, rounds, calls = asyncio.run(service._areduce_summaries(["x" * 500] * 3, asyncio.Semaphore(4)))
+    assert (rounds, calls) == (2, 3)
+
+
+def test_long_mode_end_to_end():
+    """Testa o map-reduce completo do modo "long"."""
+    service = make_service(chunk_size=300, chunk_overlap=50, classification_sample_chunks=2)
+    result = asyncio.run(service.aanalyze_text(SENTENCE * 20, mode=LONG_MODE))
+
+    assert result["classification"] == "Notícias"
+    assert result["entities"] == ["Maria Silva", "Banco Central", "Brasília"]
+    assert result["summary"] == "Resumo gerado pelo modelo falso."
@@ -0,0 +1,115 @@
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.rate_limiter import InMemoryRateLimitStore, RateLimiter, SQLiteRateLimitStore
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(requests_per_minute: int = 60, clock=None) -> RateLimiter:
+    store = InMemoryRateLimitStore(idle_timeout=60.0, clock=clock or FakeClock())
+    return RateLimiter(requests_per_minute, store=store)
+
+
+def test_burst_up_to_capacity_then_429_with_retry_after():
+    """Testa a rajada até a capacidade e o Retry-After da primeira rejeição."""
+    limiter = make_limiter(60)
+    for _ in range(60):
+        limiter.check_rate_limit("key")
+
+    with pytest.raises(HTTPException) as error:
+        limiter.check_rate_limit("key")
+    assert error.value.status_code == 429
+    # Reabastece 1 token por segundo: falta 1 token
+    assert error.value.headers["Retry-After"] == "1"
+    assert limiter.stats()["rejections"] == 1
+
+
+def test_bucket_refills_over_time():
+    """Testa que o bucket é reabastecido continuamente à taxa do limite."""
+    clock = FakeClock()
+    limiter = make_limiter(60, clock)
+    for _ in range(60):
+        limiter.check_rate_limit("key")
+
+    clock.now += 2.5
+    limiter.check_rate_limit("key")
+    limiter.check_rate_limit("key")
+    with pytest.raises(HTTPException):
+        limiter.check_rate_limit("key")
+
+
+def test_batch_cost_retry_after():
+    """Testa que um lote consome várias unidades e o Retry-After cobre o que falta."""
+    limiter = make_limiter(30)
+    limiter.check_rate_limit("key", cost=25)
+
+    with pytest.raises(HTTPException) as error:
+        limiter.check_rate_limit("key", cost=10)
+    # Restam 5 tokens, faltam 5, a 0,5 token por segundo: 10 s
+    assert error.value.headers["Retry-After"] == "10"
+    # O lote rejeitado não consome nada
+    limiter.check_rate_limit("key", cost=5)
+
+
+def test_keys_are_independent():
+    """Testa que cada API key tem o seu próprio bucket."""
+    limiter = make_limiter(1)
+    limiter.check_rate_limit("a")
+    limiter.check_rate_limit("b")
+    with pytest.raises(HTTPException):
+        limiter.check_rate_limit("a")
+
+
+def test_idle_keys_are_evicted():
+    """Testa que chaves ociosas por mais que o tempo de reabastecimento são descartadas."""
+    clock = FakeClock()
+    store = InMemoryRateLimitStore(idle_timeout=60.0, clock=clock)
+    limiter = RateLimiter(60, store=store)
+    limiter.check_rate_limit("old")
+    clock.now += 61
+    limiter.check_rate_limit("new")
+    assert len(store) == 1
+
+
+def test_sqlite_store_shares_buckets_between_instances(tmp_path):
+    """Testa que dois limitadores (workers) sobre o mesmo arquivo dividem o limite."""
+    path = str(tmp_path / "rate_limit.sqlite3")
+    first = RateLimiter(2, store=SQLiteRateLimitStore(path, idle_timeout=60.0))
+    second = RateLimiter(2, store=SQLiteRateLimitStore(path, idle_timeout=60.0))
+    first.check_rate_limit("key")
+    second.check_rate_limit("key")
+    with pytest.raises(HTTPException):
+        first.check_rate_limit("key")
+
+
+@pytest.mark.parametrize("fail_open", [True, False])
+def test_locked_sqlite_store_fails_fast(tmp_path, fail_open):
+    """Testa que, com o arquivo travado, a verificação assíncrona decide rápido conforme fail_open."""
+    path = str(tmp_path / "rate_limit.sqlite3")
+    store = SQLiteRateLimitStore(path, idle_timeout=60.0, busy_timeout=0.01)
+    limiter = RateLimiter(60, store=store, fail_open=fail_open)
+
+    lock = sqlite3.connect(path, isolation_level=None)
+    lock.execute("BEGIN EXCLUSIVE")
+    try:
+        if fail_open:
+            asyncio.run(limiter.acheck_rate_limit("key"))
+        else:
+            with pytest.raises(HTTPException) as error:
+                asyncio.run(limiter.acheck_rate_limit("key"))
+            assert error.value.status_code == 429
+            assert error.value.headers["Retry-After"] == "1"
+    finally:
+        lock.execute("ROLLBACK")
+        lock.close()
+    assert limiter.stats()["store_errors"] == 1
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Testa que chamadas simultâneas com a mesma chave executam o trabalho uma vez só."""
+    flight = SingleFlight()
+    executions = 0
+
+    async def work():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return "resultado"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["resultado"] * 5
+    assert executions == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+
+def test_exception_is_shared_and_not_cached():
+    """Testa que a exceção chega a todos os chamadores e a chave é liberada depois."""
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("falhou")
+
+    async def scenario():
+        results = await asyncio.gather(
+            flight.do("key", failing), flight.do("key", failing), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+        async def succeeding():
+            return "ok"
+
+        return await flight.do("key", succeeding)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert flight.stats()["calls"] == 2
+
+
+def test_cancelling_one_waiter_keeps_the_work_running():
+    """Testa que o cancelamento de um chamador não afeta os demais."""
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "resultado"
+
+    async def scenario():
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "resultado"
+
+
+def test_last_waiter_cancellation_cancels_the_work_and_frees_the_key():
+    """Testa que, sem mais interessados, o trabalho é cancelado e a chave sai na hora."""
+    flight = SingleFlight()
+    started = []
+    finished = []
+
+    async def work():
+        started.append(True)
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            finished.append("cancelled")
+            raise
+        return "antigo"
+
+    async def fresh():
+        return "novo"
+
+    async def scenario():
+        waiter = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # A chave já saiu do mapa antes da task terminar de cancelar: quem
+        # chega agora dispara um trabalho novo em vez de herdar o cancelamento
+        assert flight.stats()["in_flight"] == 0
+        result = await flight.do("key", fresh)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "novo"
+    assert started == [True]
+    assert finished == ["cancelled"]
+    assert flight.stats()["calls"] == 2
@@ -0,0 +1,318 @@
+"""
+Campanha de cobrança em lote: gera a abordagem de todos os clientes de um
+segmento da carteira, sem o atendimento interativo.
+
+Cada cliente passa pelo mesmo grafo do atendimento (identify_intent ->
+collection_agent -> compliance_prescreen -> compliance_validator) a partir
+de uma mensagem de abertura, com no máximo `--concurrency` clientes em
+andamento. Os nós do grafo são síncronos: o LangGraph os executa no
+executor padrão do event loop, que aqui tem uma thread por vaga de
+concorrência.
+
+Cada resultado vira uma linha JSON em `--output`; falhas (erro do LLM, da
+rede, limite de requisições) vão para `<output>.errors` e não contam como
+concluídas. O arquivo `<output>.checkpoint` guarda o último CPF até o qual
+todos os clientes foram gravados com sucesso, e não avança além de uma
+falha: rodar o mesmo comando de novo retoma de onde parou e tenta outra vez
+os clientes que falharam. Ao final são impressas as estatísticas da
+execução, com o uso do pool de conexões do LLM (LLMHttpClients.pool_stats).
+
+Uso:
+    python campaign.py --loan-status atrasado --min-days-overdue 31 --output campanha.jsonl
+    python campaign.py --risk-score alto --concurrency 32 --limit 1000 --output teste.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Optional, Set, TextIO
+
+from customer_repository import DEFAULT_DB_PATH, CustomerRepository, open_repository
+from main import CustomerState, build_workflow
+from llm_client import DEFAULT_BASE_URL, LLM_MAX_CONNECTIONS, get_http_clients
+
+DEFAULT_OPENING_MESSAGE = "Olá, recebi um aviso sobre o meu empréstimo. Quais são as opções para regularizar?"
+
+# Campos do segmento, na ordem dos filtros de CustomerRepository.find
+SEGMENT_FIELDS = ("loan_status", "min_days_overdue", "max_days_overdue", "risk_score")
+
+
+def recover_output(path: str) -> Set[str]:
+    """
+    CPFs já gravados com sucesso em `path`. Uma última linha incompleta
+    (processo interrompido no meio da escrita) é descartada do arquivo, e
+    linhas de erro não contam, para o cliente ser processado de novo.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    valid_bytes = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+                cpf = record["cpf"]
+            except (ValueError, KeyError):
+                break
+            if "error" not in record:
+                done.add(cpf)
+            valid_bytes += len(line)
+    if valid_bytes < os.path.getsize(path):
+        with open(path, "r+b") as file:
+            file.truncate(valid_bytes)
+    return done
+
+
+def read_checkpoint(path: str, segment: Dict[str, Any]) -> Optional[str]:
+    """Último CPF do checkpoint, se houver um para o mesmo segmento."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        checkpoint = json.load(file)
+    if checkpoint["segment"] != segment:
+        raise ValueError(
+            f"Checkpoint {path} belongs to segment {checkpoint['segment']}; "
+            "use another --output or remove the checkpoint"
+        )
+    return checkpoint["after_cpf"]
+
+
+def write_checkpoint(path: str, segment: Dict[str, Any], after_cpf: Optional[str], stats: Dict[str, Any]) -> None:
+    # Escrita atômica: um checkpoint pela metade não pode ser lido na retomada
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump({"segment": segment, "after_cpf": after_cpf, **stats}, file, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+class CampaignProgress:
+    """
+    Contadores da campanha e o CPF até o qual todos os clientes terminaram
+    com sucesso. Depois da primeira falha o checkpoint para de avançar, para
+    a retomada passar de novo pelo cliente que falhou.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.processed = 0
+        self.approved = 0
+        self.errors = 0
+        self.started_at = time.perf_counter()
+        # CPFs na ordem de despacho; o prefixo concluído avança o checkpoint
+        self._dispatched: Deque[str] = deque()
+        self._finished: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._frozen = False
+        self.after_cpf: Optional[str] = None
+
+    def dispatch(self, cpf: str) -> None:
+        if not self._frozen:
+            self._dispatched.append(cpf)
+
+    def finish(self, cpf: str, approved: Optional[bool]) -> None:
+        self.processed += 1
+        if approved is None:
+            self.errors += 1
+        elif approved:
+            self.approved += 1
+        if self._frozen:
+            return
+        (self._failed if approved is None else self._finished).add(cpf)
+        while self._dispatched and self._dispatched[0] in self._finished:
+            self.after_cpf = self._dispatched.popleft()
+            self._finished.discard(self.after_cpf)
+        if self._dispatched and self._dispatched[0] in self._failed:
+            # O checkpoint fica antes da falha até o fim desta execução
+            self._frozen = True
+            self._dispatched.clear()
+            self._finished.clear()
+            self._failed.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started_at
+        completed = self.processed - self.errors
+        return {
+            "processed": self.processed,
+            "approved": self.approved,
+            "errors": self.errors,
+            "throughput_per_s": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "approval_rate": round(self.approved / completed, 4) if completed else 0.0,
+            "elapsed_s": round(elapsed, 1),
+        }
+
+    def report(self) -> str:
+        stats = self.stats()
+        remaining = max(self.total - self.processed, 0)
+        eta = remaining / stats["throughput_per_s"] if stats["throughput_per_s"] else float("inf")
+        return (
+            f"{self.processed}/{self.total} clientes | {stats['throughput_per_s']:.2f}/s | "
+            f"aprovação {stats['approval_rate']:.1%} | erros {self.errors} | "
+            f"restante {eta / 60:.1f} min"
+        )
+
+
+async def process_customer(app, customer: Dict[str, Any], opening_message: str) -> Dict[str, Any]:
+    """Roda o grafo para um cliente e devolve a linha do resultado."""
+    cpf = customer.pop("cpf")
+    state = CustomerState(
+        **customer,
+        chat_history=[],
+        customer_intent=opening_message,
+        agent_response="",
+        approved=False,
+        result=""
+    )
+    start_time = time.perf_counter()
+    try:
+        final_state = await app.ainvoke(state)
+    except Exception as e:
+        return {
+            "cpf": cpf,
+            "customer_name": customer["customer_name"],
+            "error": f"{type(e).__name__}: {e}",
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+        }
+    return {
+        "cpf": cpf,
+        "customer_name": customer["customer_name"],
+        "loan_status": customer["loan_status"],
+        "days_overdue": customer["days_overdue"],
+        "customer_intent": final_state.get("customer_intent", ""),
+        "agent_response": final_state.get("agent_response", ""),
+        "approved": final_state.get("approved", False),
+        "compliance_check": final_state.get("compliance_check", ""),
+        "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+    }
+
+
+async def run_campaign(
+    app,
+    repository: CustomerRepository,
+    segment: Dict[str, Any],
+    output_path: str,
+    opening_message: str = DEFAULT_OPENING_MESSAGE,
+    concurrency: int = 16,
+    limit: Optional[int] = None,
+    checkpoint_every: int = 100,
+    report_interval: float = 10.0,
+    log: TextIO = sys.stderr
+) -> Dict[str, Any]:
+    """
+    Processa o segmento com no máximo `concurrency` clientes ao mesmo tempo,
+    gravando cada resultado em `output_path` e o checkpoint a cada
+    `checkpoint_every` resultados. Retorna as estatísticas finais.
+    """
+    checkpoint_path = f"{output_path}.checkpoint"
+    errors_path = f"{output_path}.errors"
+    after_cpf = read_checkpoint(checkpoint_path, segment)
+    done = recover_output(output_path)
+    total = repository.count(**segment) - len(done)
+    if limit is not None:
+        total = min(total, limit)
+    progress = CampaignProgress(total)
+    progress.after_cpf = after_cpf
+    print(f"Campanha {segment}: {total} clientes a processar ({len(done)} já gravados)", file=log)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: Set[asyncio.Task] = set()
+    output = open(output_path, "a", encoding="utf-8")
+    errors = open(errors_path, "a", encoding="utf-8")
+
+    def save(task: asyncio.Task) -> None:
+        # Roda no event loop ao fim de cada cliente: uma escrita por vez
+        semaphore.release()
+        tasks.discard(task)
+        if task.cancelled():
+            return
+        record = task.result()
+        (errors if "error" in record else output).write(json.dumps(record, ensure_ascii=False) + "\n")
+        progress.finish(record["cpf"], None if "error" in record else record["approved"])
+        if progress.processed % checkpoint_every == 0:
+            output.flush()
+            write_checkpoint(checkpoint_path, segment, progress.after_cpf, progress.stats())
+
+    async def report_loop() -> None:
+        while True:
+            await asyncio.sleep(report_interval)
+            print(progress.report(), file=log)
+
+    reporter = asyncio.ensure_future(report_loop())
+    try:
+        dispatched = 0
+        for customer in repository.find(**segment, after_cpf=after_cpf):
+            if limit is not None and dispatched >= limit:
+                break
+            if customer["cpf"] in done:
+                continue
+            await semaphore.acquire()
+            progress.dispatch(customer["cpf"])
+            task = asyncio.ensure_future(process_customer(app, customer, opening_message))
+            tasks.add(task)
+            task.add_done_callback(save)
+            dispatched += 1
+        while tasks:
+            await asyncio.wait(set(tasks))
+    finally:
+        reporter.cancel()
+        # Interrompida (Ctrl+C): o checkpoint só cobre o que já foi gravado
+        output.flush()
+        output.close()
+        errors.close()
+        write_checkpoint(checkpoint_path, segment, progress.after_cpf, progress.stats())
+    print(progress.report(), file=log)
+    return progress.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Campanha de cobrança em lote sobre um segmento da carteira")
+    parser.add_argument("--output", required=True, help="Arquivo JSONL dos resultados (retomável)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Base de clientes em SQLite")
+    parser.add_argument("--loan-status", default=None)
+    parser.add_argument("--min-days-overdue", type=int, default=None)
+    parser.add_argument("--max-days-overdue", type=int, default=None)
+    parser.add_argument("--risk-score", default=None)
+    parser.add_argument("--opening-message", default=DEFAULT_OPENING_MESSAGE, help="Mensagem de abertura usada para todos os clientes")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes processados ao mesmo tempo")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de clientes nesta execução")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Intervalo (s) do relatório de progresso")
+    args = parser.parse_args()
+
+    segment = {
+        field: getattr(args, field) for field in SEGMENT_FIELDS if getattr(args, field) is not None
+    }
+    repository = open_repository(args.db)
+    app = build_workflow()
+    get_http_clients().warm_up(
+        DEFAULT_BASE_URL, os.getenv("OPENAI_API_KEY", ""), min(args.concurrency, LLM_MAX_CONNECTIONS)
+    )
+
+    async def run() -> Dict[str, Any]:
+        # Uma thread por vaga: os nós síncronos do grafo rodam no executor padrão
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+        return await run_campaign(
+            app,
+            repository,
+            segment,
+            args.output,
+            opening_message=args.opening_message,
+            concurrency=args.concurrency,
+            limit=args.limit,
+            checkpoint_every=args.checkpoint_every,
+            report_interval=args.report_interval
+        )
+
+    stats = asyncio.run(run())
+    # Requisições ao LLM x conexões abertas: mostra se o pool está sendo reaproveitado
+    stats["llm_pool"] = get_http_clients().pool_stats()
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
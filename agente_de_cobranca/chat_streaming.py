@@ -0,0 +1,192 @@
+"""
+Execução do atendimento interativo com a resposta do collection_agent
+exibida à medida que os tokens chegam, em vez de esperar o grafo inteiro.
+
+A aprovação final continua sendo a do grafo (compliance_prescreen e
+compliance_validator). O que é exibido antes dela depende do modo:
+    "buffer"    (padrão) nada é exibido antes da aprovação final; só mede
+                os tempos
+    "sentence"  só para clientes cuja resposta dispensaria a auditoria pelo
+                LLM (can_skip_audit, conforme COMPLIANCE_SKIP_POLICY): cada
+                trecho terminado em fim de frase passa pela triagem local e
+                é exibido se nada for encontrado; a partir do primeiro
+                trecho com achados, o restante fica retido até a aprovação
+                final. Nesses turnos a decisão não passa pelo LLM, então o
+                que já foi exibido passou pela mesma triagem que aprova a
+                resposta. Para os demais clientes, funciona como "buffer"
+    "off"       execução sem streaming (app.invoke)
+
+Por turno são medidos o tempo até o primeiro token do collection_agent, até
+o primeiro texto exibido e o total, impressos em stderr.
+
+Configuração por variáveis de ambiente:
+    CHAT_STREAMING          "buffer", "sentence" ou "off"
+    CHAT_METRICS_LOG_PATH   JSONL com as medidas de cada turno (opcional)
+"""
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from compliance_rules import PASS, VIOLATION, can_skip_audit, prescreen_response
+
+load_dotenv()
+
+CHAT_STREAMING = os.getenv("CHAT_STREAMING", "buffer").lower()
+CHAT_METRICS_LOG_PATH = os.getenv("CHAT_METRICS_LOG_PATH", "")
+
+STREAMED_NODE = "collection_agent"
+HELD_FOR_REVIEW_MESSAGE = "[Resposta em revisão: um atendente humano dará continuidade ao atendimento.]"
+
+# Fim de frase: pontuação seguida de espaço, ou quebra de linha. "R$ 1.500,00"
+# e "12x." no fim do texto só fecham a frase quando vier o próximo espaço.
+_SENTENCE_END = re.compile(r"[.!?:;]\s+|\n+")
+
+
+class SentenceGate:
+    """
+    Decide quais trechos da resposta em andamento podem ser exibidos antes
+    da aprovação final.
+    """
+
+    def __init__(self, limits: Dict[str, Any], mode: str = "sentence"):
+        self.limits = limits
+        self.holding = mode == "buffer"
+        self.blocked = False
+        self.reasons: List[str] = []
+        self._pending = ""
+        self._released = ""
+        self._held: List[str] = []
+        self._started = False
+
+    def _screen(self, text: str) -> List[str]:
+        if not self.holding:
+            # Triagem sobre tudo o que já foi liberado mais o trecho novo, para
+            # pegar também o que atravessa o fim de uma frase
+            screen = prescreen_response(self._released + text, self.limits)
+            if screen.verdict == PASS:
+                self._released += text
+                return [text]
+            self.holding = True
+            self.blocked = screen.verdict == VIOLATION
+            self.reasons += screen.reasons
+        self._held.append(text)
+        return []
+
+    def feed(self, token: str) -> List[str]:
+        """Acrescenta um token e devolve os trechos liberados para exibição."""
+        if not self._started:
+            token = token.lstrip()
+            self._started = bool(token)
+        self._pending += token
+        boundary = None
+        for boundary in _SENTENCE_END.finditer(self._pending):
+            pass
+        if boundary is None:
+            return []
+        complete, self._pending = self._pending[:boundary.end()], self._pending[boundary.end():]
+        return self._screen(complete)
+
+    def finish(self, approved: bool) -> List[str]:
+        """Fim da resposta: libera o que estava retido se a resposta foi aprovada."""
+        # O último trecho (sem fim de frase) pode ser liberado pela triagem
+        # sem passar por `_held`
+        tail = self._screen(self._pending.rstrip()) if self._pending.strip() else []
+        self._pending = ""
+        held, self._held = self._held, []
+        return tail + held if approved and not self.blocked else []
+
+
+def log_turn(metrics: Dict[str, Any], log_path: str = CHAT_METRICS_LOG_PATH) -> None:
+    print(
+        f"[primeiro token {metrics['ttft_s']}s | primeira exibição {metrics['first_output_s']}s | "
+        f"total {metrics['total_s']}s | {metrics['compliance_check'] or 'sem triagem'}]",
+        file=sys.stderr
+    )
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+
+
+def stream_turn(
+    app,
+    state: Dict[str, Any],
+    limits: Dict[str, Any],
+    mode: str = CHAT_STREAMING,
+    write: Callable[[str], Any] = sys.stdout.write
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Executa um turno do atendimento exibindo a resposta do collection_agent
+    conforme é gerada.
+
+    Args:
+        app: Grafo compilado (build_workflow)
+        state: Estado do cliente com a mensagem do turno
+        limits: Limites de negociação do cliente, usados na triagem parcial
+        mode: "buffer" ou "sentence"
+        write: Destino do texto exibido
+
+    Returns:
+        O estado final do grafo e as medidas do turno
+    """
+    if mode not in ("sentence", "buffer"):
+        raise ValueError(f"Invalid CHAT_STREAMING mode '{mode}'")
+    # A exibição antecipada só vale quando a triagem local já bastaria para
+    # aprovar a resposta; nos demais casos, tudo espera o compliance_validator.
+    # A decisão (que inclui a amostragem) é tomada uma vez e segue no estado,
+    # para o compliance_prescreen não sortear de novo
+    early = mode == "sentence" and can_skip_audit(state)
+    state = {**state, "compliance_skip_audit": early}
+    gate = SentenceGate(limits, "sentence" if early else "buffer")
+    started_at = time.perf_counter()
+    first_token_at: Optional[float] = None
+    first_output_at: Optional[float] = None
+    final_state = state
+
+    def show(chunks: List[str]) -> None:
+        nonlocal first_output_at
+        for chunk in chunks:
+            if first_output_at is None:
+                first_output_at = time.perf_counter()
+            write(chunk)
+            sys.stdout.flush()
+
+    # "messages" traz os tokens de cada chamada ao LLM; "values", o estado após cada nó
+    for stream_mode, payload in app.stream(state, stream_mode=["messages", "values"]):
+        if stream_mode == "values":
+            final_state = payload
+            continue
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") != STREAMED_NODE or not chunk.content:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        show(gate.feed(chunk.content))
+
+    if first_token_at is None:
+        # Modelo sem suporte a streaming: a resposta chega inteira no estado
+        first_token_at = time.perf_counter()
+        show(gate.feed(final_state.get("agent_response", "")))
+    approved = bool(final_state.get("approved", False))
+    show(gate.finish(approved))
+    if not approved:
+        write(("\n" if first_output_at is not None else "") + HELD_FOR_REVIEW_MESSAGE)
+    write("\n")
+
+    finished_at = time.perf_counter()
+    metrics = {
+        "mode": mode,
+        "early_release": early,
+        "ttft_s": round(first_token_at - started_at, 3),
+        "first_output_s": round((first_output_at or finished_at) - started_at, 3),
+        "total_s": round(finished_at - started_at, 3),
+        "approved": approved,
+        "compliance_check": final_state.get("compliance_check", ""),
+        "held_reasons": gate.reasons,
+    }
+    log_turn(metrics)
+    return final_state, metrics
@@ -0,0 +1,220 @@
+"""
+Triagem local de conformidade das respostas do agente, antes da auditoria
+pelo LLM no compliance_validator.
+
+A triagem procura ameaças e linguagem coercitiva, valores fora dos limites
+de negociação do cliente (desconto, número de parcelas, entrada, carência e
+dia de vencimento citados na resposta) e dados sensíveis. O resultado é:
+    "violation"  violação clara: vai direto para a revisão humana
+    "uncertain"  termos que pedem julgamento (ex.: negativação): sempre auditado
+    "pass"       nada encontrado: pode dispensar a auditoria, conforme a política
+
+Configuração por variáveis de ambiente:
+    COMPLIANCE_SKIP_POLICY         "never", "low_risk" (padrão) ou "always":
+                                   quando uma resposta "pass" dispensa o LLM
+    COMPLIANCE_LOW_RISK_SCORES     riscos considerados baixos ("baixo")
+    COMPLIANCE_AUDIT_SAMPLE_RATE   fração das dispensas auditada mesmo assim (0.05)
+"""
+import os
+import random
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from intent_rules import normalize_text
+
+load_dotenv()
+
+COMPLIANCE_SKIP_POLICY = os.getenv("COMPLIANCE_SKIP_POLICY", "low_risk").lower()
+COMPLIANCE_LOW_RISK_SCORES = {
+    normalize_text(score) for score in os.getenv("COMPLIANCE_LOW_RISK_SCORES", "baixo").split(",") if score.strip()
+}
+COMPLIANCE_AUDIT_SAMPLE_RATE = float(os.getenv("COMPLIANCE_AUDIT_SAMPLE_RATE", "0.05"))
+
+VIOLATION = "violation"
+UNCERTAIN = "uncertain"
+PASS = "pass"
+
+# Ameaças, coerção e ofensas (sobre o texto normalizado, sem acentos)
+THREAT_PATTERNS = [
+    r"(voce|o senhor|a senhora) (sera|vai ser) pres[oa]",
+    r"(prisao|cadeia|policia|delegacia)",
+    r"(ligar|ligaremos|contatar|contataremos|avisar|avisaremos|procurar|procuraremos|cobrar|cobraremos)"
+    r" (para |a |ao |aos |com )?(sua|seu|seus|suas) (familia|familiares|filhos|parentes|vizinhos|colegas|chefe|empregador|trabalho)",
+    r"(vamos|iremos|vou) (expor|divulgar|publicar|contar)",
+    r"(expor|divulgar) (seu nome|sua divida|voce)",
+    r"vai se arrepender",
+    r"(ultima chance|ultimo aviso) antes d[ae]",
+    r"(tomar|tomaremos|penhorar|penhoraremos) (seus|sua|seu) (bens|casa|carro|salario)",
+    r"(caloteir[oa]|vagabund[oa]|desonest[oa]|mau pagador|ma pagadora)",
+    r"humilha\w*",
+]
+# Termos legítimos em alguns contextos (consequências, segurança), mas que
+# merecem a auditoria completa
+REVIEW_PATTERNS = [
+    r"negativa\w*",
+    r"(spc|serasa|protesto|cartorio)",
+    r"(acao|cobranca|medidas?) judicia(l|is)",
+    r"(processo|processar)",
+    r"(senha|token|codigo de seguranca)",
+    r"vergonha",
+]
+# Dados que não podem aparecer na resposta ao cliente. CPF só no formato
+# pontuado ou com os dígitos verificadores válidos, e cartão só com o dígito
+# de Luhn válido, para não confundir com números de contrato
+SENSITIVE_PATTERNS = {
+    "cpf": re.compile(r"\b(\d{3}\.\d{3}\.\d{3}-\d{2}|\d{11})\b"),
+    "cartao": re.compile(r"\b(?:\d[ -]?){12,15}\d\b"),
+    "contexto_interno": re.compile(
+        r"(contexto interno|score de risco|risk_score|risco:\s*(?:baixo|m[eé]dio|alto|muito_alto))", re.IGNORECASE
+    ),
+}
+
+_THREATS = re.compile(r"\b(?:" + "|".join(THREAT_PATTERNS) + r")\b")
+_REVIEW = re.compile(r"\b(?:" + "|".join(REVIEW_PATTERNS) + r")\b")
+
+# Valores citados na resposta (sobre o texto original, com números e símbolos)
+_MONEY = r"r\$\s*(\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[.,]\d{1,2})?)"
+_DISCOUNT = re.compile(
+    r"(\d+(?:[.,]\d+)?)\s*%\s*(?:de\s+)?desconto|desconto\s+(?:de\s+)?(?:at[eé]\s+)?(\d+(?:[.,]\d+)?)\s*%",
+    re.IGNORECASE
+)
+# Número de parcelas só em contexto de oferta ("em 12x", "parcelar em até 24
+# vezes", "proposta de 36 parcelas", "10x de R$ 150"): "já pagou 15 parcelas
+# das 24" descreve o contrato atual e não é uma proposta
+_INSTALLMENTS = re.compile(
+    r"\b(?:em|por|durante|(?:proposta|plano|acordo)\s+de)\s+(?:at[eé]\s+)?(\d{1,3})\s*"
+    r"(?:x(?![a-z])|x(?=r\$)|vezes\b|parcelas\b|presta[cç][oõ]es\b|mensalidades\b|meses\b)"
+    r"|\b(\d{1,3})\s*(?:x|vezes|parcelas|presta[cç][oõ]es|mensalidades)\s*(?:de\s+)?r\$",
+    re.IGNORECASE
+)
+_DOWN_PAYMENT = re.compile(r"entrada\s+(?:m[ií]nima\s+)?(?:de\s+)?" + _MONEY, re.IGNORECASE)
+_GRACE_PERIOD = re.compile(
+    r"car[eê]ncia\s+(?:de\s+)?(\d+)\s+dias|(\d+)\s+dias\s+de\s+car[eê]ncia", re.IGNORECASE
+)
+_DUE_DAY = re.compile(r"(?:vencimento|vencer|vence)\s+(?:todo\s+)?(?:no\s+|para\s+o\s+)?dia\s+(\d{1,2})\b", re.IGNORECASE)
+
+
+class ScreenResult(NamedTuple):
+    verdict: str
+    reasons: List[str]
+
+
+def parse_amount(value: str) -> float:
+    """Valor em reais escrito como "1.500,00", "1500,00" ou "1500.00"."""
+    if "," in value:
+        return float(value.replace(".", "").replace(",", "."))
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+", value):
+        return float(value.replace(".", ""))
+    return float(value)
+
+
+def _number(*groups: Optional[str]) -> float:
+    return parse_amount(next(group for group in groups if group))
+
+
+def is_valid_cpf(digits: str) -> bool:
+    """Confere os dois dígitos verificadores de um CPF (11 dígitos)."""
+    if len(set(digits)) == 1:
+        return False
+    for size in (9, 10):
+        total = sum(int(digit) * weight for digit, weight in zip(digits, range(size + 1, 1, -1)))
+        if (total * 10) % 11 % 10 != int(digits[size]):
+            return False
+    return True
+
+
+def is_valid_card(digits: str) -> bool:
+    """Confere o dígito de Luhn de um número de cartão."""
+    total = 0
+    for position, digit in enumerate(int(digit) for digit in reversed(digits)):
+        if position % 2:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total % 10 == 0
+
+
+def find_sensitive_data(response: str) -> List[str]:
+    """Tipos de dado sensível encontrados na resposta."""
+    found = []
+    for match in SENSITIVE_PATTERNS["cpf"].finditer(response):
+        if "." in match.group() or is_valid_cpf(match.group()):
+            found.append("cpf")
+            break
+    for match in SENSITIVE_PATTERNS["cartao"].finditer(response):
+        if is_valid_card(re.sub(r"\D", "", match.group())):
+            found.append("cartao")
+            break
+    if SENSITIVE_PATTERNS["contexto_interno"].search(response):
+        found.append("contexto_interno")
+    return found
+
+
+def check_limits(response: str, limits: Dict[str, Any]) -> List[str]:
+    """Valores citados na resposta que extrapolam os limites de negociação."""
+    violations = []
+    for match in _DISCOUNT.finditer(response):
+        discount = _number(*match.groups())
+        if discount > limits["desconto_max"] * 100 + 1e-6:
+            violations.append(f"desconto de {discount:g}% acima do máximo de {limits['desconto_max'] * 100:g}%")
+    for match in _INSTALLMENTS.finditer(response):
+        installments = int(_number(*match.groups()))
+        if installments > limits["max_parcelas"]:
+            violations.append(f"{installments} parcelas acima do máximo de {limits['max_parcelas']}")
+    for match in _DOWN_PAYMENT.finditer(response):
+        down_payment = parse_amount(match.group(1))
+        if down_payment + 0.01 < limits["min_entrada"]:
+            violations.append(f"entrada de R$ {down_payment:.2f} abaixo do mínimo de R$ {limits['min_entrada']:.2f}")
+    for match in _GRACE_PERIOD.finditer(response):
+        days = _number(*match.groups())
+        if days > limits["carencia_maxima"]:
+            violations.append(f"carência de {days:g} dias acima do máximo de {limits['carencia_maxima']}")
+    for match in _DUE_DAY.finditer(response):
+        day = int(match.group(1))
+        if not limits["vencimento_min"] <= day <= limits["vencimento_max"]:
+            violations.append(
+                f"vencimento no dia {day} fora do intervalo {limits['vencimento_min']}-{limits['vencimento_max']}"
+            )
+    return violations
+
+
+def prescreen_response(response: str, limits: Dict[str, Any]) -> ScreenResult:
+    """
+    Triagem de uma resposta do agente.
+
+    Args:
+        response: Resposta gerada pelo collection_agent
+        limits: Limites de negociação do cliente (get_negotiation_limits)
+
+    Returns:
+        O veredito e os motivos encontrados
+    """
+    text = normalize_text(response)
+    reasons = [f"linguagem coercitiva: '{match.group()}'" for match in _THREATS.finditer(text)]
+    reasons += check_limits(response, limits)
+    reasons += [f"dado sensível: {name}" for name in find_sensitive_data(response)]
+    if reasons:
+        return ScreenResult(VIOLATION, reasons)
+    review = [f"requer auditoria: '{match.group()}'" for match in _REVIEW.finditer(text)]
+    if review:
+        return ScreenResult(UNCERTAIN, review)
+    return ScreenResult(PASS, [])
+
+
+def can_skip_audit(state: Dict[str, Any], policy: str = COMPLIANCE_SKIP_POLICY) -> bool:
+    """
+    Se uma resposta "pass" pode dispensar a auditoria pelo LLM. Uma fração
+    COMPLIANCE_AUDIT_SAMPLE_RATE das dispensas é auditada mesmo assim, para
+    acompanhar a qualidade da triagem.
+    """
+    if policy == "never":
+        return False
+    if policy == "low_risk" and (
+        normalize_text(state.get("risk_score") or "") not in COMPLIANCE_LOW_RISK_SCORES
+        or state.get("loan_status") == "judicial"
+    ):
+        return False
+    if policy not in ("low_risk", "always"):
+        raise ValueError(f"Invalid COMPLIANCE_SKIP_POLICY '{policy}'")
+    return random.random() >= COMPLIANCE_AUDIT_SAMPLE_RATE
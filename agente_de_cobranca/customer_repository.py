@@ -0,0 +1,565 @@
+"""
+Base de clientes da cobrança: consulta por CPF (com ou sem pontuação) e
+seleção de segmentos por status do empréstimo, dias em atraso e risco.
+
+A implementação principal guarda a carteira em SQLite no disco, com índice
+no CPF normalizado e índices secundários em `loan_status`, `days_overdue` e
+`risk_score`; os registros mais consultados ficam em um cache LRU na frente.
+A memória do processo não cresce com o tamanho da carteira.
+
+Configuração por variáveis de ambiente:
+    CUSTOMER_DB_PATH      arquivo SQLite da carteira (customers.sqlite3)
+    CUSTOMER_CACHE_SIZE   registros mantidos no cache LRU (1024)
+
+Uso:
+    python customer_repository.py load carteira.csv        # ou .jsonl
+    python customer_repository.py generate 1000000 carteira.jsonl
+    python customer_repository.py bench --sizes 10000 100000 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DB_PATH = os.getenv("CUSTOMER_DB_PATH", "customers.sqlite3")
+DEFAULT_CACHE_SIZE = int(os.getenv("CUSTOMER_CACHE_SIZE", "1024"))
+
+# Colunas da tabela, na ordem do INSERT; as listas são gravadas como JSON
+COLUMNS = (
+    "cpf", "customer_name", "loan_status", "days_overdue", "total_debt",
+    "current_installment", "due_date", "loan_type", "risk_score",
+    "payment_history", "previous_agreements", "quitacao_disponivel",
+    "processo_judicial",
+)
+LIST_FIELDS = ("payment_history", "previous_agreements")
+INT_FIELDS = ("days_overdue",)
+FLOAT_FIELDS = ("total_debt", "current_installment", "quitacao_disponivel")
+# Campos que só existem em alguns clientes: ausentes quando vazios
+OPTIONAL_FIELDS = ("quitacao_disponivel", "processo_judicial")
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_cpf(cpf: str) -> Optional[str]:
+    """
+    CPF só com os 11 dígitos, aceitando qualquer pontuação
+    ("123.456.789-01", "12345678901", "123 456 789 01").
+
+    Returns:
+        Os dígitos do CPF, ou None se não houver 11 dígitos
+    """
+    digits = _NON_DIGITS.sub("", cpf or "")
+    return digits if len(digits) == 11 else None
+
+
+def format_cpf(cpf: str) -> str:
+    """CPF normalizado no formato xxx.xxx.xxx-xx."""
+    return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+
+
+def normalize_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte um registro lido de CSV, JSONL ou do dicionário de exemplo para
+    os tipos da tabela. Em CSV, as listas podem vir como JSON ou separadas
+    por "|".
+    """
+    record = {}
+    for field in COLUMNS:
+        value = raw.get(field)
+        if value == "":
+            value = None
+        if field in LIST_FIELDS:
+            if isinstance(value, str):
+                value = json.loads(value) if value.startswith("[") else value.split("|")
+            value = list(value or [])
+        elif value is not None and field in INT_FIELDS:
+            value = int(float(value))
+        elif value is not None and field in FLOAT_FIELDS:
+            value = float(value)
+        record[field] = value
+    cpf = normalize_cpf(str(raw.get("cpf", "")))
+    if cpf is None:
+        raise ValueError(f"Invalid CPF '{raw.get('cpf')}'")
+    record["cpf"] = cpf
+    return record
+
+
+def read_customers(path: str) -> Iterator[Dict[str, Any]]:
+    """Lê clientes de um arquivo .csv (com cabeçalho) ou .jsonl, um por vez."""
+    with open(path, encoding="utf-8", newline="") as file:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(file):
+                yield normalize_record(row)
+        else:
+            for line in file:
+                if line.strip():
+                    yield normalize_record(json.loads(line))
+
+
+def _customer_state(record: Dict[str, Any]) -> Dict[str, Any]:
+    # Registro no formato usado pelo CustomerState, sem o CPF e sem os campos
+    # opcionais vazios
+    customer = {field: record[field] for field in COLUMNS[1:] if field not in OPTIONAL_FIELDS}
+    for field in OPTIONAL_FIELDS:
+        if record.get(field) is not None:
+            customer[field] = record[field]
+    return customer
+
+
+def _copy_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    # Só as listas são mutáveis: mais barato que um deepcopy
+    return {**record, **{field: list(record[field]) for field in LIST_FIELDS if field in record}}
+
+
+class CustomerRepository(ABC):
+    """Interface da base de clientes."""
+
+    @abstractmethod
+    def get(self, cpf: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca um cliente pelo CPF, com ou sem pontuação.
+
+        Returns:
+            Uma cópia do registro (pode ser alterada pelo chamador), ou None
+        """
+
+    @abstractmethod
+    def find(
+        self,
+        loan_status: Optional[str] = None,
+        min_days_overdue: Optional[int] = None,
+        max_days_overdue: Optional[int] = None,
+        risk_score: Optional[str] = None,
+        after_cpf: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Clientes do segmento, em ordem de CPF, com o campo "cpf" incluído.
+        `after_cpf` retoma a varredura depois de um CPF já processado.
+        """
+
+    @abstractmethod
+    def count(self, **filters: Any) -> int:
+        """Número de clientes do segmento (mesmos filtros de `find`)."""
+
+    @abstractmethod
+    def bulk_load(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Insere ou substitui clientes; retorna quantos foram gravados."""
+
+    def close(self) -> None:
+        pass
+
+
+def _matches(
+    record: Dict[str, Any],
+    loan_status: Optional[str] = None,
+    min_days_overdue: Optional[int] = None,
+    max_days_overdue: Optional[int] = None,
+    risk_score: Optional[str] = None
+) -> bool:
+    return (
+        (loan_status is None or record["loan_status"] == loan_status)
+        and (min_days_overdue is None or record["days_overdue"] >= min_days_overdue)
+        and (max_days_overdue is None or record["days_overdue"] <= max_days_overdue)
+        and (risk_score is None or record["risk_score"] == risk_score)
+    )
+
+
+class InMemoryCustomerRepository(CustomerRepository):
+    """Carteira pequena mantida em um dicionário (exemplos e testes manuais)."""
+
+    def __init__(self, records: Optional[Iterable[Dict[str, Any]]] = None):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        if records is not None:
+            self.bulk_load(records)
+
+    def get(self, cpf: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(normalize_cpf(cpf))
+        return None if record is None else _copy_record(_customer_state(record))
+
+    def find(
+        self,
+        loan_status: Optional[str] = None,
+        min_days_overdue: Optional[int] = None,
+        max_days_overdue: Optional[int] = None,
+        risk_score: Optional[str] = None,
+        after_cpf: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        found = 0
+        for cpf in sorted(self._records):
+            if limit is not None and found >= limit:
+                return
+            record = self._records[cpf]
+            if (after_cpf is None or cpf > after_cpf) and _matches(
+                record, loan_status, min_days_overdue, max_days_overdue, risk_score
+            ):
+                found += 1
+                yield {"cpf": cpf, **_copy_record(_customer_state(record))}
+
+    def count(self, **filters: Any) -> int:
+        return sum(1 for record in self._records.values() if _matches(record, **filters))
+
+    def bulk_load(self, records: Iterable[Dict[str, Any]]) -> int:
+        loaded = 0
+        for raw in records:
+            record = normalize_record(raw)
+            self._records[record["cpf"]] = record
+            loaded += 1
+        return loaded
+
+
+class SQLiteCustomerRepository(CustomerRepository):
+    """
+    Carteira em SQLite. O CPF normalizado é a chave primária de uma tabela
+    WITHOUT ROWID (a busca é uma única descida na árvore B) e os filtros de
+    segmento usam índices secundários. Os de `loan_status` e `risk_score`
+    incluem o CPF, então as páginas de um segmento já saem na ordem da
+    paginação, sem ordenar o segmento inteiro a cada página.
+
+    Uma conexão por thread; o modo WAL permite leituras durante a carga.
+    """
+
+    BATCH_SIZE = 10000
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS customers (
+                cpf TEXT PRIMARY KEY,
+                customer_name TEXT NOT NULL,
+                loan_status TEXT NOT NULL,
+                days_overdue INTEGER NOT NULL,
+                total_debt REAL NOT NULL,
+                current_installment REAL NOT NULL,
+                due_date TEXT,
+                loan_type TEXT,
+                risk_score TEXT,
+                payment_history TEXT NOT NULL,
+                previous_agreements TEXT NOT NULL,
+                quitacao_disponivel REAL,
+                processo_judicial TEXT
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS customers_status ON customers (loan_status, cpf);
+            CREATE INDEX IF NOT EXISTS customers_overdue ON customers (days_overdue);
+            CREATE INDEX IF NOT EXISTS customers_risk ON customers (risk_score, cpf);
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Leituras pelo mapeamento em memória, sem cópia para o cache do SQLite
+            conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for field in LIST_FIELDS:
+            record[field] = json.loads(record[field])
+        return record
+
+    def get(self, cpf: str) -> Optional[Dict[str, Any]]:
+        normalized = normalize_cpf(cpf)
+        if normalized is None:
+            return None
+        row = self._connection().execute(
+            "SELECT * FROM customers WHERE cpf = ?", (normalized,)
+        ).fetchone()
+        return None if row is None else _customer_state(self._from_row(row))
+
+    @staticmethod
+    def _where(
+        loan_status: Optional[str] = None,
+        min_days_overdue: Optional[int] = None,
+        max_days_overdue: Optional[int] = None,
+        risk_score: Optional[str] = None,
+        after_cpf: Optional[str] = None
+    ) -> tuple:
+        conditions, params = [], []
+        for condition, value in (
+            ("loan_status = ?", loan_status),
+            ("days_overdue >= ?", min_days_overdue),
+            ("days_overdue <= ?", max_days_overdue),
+            ("risk_score = ?", risk_score),
+            ("cpf > ?", after_cpf),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def find(
+        self,
+        loan_status: Optional[str] = None,
+        min_days_overdue: Optional[int] = None,
+        max_days_overdue: Optional[int] = None,
+        risk_score: Optional[str] = None,
+        after_cpf: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        # Paginação por chave (cpf > último visto): cada página é uma consulta
+        # curta, sem manter um cursor aberto durante toda a campanha
+        remaining = limit
+        last_cpf = after_cpf
+        while remaining is None or remaining > 0:
+            page_size = self.BATCH_SIZE if remaining is None else min(self.BATCH_SIZE, remaining)
+            where, params = self._where(loan_status, min_days_overdue, max_days_overdue, risk_score, last_cpf)
+            rows = self._connection().execute(
+                f"SELECT * FROM customers{where} ORDER BY cpf LIMIT ?", (*params, page_size)
+            ).fetchall()
+            for row in rows:
+                record = self._from_row(row)
+                yield {"cpf": record["cpf"], **_customer_state(record)}
+            if len(rows) < page_size:
+                return
+            last_cpf = rows[-1]["cpf"]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def count(self, **filters: Any) -> int:
+        where, params = self._where(**filters)
+        return self._connection().execute(f"SELECT COUNT(*) FROM customers{where}", params).fetchone()[0]
+
+    def bulk_load(self, records: Iterable[Dict[str, Any]]) -> int:
+        conn = self._connection()
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        statement = f"INSERT OR REPLACE INTO customers ({', '.join(COLUMNS)}) VALUES ({placeholders})"
+        loaded = 0
+        batch: List[tuple] = []
+
+        def flush() -> None:
+            # Uma transação por lote: a carga não segura a escrita por muito tempo
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(statement, batch)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            batch.clear()
+
+        for raw in records:
+            record = normalize_record(raw)
+            batch.append(tuple(
+                json.dumps(record[field], ensure_ascii=False) if field in LIST_FIELDS else record[field]
+                for field in COLUMNS
+            ))
+            loaded += 1
+            if len(batch) >= self.BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        conn.execute("ANALYZE")
+        return loaded
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class CachedCustomerRepository(CustomerRepository):
+    """Cache LRU dos registros consultados por CPF na frente de outro repositório."""
+
+    def __init__(self, repository: CustomerRepository, max_items: int = DEFAULT_CACHE_SIZE):
+        self.repository = repository
+        self.max_items = max_items
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cpf: str) -> Optional[Dict[str, Any]]:
+        normalized = normalize_cpf(cpf)
+        if normalized is None:
+            return None
+        with self._lock:
+            record = self._entries.get(normalized)
+            if record is not None:
+                self._entries.move_to_end(normalized)
+                self.hits += 1
+                return _copy_record(record)
+            self.misses += 1
+        record = self.repository.get(normalized)
+        if record is not None and self.max_items > 0:
+            with self._lock:
+                self._entries[normalized] = record
+                while len(self._entries) > self.max_items:
+                    self._entries.popitem(last=False)
+            record = _copy_record(record)
+        return record
+
+    def find(self, **filters: Any) -> Iterator[Dict[str, Any]]:
+        # Varreduras de segmento não passam pelo cache: evitaria que uma
+        # campanha expulsasse os registros quentes
+        return self.repository.find(**filters)
+
+    def count(self, **filters: Any) -> int:
+        return self.repository.count(**filters)
+
+    def bulk_load(self, records: Iterable[Dict[str, Any]]) -> int:
+        loaded = self.repository.bulk_load(records)
+        with self._lock:
+            self._entries.clear()
+        return loaded
+
+    def stats(self) -> Dict[str, int]:
+        return {"items": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self.repository.close()
+
+
+def open_repository(
+    path: str = DEFAULT_DB_PATH,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    seed: Optional[Dict[str, Dict[str, Any]]] = None
+) -> CustomerRepository:
+    """
+    Repositório SQLite em `path` com o cache LRU na frente. Sem o arquivo e
+    com `seed` (CPF -> registro), usa só os registros de exemplo em memória.
+    """
+    if not os.path.exists(path) and seed is not None:
+        repository: CustomerRepository = InMemoryCustomerRepository(
+            {"cpf": cpf, **record} for cpf, record in seed.items()
+        )
+    else:
+        repository = SQLiteCustomerRepository(path)
+    return CachedCustomerRepository(repository, max_items=cache_size)
+
+
+# --- Linha de comando ---------------------------------------------------------
+
+LOAN_STATUSES = ("em_dia", "atrasado", "inadimplente", "renegociado", "judicial", "quitacao_proposta")
+RISK_SCORES = ("baixo", "médio", "alto", "muito_alto")
+
+
+def generate_customers(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Carteira sintética com `count` clientes e CPFs distintos."""
+    rng = random.Random(seed)
+    for index in range(count):
+        status = rng.choice(LOAN_STATUSES)
+        days_overdue = 0 if status in ("em_dia", "renegociado") else rng.randint(1, 365)
+        total_debt = round(rng.uniform(500, 50000), 2)
+        record = {
+            "cpf": f"{index * 7919 % 10 ** 11:011d}",
+            "customer_name": f"Cliente {index}",
+            "loan_status": status,
+            "days_overdue": days_overdue,
+            "total_debt": total_debt,
+            "current_installment": round(total_debt / rng.choice((12, 24, 36)), 2),
+            "due_date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(5, 25):02d}",
+            "loan_type": rng.choice(("Empréstimo Pessoal", "Crédito Pessoal", "Crédito Consignado")),
+            "payment_history": [],
+            "previous_agreements": [],
+            "risk_score": rng.choice(RISK_SCORES),
+        }
+        if status == "judicial":
+            record["processo_judicial"] = "Em andamento"
+        yield record
+
+
+def _rss_mb() -> float:
+    # Memória residente atual do processo (Linux); 0 quando indisponível
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _bench(sizes: List[int], lookups: int, cache_size: int) -> None:
+    print(f"{'clientes':>10} {'carga s':>9} {'get µs':>8} {'cache µs':>9} {'segmento ms':>12} {'Δ RSS MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            repository = SQLiteCustomerRepository(os.path.join(directory, f"bench_{size}.sqlite3"))
+            start = time.perf_counter()
+            repository.bulk_load(generate_customers(size))
+            load_seconds = time.perf_counter() - start
+            rng = random.Random(1)
+            cpfs = [format_cpf(f"{rng.randrange(size) * 7919 % 10 ** 11:011d}") for _ in range(lookups)]
+
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            for cpf in cpfs:
+                repository.get(cpf)
+            get_us = (time.perf_counter() - start) / lookups * 1e6
+
+            cached = CachedCustomerRepository(repository, max_items=cache_size)
+            hot = cpfs[:cache_size]
+            for cpf in hot:
+                cached.get(cpf)
+            start = time.perf_counter()
+            for cpf in hot:
+                cached.get(cpf)
+            cache_us = (time.perf_counter() - start) / len(hot) * 1e6
+
+            start = time.perf_counter()
+            sum(1 for _ in repository.find(loan_status="atrasado", min_days_overdue=31, limit=1000))
+            segment_ms = (time.perf_counter() - start) * 1000
+            print(f"{size:>10} {load_seconds:>9.2f} {get_us:>8.1f} {cache_us:>9.1f} {segment_ms:>12.1f} {_rss_mb() - rss_before:>+10.1f}")
+            repository.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Base de clientes da cobrança")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = subparsers.add_parser("load", help="Carrega clientes de um .csv ou .jsonl")
+    load_parser.add_argument("path")
+    load_parser.add_argument("--db", default=DEFAULT_DB_PATH)
+
+    generate_parser = subparsers.add_parser("generate", help="Gera uma carteira sintética em JSONL")
+    generate_parser.add_argument("count", type=int)
+    generate_parser.add_argument("path")
+    generate_parser.add_argument("--seed", type=int, default=0)
+
+    bench_parser = subparsers.add_parser("bench", help="Latência da busca e memória por tamanho da carteira")
+    bench_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    bench_parser.add_argument("--lookups", type=int, default=20000)
+    bench_parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+
+    args = parser.parse_args()
+    if args.command == "load":
+        start = time.perf_counter()
+        repository = SQLiteCustomerRepository(args.db)
+        loaded = repository.bulk_load(read_customers(args.path))
+        print(f"{loaded} clientes carregados em {args.db} ({time.perf_counter() - start:.1f} s)")
+    elif args.command == "generate":
+        with open(args.path, "w", encoding="utf-8") as file:
+            for record in generate_customers(args.count, args.seed):
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    else:
+        _bench(args.sizes, args.lookups, args.cache_size)
+
+
+if __name__ == "__main__":
+    main()
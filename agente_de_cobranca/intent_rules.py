@@ -0,0 +1,340 @@
+"""
+Caminho rápido da identificação de intenção: regras locais que reconhecem
+mensagens óbvias ("qual o meu saldo?", "quero quitar") sem chamar o LLM.
+
+Uma mensagem só é classificada localmente quando as regras apontam para uma
+única intenção e nenhum termo encontrado está negado ("não quero
+renegociar"). Confirmações curtas ("ok", "entendi", "pode ser") mantêm a
+intenção do turno anterior. Nos demais casos a decisão fica com o LLM.
+
+Configuração por variáveis de ambiente:
+    INTENT_FAST_PATH   "on" (padrão), "off", ou "shadow" (calcula a regra,
+                       mas sempre chama o LLM; útil para medir a concordância)
+    INTENT_LOG_PATH    JSONL com cada turno (mensagem, intenção anterior,
+                       regra e LLM), que serve de corpus para o relatório
+
+Relatório de cobertura e concordância sobre um corpus JSONL. Os turnos do
+INTENT_LOG_PATH trazem a intenção do LLM (`llm_intent`); os corpora da pasta
+trazem rótulos manuais (`label`):
+    intent_corpus.jsonl    exemplos usados para ajustar as regras (a
+                           concordância aqui não mede generalização)
+    intent_holdout.jsonl   exemplos separados, não usados no ajuste
+
+    python intent_rules.py report intent_holdout.jsonl         # contra o rótulo manual
+    python intent_rules.py report intent_holdout.jsonl --llm   # contra o LLM
+    python intent_rules.py report turnos.jsonl                 # turnos reais, contra o LLM
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "on").lower()
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", "")
+
+INTENT_LABELS = (
+    "RENEGOCIACAO_PARCELA",
+    "QUITACAO_ACORDO",
+    "CONSULTA_VENCIMENTO",
+    "CONSULTA_SALDO",
+    "CONTESTACAO",
+    "IMPOSSIBILIDADE_PAGAMENTO",
+    "ESCLARECIMENTO",
+    "INSATISFACAO",
+)
+
+# Padrões sobre o texto normalizado (minúsculas, sem acentos nem pontuação)
+INTENT_PATTERNS = {
+    "RENEGOCIACAO_PARCELA": [
+        r"renegoci\w*",
+        r"parcel(ar|amento)",
+        r"(diminuir|reduzir|baixar|abaixar) (o valor d)?(a|as|minha|minhas) parcelas?",
+        r"parcelas? (menor|menores|mais baixas?)",
+        r"mais (prazo|parcelas)",
+        r"(aumentar|estender|alongar) o prazo",
+        r"dividir (a divida|o valor|em \w+ vezes)",
+        r"(mudar|alterar|trocar) (o |a )?((dia|data) d[oe] )?vencimento",
+    ],
+    "QUITACAO_ACORDO": [
+        r"quit(ar|acao|o)",
+        r"liquidar",
+        r"pagar (tudo|o total|a divida toda|toda a divida)",
+        r"(pagamento|pagar) a vista",
+        r"desconto para (pagar|quitar)",
+        r"encerrar (a divida|o contrato|o emprestimo)",
+    ],
+    "CONSULTA_VENCIMENTO": [
+        r"quando (vence|venceu|e o vencimento)",
+        r"qual (e )?(o |a )?((dia|data) d[oe] )?vencimento",
+        r"(que|qual) dia (vence|devo pagar|tenho que pagar|e o pagamento)",
+        r"data (do|de) pagamento",
+        r"prazo para pagar",
+    ],
+    "CONSULTA_SALDO": [
+        r"saldo",
+        r"quanto (eu )?(devo|estou devendo|to devendo|falta)",
+        r"(valor|total) da (minha )?divida",
+        r"extrato",
+    ],
+    "CONTESTACAO": [
+        r"contest\w*",
+        r"nao reconheco",
+        r"cobranca indevida",
+        r"(ja|eu ja) (paguei|quitei)",
+        r"nunca (fiz|contratei|peguei)",
+        r"nao (fiz|contratei) (esse|este|nenhum)",
+        r"(valor|cobranca) (errad[oa]|incorret[oa])",
+        r"fraude",
+    ],
+    "IMPOSSIBILIDADE_PAGAMENTO": [
+        r"nao (consigo|posso|tenho como|vou conseguir) pagar",
+        r"nao tenho (dinheiro|condicoes|condicao)",
+        r"sem (dinheiro|condicoes|condicao)",
+        r"desempregad[oa]",
+        r"perdi (o|meu) emprego",
+        r"estou (doente|internad[oa]|afastad[oa])",
+    ],
+    "ESCLARECIMENTO": [
+        r"nao entendi",
+        r"como funciona",
+        r"o que (significa|e isso|quer dizer)",
+        r"(pode|poderia) (me )?explicar",
+        r"(tenho|estou com) (uma )?duvida",
+        r"por que (estou|to) sendo cobrad[oa]",
+    ],
+    "INSATISFACAO": [
+        r"absurd[oa]",
+        r"pessim[oa]",
+        r"ridicul[oa]",
+        r"reclama(r|cao)",
+        r"procon",
+        r"vou (processar|denunciar)",
+        r"(cansad[oa]|cheio|farto) de",
+        r"descaso",
+        r"falta de respeito",
+    ],
+}
+
+# Mensagens que não mudam o assunto da conversa
+ACKNOWLEDGEMENTS = {
+    "ok", "okay", "sim", "certo", "entendi", "entendo", "ta", "ta bom", "ta certo",
+    "beleza", "blz", "perfeito", "combinado", "pode ser", "tudo bem", "uhum",
+    "aham", "obrigado", "obrigada", "valeu", "ok obrigado", "ok obrigada",
+}
+
+# Termos que, logo antes de um padrão, invertem o sentido ("não quero quitar")
+_NEGATION = re.compile(r"\b(nao|nem|nunca|jamais)(\s+\w+)?\s*$")
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+_COMPILED_PATTERNS = {
+    intent: re.compile(r"\b(?:" + "|".join(patterns) + r")\b")
+    for intent, patterns in INTENT_PATTERNS.items()
+}
+
+# Mensagens longas tendem a misturar assuntos: ficam com o LLM
+MAX_WORDS = 30
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    source: str  # "rule" ou "previous"
+    matched: str
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", without_accents)).strip()
+
+
+def match_intent(message: str, previous_intent: Optional[str] = None) -> Optional[IntentMatch]:
+    """
+    Intenção da mensagem pelas regras locais.
+
+    Args:
+        message: Mensagem do cliente
+        previous_intent: Intenção identificada no turno anterior, se houver
+
+    Returns:
+        A intenção e a origem da decisão, ou None quando o caso é do LLM
+    """
+    text = normalize_text(message)
+    if not text:
+        return None
+    if text in ACKNOWLEDGEMENTS:
+        if previous_intent in INTENT_LABELS:
+            return IntentMatch(previous_intent, "previous", text)
+        return None
+    if len(text.split()) > MAX_WORDS:
+        return None
+
+    matches = {}
+    for intent, pattern in _COMPILED_PATTERNS.items():
+        for found in pattern.finditer(text):
+            # Padrões que já começam com a negação ("nao consigo pagar") não
+            # são invertidos por ela
+            if not found.group().startswith("nao ") and _NEGATION.search(text[:found.start()]):
+                return None
+            matches.setdefault(intent, found.group())
+    if len(matches) != 1:
+        return None
+    intent, matched = matches.popitem()
+    return IntentMatch(intent, "rule", matched)
+
+
+class IntentStats:
+    """Contadores do processo: decisões locais por origem e chamadas ao LLM."""
+
+    def __init__(self, log_path: str = ""):
+        self.log_path = log_path
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        message: str,
+        previous_intent: Optional[str],
+        fast_match: Optional[IntentMatch],
+        llm_intent: Optional[str],
+        chat_history: Optional[List[dict]] = None
+    ) -> None:
+        with self._lock:
+            self.counts["turns"] += 1
+            if fast_match is not None:
+                self.counts[f"fast_{fast_match.source}"] += 1
+            if llm_intent is not None:
+                self.counts["llm_calls"] += 1
+            if fast_match is not None and llm_intent is not None:
+                self.counts["agree" if fast_match.intent == llm_intent else "disagree"] += 1
+            if self.log_path:
+                entry = {
+                    "message": message,
+                    "previous_intent": previous_intent,
+                    "chat_history": (chat_history or [])[-3:],
+                    "fast_intent": fast_match.intent if fast_match else None,
+                    "fast_source": fast_match.source if fast_match else None,
+                    "llm_intent": llm_intent,
+                }
+                with open(self.log_path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+intent_stats = IntentStats(INTENT_LOG_PATH)
+
+
+def replay(entries: Iterable[Dict[str, Any]], reference: str = "llm_intent") -> Dict[str, Any]:
+    """
+    Reaplica as regras atuais a um corpus e mede a cobertura do caminho
+    rápido e a concordância com a intenção de referência: `llm_intent`
+    (rotulada pelo LLM, como no INTENT_LOG_PATH) ou `label` (rótulo manual).
+    """
+    total = 0
+    by_source: Counter = Counter()
+    agreement: Counter = Counter()
+    per_intent: Dict[str, Counter] = {}
+    disagreements = []
+    for entry in entries:
+        total += 1
+        fast_match = match_intent(entry["message"], entry.get("previous_intent"))
+        if fast_match is None:
+            by_source["llm"] += 1
+            continue
+        by_source[fast_match.source] += 1
+        expected = entry.get(reference)
+        if expected is None:
+            continue
+        agreed = fast_match.intent == expected
+        agreement["agree" if agreed else "disagree"] += 1
+        per_intent.setdefault(fast_match.intent, Counter())["agree" if agreed else "disagree"] += 1
+        if not agreed:
+            disagreements.append({
+                "message": entry["message"],
+                "fast_intent": fast_match.intent,
+                "fast_source": fast_match.source,
+                "matched": fast_match.matched,
+                "expected": expected,
+            })
+    fast = total - by_source["llm"]
+    compared = agreement["agree"] + agreement["disagree"]
+    return {
+        "messages": total,
+        "reference": reference,
+        "fast_path": fast,
+        "coverage": round(fast / total, 4) if total else 0.0,
+        "by_source": dict(by_source),
+        "compared": compared,
+        "agreement": round(agreement["agree"] / compared, 4) if compared else None,
+        "per_intent": {
+            intent: {**counts, "agreement": round(counts["agree"] / sum(counts.values()), 4)}
+            for intent, counts in sorted(per_intent.items())
+        },
+        "disagreements": disagreements,
+    }
+
+
+def label_entries(entries: List[Dict[str, Any]], labeler: Callable[[str, List[dict]], str]) -> None:
+    """
+    Preenche `llm_intent` nas entradas que ainda não o têm, com
+    `labeler(mensagem, histórico)`; no relatório, o classificador do agente
+    sem o caminho rápido (main.classify_intent_with_llm).
+    """
+    for entry in entries:
+        if entry.get("llm_intent") is None:
+            entry["llm_intent"] = labeler(entry["message"], entry.get("chat_history") or [])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Caminho rápido da identificação de intenção")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="Cobertura e concordância em um corpus JSONL")
+    report_parser.add_argument("corpus", help="JSONL com message, previous_intent e llm_intent ou label")
+    report_parser.add_argument(
+        "--llm", action="store_true",
+        help="Rotula com o LLM as entradas sem llm_intent e compara com o LLM, não com o rótulo manual"
+    )
+    report_parser.add_argument("--json", action="store_true", help="Imprime o relatório completo em JSON")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as file:
+        entries = [json.loads(line) for line in file if line.strip()]
+    if args.llm:
+        from main import classify_intent_with_llm
+
+        label_entries(entries, classify_intent_with_llm)
+    # Sem --llm, um corpus rotulado à mão é comparado com o rótulo manual
+    reference = "label" if not args.llm and any("label" in entry for entry in entries) else "llm_intent"
+    report = replay(entries, reference)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    agreement = "-" if report["agreement"] is None else f"{report['agreement']:.1%}"
+    print(f"mensagens: {report['messages']}")
+    print(f"caminho rápido: {report['fast_path']} ({report['coverage']:.1%}) {report['by_source']}")
+    reference_name = "o rótulo manual" if reference == "label" else "o LLM"
+    print(f"concordância com {reference_name}: {agreement} em {report['compared']} comparações")
+    for intent, counts in report["per_intent"].items():
+        print(f"  {intent:<28} {counts['agreement']:.1%}  ({counts.get('agree', 0)}/{counts.get('agree', 0) + counts.get('disagree', 0)})")
+    for disagreement in report["disagreements"]:
+        print(
+            f"  divergência: {disagreement['message']!r} -> regra {disagreement['fast_intent']} "
+            f"({disagreement['matched']!r}), esperado {disagreement['expected']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
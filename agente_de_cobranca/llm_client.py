@@ -0,0 +1,250 @@
+"""
+Clientes HTTP com pool de conexões persistentes compartilhados pelos modelos
+do agente, para que as chamadas ao LLM não abram uma conexão TCP+TLS nova.
+
+Configuração por variáveis de ambiente:
+    LLM_CONNECT_TIMEOUT / LLM_READ_TIMEOUT        timeouts em segundos (5 / 60)
+    LLM_WRITE_TIMEOUT / LLM_POOL_TIMEOUT          escrita e espera por conexão (10 / 10)
+    LLM_MAX_CONNECTIONS / LLM_MAX_KEEPALIVE_CONNECTIONS
+                                                  tamanho do pool (100 / 20)
+    LLM_KEEPALIVE_EXPIRY                          tempo ocioso antes de fechar (60)
+    LLM_HTTP2                                     "true" para HTTP/2 (requer h2)
+    LLM_WARMUP_CONNECTIONS                        conexões abertas no início (4)
+
+O trecho entre os marcadores "trecho comum" é copiado, idêntico, em
+AgenteClassifierExtrator/app/core/llm_client.py e
+avaliador_de_redacao/src/llm_client.py: os projetos são implantados
+separadamente, sem um pacote em comum do qual importar. Uma alteração no
+trecho comum deve ser feita nos três.
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+
+# As variáveis do .env precisam estar carregadas antes de montar o pool
+load_dotenv()
+
+DEFAULT_BASE_URL = "https://api.deepseek.com/beta"
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_WARMUP_CONNECTIONS = int(os.getenv("LLM_WARMUP_CONNECTIONS", "4"))
+
+
+# --- Início do trecho comum aos três projetos (manter idêntico) ---
+
+
+class ConnectionStats:
+    """
+    Contadores de uso do pool, alimentados pelo hook de requisição do httpx e
+    pela extensão `trace` do httpcore (que avisa quando uma conexão nova é
+    aberta e quanto tempo levou o handshake TLS).
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.connect_seconds = 0.0
+        self.tls_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _trace(self) -> Any:
+        # Um callback por requisição, para casar "started" e "complete" mesmo
+        # com várias conexões sendo abertas ao mesmo tempo
+        started: Dict[str, float] = {}
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            name, _, phase = event.rpartition(".")
+            if phase == "started":
+                started[name] = time.perf_counter()
+            elif phase == "complete" and name in started:
+                elapsed = time.perf_counter() - started.pop(name)
+                with self._lock:
+                    if name == "connection.connect_tcp":
+                        self.connections_opened += 1
+                        self.connect_seconds += elapsed
+                    elif name == "connection.start_tls":
+                        self.tls_handshakes += 1
+                        self.tls_seconds += elapsed
+
+        return trace
+
+    def on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace()
+
+    async def aon_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+        trace = self._trace()
+
+        async def atrace(event: str, info: Dict[str, Any]) -> None:
+            trace(event, info)
+
+        request.extensions["trace"] = atrace
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                "connect_seconds": self.connect_seconds,
+                "tls_seconds": self.tls_seconds,
+            }
+
+
+def _pool_connections(client: Any) -> Dict[str, int]:
+    # Estado atual do pool do httpcore (atributos internos: sem eles, zeros)
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", ()))
+    return {
+        "open": len(connections),
+        "idle": sum(1 for connection in connections if connection.is_idle()),
+    }
+
+
+class LLMHttpClients:
+    """
+    Par de clientes httpx (síncrono e assíncrono) com pool de conexões
+    persistentes, compartilhado por todos os modelos criados com
+    `create_chat_model`. Reaproveitar as conexões evita um handshake TCP+TLS
+    por chamada ao LLM.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        write_timeout: float = 10.0,
+        pool_timeout: float = 10.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+    ):
+        if http2 and importlib.util.find_spec("h2") is None:
+            raise ValueError(
+                "LLM_HTTP2 requires the 'h2' package (pip install httpx[http2])"
+            )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout,
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.stats = ConnectionStats()
+        self.sync_client = httpx.Client(
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+            event_hooks={"request": [self.stats.on_request]},
+        )
+        self.async_client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+            event_hooks={"request": [self.stats.aon_request]},
+        )
+
+    def warm_up(self, base_url: str, api_key: str, connections: int) -> int:
+        """
+        Abre `connections` conexões em paralelo (requisições simultâneas não
+        compartilham conexão em HTTP/1.1) e as devolve ao pool. Retorna quantas
+        receberam resposta; falhas não impedem a inicialização.
+        """
+        if connections <= 0:
+            return 0
+        url = base_url.rstrip("/") + "/models"
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        def probe(_: int) -> bool:
+            try:
+                self.sync_client.get(url, headers=headers)
+                return True
+            except httpx.HTTPError:
+                return False
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(probe, range(connections)))
+
+    async def awarm_up(self, base_url: str, api_key: str, connections: int) -> int:
+        """Versão assíncrona de `warm_up`, que aquece o pool do cliente assíncrono."""
+        if connections <= 0:
+            return 0
+        url = base_url.rstrip("/") + "/models"
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        async def probe() -> bool:
+            try:
+                await self.async_client.get(url, headers=headers)
+                return True
+            except httpx.HTTPError:
+                return False
+
+        results = await asyncio.gather(*(probe() for _ in range(connections)))
+        return sum(results)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats.snapshot(),
+            "sync": _pool_connections(self.sync_client),
+            "async": _pool_connections(self.async_client),
+        }
+
+    async def aclose(self) -> None:
+        await self.async_client.aclose()
+        self.sync_client.close()
+
+
+# --- Fim do trecho comum ---
+
+
+_shared_clients: Optional[LLMHttpClients] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_clients() -> LLMHttpClients:
+    """Clientes compartilhados do processo, criados com as variáveis de ambiente."""
+    global _shared_clients
+    with _shared_lock:
+        if _shared_clients is None:
+            _shared_clients = LLMHttpClients(
+                connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+                read_timeout=float(os.getenv("LLM_READ_TIMEOUT", "60")),
+                write_timeout=float(os.getenv("LLM_WRITE_TIMEOUT", "10")),
+                pool_timeout=float(os.getenv("LLM_POOL_TIMEOUT", "10")),
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+                keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),
+                http2=os.getenv("LLM_HTTP2", "false").lower() == "true"
+            )
+        return _shared_clients
+
+
+def create_chat_model(model_name: str = "deepseek-chat", base_url: str = DEFAULT_BASE_URL, **kwargs) -> ChatOpenAI:
+    """Cria um ChatOpenAI que reaproveita as conexões do pool compartilhado."""
+    clients = get_http_clients()
+    return ChatOpenAI(
+        model_name=model_name,
+        base_url=base_url,
+        http_client=clients.sync_client,
+        http_async_client=clients.async_client,
+        **kwargs
+    )
+
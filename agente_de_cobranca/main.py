@@ -1,13 +1,17 @@
 import os
 from typing import TypedDict, List
 from langgraph.graph import StateGraph, START, END
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 from langsmith import Client
 import langsmith
 import datetime
+from llm_client import DEFAULT_BASE_URL, LLM_WARMUP_CONNECTIONS, create_chat_model, get_http_clients
+from customer_repository import open_repository
+from intent_rules import INTENT_FAST_PATH, intent_stats, match_intent
+from compliance_rules import VIOLATION, PASS, can_skip_audit, prescreen_response
+from chat_streaming import CHAT_STREAMING, stream_turn
 
 # Load environment variables
 load_dotenv()
@@ -18,8 +22,8 @@ os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY")
 os.environ["LANGCHAIN_PROJECT"] = "store_recommendation_agent"
 os.environ["LANGCHAIN_TRACING_V2"] = "true"
 
-# Initialize language model
-llm = ChatOpenAI(model_name="deepseek-chat", 
+# Initialize language model (conexões do pool compartilhado)
+llm = create_chat_model(model_name="deepseek-chat", 
     temperature=0, 
     base_url="https://api.deepseek.com/beta")
 
@@ -42,6 +46,9 @@ class CustomerState(TypedDict):
     risk_score: str
     quitacao_disponivel: float
     processo_judicial: str
+    compliance_check: str
+    compliance_reasons: List[str]
+    compliance_skip_audit: bool
 
 # Adicionar após as importações:
 MOCK_CUSTOMER_DATABASE = {
@@ -169,17 +176,21 @@ MOCK_CUSTOMER_DATABASE = {
     }
 }
 
+# Base de clientes em SQLite (CUSTOMER_DB_PATH, carregada com
+# `python customer_repository.py load`); sem o arquivo, usa os exemplos acima
+customer_repository = open_repository(seed=MOCK_CUSTOMER_DATABASE)
+
 def get_customer_info():
     """
-    Busca informações do cliente na base de dados simulada.
+    Busca informações do cliente na base de clientes.
     """
     print("\n=== Sistema de Cobrança Open Co ===")
     while True:
-        print("Por favor, informe o CPF do cliente (formato: xxx.xxx.xxx-xx): ")
+        print("Por favor, informe o CPF do cliente (com ou sem pontuação): ")
         cpf = input().strip()
         
-        if cpf in MOCK_CUSTOMER_DATABASE:
-            customer_data = MOCK_CUSTOMER_DATABASE[cpf].copy()
+        customer_data = customer_repository.get(cpf)
+        if customer_data is not None:
             customer_data["chat_history"] = []
             return customer_data
         else:
@@ -210,19 +221,24 @@ def interactive_chat(app, customer_state: CustomerState):
         current_state = customer_state.copy()
         current_state["customer_intent"] = user_input
         
-        # Processa a mensagem através do workflow
+        # Processa a mensagem através do workflow, exibindo a resposta do
+        # agente conforme é gerada (CHAT_STREAMING)
         try:
-            final_state = app.invoke(current_state)
+            if CHAT_STREAMING == "off":
+                final_state = app.invoke(current_state)
+                print("\nAgente: ", final_state.get("agent_response", ""))
+            else:
+                print("\nAgente: ", end="", flush=True)
+                final_state, _ = stream_turn(app, current_state, get_negotiation_limits(current_state))
             
-            # Adiciona a interação ao histórico
+            # Adiciona a interação ao histórico (com a intenção identificada,
+            # reaproveitada quando o cliente só confirma no turno seguinte)
             current_state["chat_history"].append({
                 "customer": user_input,
-                "agent": final_state.get("agent_response", "")
+                "agent": final_state.get("agent_response", ""),
+                "intent": final_state.get("customer_intent", "")
             })
             
-            # Exibe a resposta do agente
-            print("\nAgente: ", final_state.get("agent_response", ""))
-            
             # Atualiza o estado para a próxima iteração
             customer_state = current_state
             
@@ -245,15 +261,16 @@ def format_chat_history(chat_history):
     
     return "\n".join(formatted_history)
 
-def identify_customer_intent(state: CustomerState) -> dict:
+def classify_intent_with_llm(message: str, chat_history: List[dict]) -> str:
     """
-    Identifica a intenção do cliente baseado em sua mensagem e histórico.
+    Identifica a intenção do cliente com o LLM, sem o caminho rápido das
+    regras locais (também usada para rotular corpora em intent_rules.py).
     """
     context = f"""
     HISTÓRICO DA CONVERSA:
-    {format_chat_history(state.get('chat_history', []))}
+    {format_chat_history(chat_history)}
     
-    MENSAGEM ATUAL: {state['customer_intent']}
+    MENSAGEM ATUAL: {message}
     """
     
     prompt = PromptTemplate(
@@ -276,9 +293,26 @@ def identify_customer_intent(state: CustomerState) -> dict:
         Responda APENAS com uma das opções acima."""
     )
     
-    message = HumanMessage(content=prompt.format(context=context))
-    intent = llm.invoke([message])
-    return {"customer_intent": intent.content.strip()}
+    prompt_message = HumanMessage(content=prompt.format(context=context))
+    return llm.invoke([prompt_message]).content.strip()
+
+def identify_customer_intent(state: CustomerState) -> dict:
+    """
+    Identifica a intenção do cliente baseado em sua mensagem e histórico.
+    Mensagens óbvias são resolvidas pelas regras locais, sem chamar o LLM.
+    """
+    chat_history = state.get('chat_history', [])
+    previous_intent = chat_history[-1].get('intent') if chat_history else None
+    fast_match = None
+    if INTENT_FAST_PATH != "off":
+        fast_match = match_intent(state['customer_intent'], previous_intent)
+    if fast_match is not None and INTENT_FAST_PATH == "on":
+        intent_stats.record(state['customer_intent'], previous_intent, fast_match, None, chat_history)
+        return {"customer_intent": fast_match.intent}
+    
+    intent = classify_intent_with_llm(state['customer_intent'], chat_history)
+    intent_stats.record(state['customer_intent'], previous_intent, fast_match, intent, chat_history)
+    return {"customer_intent": intent}
 
 def get_negotiation_limits(state: CustomerState) -> dict:
     """
@@ -375,6 +409,24 @@ def collection_agent(state: CustomerState) -> dict:
     response = llm.invoke([message])
     return {"agent_response": response.content.strip()}
 
+def compliance_prescreen(state: CustomerState) -> dict:
+    """
+    Triagem local da resposta antes da auditoria pelo LLM. Violações claras
+    vão direto para a revisão humana; respostas sem nenhum achado podem
+    dispensar a auditoria, conforme COMPLIANCE_SKIP_POLICY (ou a decisão já
+    tomada no turno, em compliance_skip_audit, quando a resposta é exibida
+    em streaming).
+    """
+    screen = prescreen_response(state["agent_response"], get_negotiation_limits(state))
+    if screen.verdict == VIOLATION:
+        return {"compliance_check": "violation", "compliance_reasons": screen.reasons, "approved": False}
+    skip_audit = state.get("compliance_skip_audit")
+    if skip_audit is None:
+        skip_audit = can_skip_audit(state)
+    if screen.verdict == PASS and skip_audit:
+        return {"compliance_check": "skip_audit", "compliance_reasons": [], "approved": True}
+    return {"compliance_check": "audit", "compliance_reasons": screen.reasons}
+
 def compliance_validator(state: CustomerState) -> dict:
     """
     Valida se a resposta do agente está em conformidade com as normas de cobrança.
@@ -398,7 +450,7 @@ def compliance_validator(state: CustomerState) -> dict:
     
     message = HumanMessage(content=prompt.format(text=state["agent_response"]))
     validation = llm.predict_messages([message]).content.strip()
-    return {"approved": validation == "True"}
+    return {"approved": validation == "True", "compliance_check": "llm"}
 
 def router(state: CustomerState) -> str:
     """
@@ -457,27 +509,30 @@ def human_intervention_flow(state: CustomerState) -> dict:
     Returns:
         Dictionary com mensagem de necessidade de intervenção
     """
+    reason = "Resposta não aprovada na validação de conformidade"
+    if state.get("compliance_check") == "violation":
+        reason = "Triagem de conformidade: " + "; ".join(state["compliance_reasons"])
     return {
         'result': (
             f"=== Necessita Revisão Humana ===\n"
             f"Cliente: {state['customer_name']}\n"
             f"Intenção: {state['customer_intent']}\n"
             f"Resposta Sugerida: {state['agent_response']}\n"
-            f"Motivo: Resposta não aprovada na validação de conformidade\n"
+            f"Motivo: {reason}\n"
             f"Status: Encaminhado para supervisor"
         )
     }
 
-def main():
+def build_workflow():
     """
-    Função principal para configurar e executar o workflow do agente.
+    Monta e compila o grafo de atendimento (usado também pelas campanhas).
     """
-    # Configura o workflow
     workflow = StateGraph(CustomerState)
     
     # Adiciona nós
     workflow.add_node("identify_intent", identify_customer_intent)
     workflow.add_node("collection_agent", collection_agent)
+    workflow.add_node("compliance_prescreen", compliance_prescreen)
     workflow.add_node("compliance_validator", compliance_validator)
     workflow.add_node("human_intervention_flow", human_intervention_flow)
     workflow.add_node("automated_flow", automated_flow)
@@ -485,7 +540,14 @@ def main():
     # Define arestas
     workflow.add_edge(START, "identify_intent")
     workflow.add_edge("identify_intent", "collection_agent")
-    workflow.add_edge("collection_agent", "compliance_validator")
+    workflow.add_edge("collection_agent", "compliance_prescreen")
+    workflow.add_conditional_edges(
+        "compliance_prescreen",
+        lambda x: {
+            "violation": "human_intervention_flow",
+            "skip_audit": "automated_flow",
+        }.get(x["compliance_check"], "compliance_validator")
+    )
     workflow.add_conditional_edges(
         "compliance_validator",
         lambda x: "automated_flow" if x["approved"] else "human_intervention_flow"
@@ -494,7 +556,17 @@ def main():
     workflow.add_edge("automated_flow", END)
     
     # Compila o grafo
-    app = workflow.compile()
+    return workflow.compile()
+
+def main():
+    """
+    Função principal para configurar e executar o workflow do agente.
+    """
+    # Configura o workflow
+    app = build_workflow()
+    
+    # Abre as conexões com o LLM antes do primeiro atendimento
+    get_http_clients().warm_up(DEFAULT_BASE_URL, os.getenv("OPENAI_API_KEY"), LLM_WARMUP_CONNECTIONS)
     
     # Inicia o loop de atendimento
     while True:
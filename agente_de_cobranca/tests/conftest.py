@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Adiciona o diretório do agente ao PYTHONPATH para importar os módulos (scripts soltos)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
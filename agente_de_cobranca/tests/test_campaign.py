@@ -0,0 +1,117 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from campaign import (
+    CampaignProgress,
+    read_checkpoint,
+    recover_output,
+    run_campaign,
+    write_checkpoint,
+)
+from customer_repository import InMemoryCustomerRepository, generate_customers
+
+
+class FakeApp:
+    """Grafo falso: aprova todos os clientes, exceto os CPFs em `failing`."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    async def ainvoke(self, state):
+        cpf = state["customer_name"]
+        self.calls.append(cpf)
+        await asyncio.sleep(0)
+        if cpf in self.failing:
+            raise RuntimeError("LLM indisponível")
+        return {**state, "agent_response": "Proposta", "approved": True, "compliance_check": "APROVADO"}
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_recover_output_truncates_partial_line(tmp_path):
+    """Testa que a última linha incompleta é descartada e que erros não contam como feitos."""
+    path = tmp_path / "out.jsonl"
+    complete = (
+        json.dumps({"cpf": "1", "approved": True}) + "\n"
+        + json.dumps({"cpf": "2", "error": "Timeout"}) + "\n"
+    )
+    path.write_text(complete + '{"cpf": "3", "appr', encoding="utf-8")
+    assert recover_output(str(path)) == {"1"}
+    assert path.read_text(encoding="utf-8") == complete
+
+
+def test_recover_output_stops_at_corrupt_line(tmp_path):
+    """Testa que uma linha inválida e tudo depois dela saem do arquivo."""
+    path = tmp_path / "out.jsonl"
+    first = json.dumps({"cpf": "1", "approved": True}) + "\n"
+    path.write_text(first + "lixo\n" + json.dumps({"cpf": "2"}) + "\n", encoding="utf-8")
+    assert recover_output(str(path)) == {"1"}
+    assert path.read_text(encoding="utf-8") == first
+    assert recover_output(str(tmp_path / "ausente.jsonl")) == set()
+
+
+def test_progress_checkpoint_advances_over_finished_prefix():
+    """Testa que o checkpoint só avança sobre o prefixo concluído, na ordem de despacho."""
+    progress = CampaignProgress(total=3)
+    for cpf in ("a", "b", "c"):
+        progress.dispatch(cpf)
+    progress.finish("b", True)
+    assert progress.after_cpf is None
+    progress.finish("a", False)
+    assert progress.after_cpf == "b"
+    progress.finish("c", True)
+    assert progress.after_cpf == "c"
+    assert (progress.processed, progress.approved, progress.errors) == (3, 2, 0)
+
+
+def test_progress_checkpoint_freezes_before_failure():
+    """Testa que o checkpoint para antes do primeiro cliente que falhou."""
+    progress = CampaignProgress(total=4)
+    for cpf in ("a", "b", "c"):
+        progress.dispatch(cpf)
+    progress.finish("a", True)
+    progress.finish("b", None)
+    progress.finish("c", True)
+    progress.dispatch("d")
+    progress.finish("d", True)
+    assert progress.after_cpf == "a"
+    assert progress.errors == 1
+    assert progress.stats()["approval_rate"] == 1.0
+
+
+def test_checkpoint_rejects_other_segment(tmp_path):
+    """Testa que um checkpoint não é reaproveitado por outro segmento."""
+    path = str(tmp_path / "out.jsonl.checkpoint")
+    write_checkpoint(path, {"loan_status": "atrasado"}, "123", {"processed": 1})
+    assert read_checkpoint(path, {"loan_status": "atrasado"}) == "123"
+    with pytest.raises(ValueError):
+        read_checkpoint(path, {"loan_status": "judicial"})
+
+
+def test_run_campaign_resumes_after_failure(tmp_path):
+    """Testa a retomada: só os clientes que falharam são processados de novo."""
+    repository = InMemoryCustomerRepository(generate_customers(200))
+    segment = {"loan_status": "atrasado"}
+    customers = list(repository.find(**segment))
+    output = str(tmp_path / "campanha.jsonl")
+    failing = customers[2]["customer_name"]
+
+    first = FakeApp(failing={failing})
+    stats = asyncio.run(run_campaign(first, repository, segment, output, concurrency=3, log=io.StringIO()))
+    assert (stats["processed"], stats["errors"]) == (len(customers), 1)
+    assert _lines(output + ".errors")[0]["customer_name"] == failing
+    with open(output + ".checkpoint", encoding="utf-8") as file:
+        assert json.load(file)["after_cpf"] == customers[1]["cpf"]
+
+    second = FakeApp()
+    stats = asyncio.run(run_campaign(second, repository, segment, output, concurrency=3, log=io.StringIO()))
+    assert second.calls == [failing]
+    assert (stats["processed"], stats["errors"]) == (1, 0)
+    assert sorted(line["cpf"] for line in _lines(output)) == sorted(c["cpf"] for c in customers)
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+
+import chat_streaming
+from chat_streaming import HELD_FOR_REVIEW_MESSAGE, SentenceGate, stream_turn
+
+LIMITS = {
+    "desconto_max": 0.2,
+    "max_parcelas": 12,
+    "min_entrada": 100.0,
+    "carencia_maxima": 30,
+    "vencimento_min": 5,
+    "vencimento_max": 25,
+}
+
+
+def _feed(gate, text, size=3):
+    # Tokens pequenos, como no streaming do modelo
+    released = []
+    for start in range(0, len(text), size):
+        released += gate.feed(text[start:start + size])
+    return released
+
+
+def test_sentence_mode_releases_clean_sentences():
+    """Testa que frases sem achados são liberadas à medida que terminam."""
+    gate = SentenceGate(LIMITS)
+    released = _feed(gate, "Olá, Maria. Podemos parcelar em 10x de R$ 200,00. Qual dia prefere")
+    assert released == ["Olá, Maria. ", "Podemos parcelar em 10x de R$ 200,00. "]
+    assert gate.finish(approved=True) == ["Qual dia prefere"]
+    assert not gate.holding
+
+
+def test_sentence_mode_holds_from_first_finding():
+    """Testa que a partir do primeiro trecho com achados nada mais é liberado antes da aprovação."""
+    gate = SentenceGate(LIMITS)
+    released = _feed(gate, "Olá, Maria. O atraso pode levar à negativação. Vamos resolver? Obrigado.")
+    assert released == ["Olá, Maria. "]
+    assert gate.holding and not gate.blocked
+    assert gate.finish(approved=True) == [
+        "O atraso pode levar à negativação. ", "Vamos resolver? ", "Obrigado."
+    ]
+
+
+def test_unapproved_text_is_not_flushed():
+    """Testa que o texto retido não é exibido quando a resposta não é aprovada."""
+    gate = SentenceGate(LIMITS)
+    _feed(gate, "Olá. O atraso pode levar à negativação. Resto da resposta")
+    assert gate.finish(approved=False) == []
+
+
+def test_violation_is_never_flushed():
+    """Testa que um trecho com violação bloqueia a liberação mesmo com a aprovação do grafo."""
+    gate = SentenceGate(LIMITS)
+    released = _feed(gate, "Olá. Podemos parcelar em 24x. Obrigado.")
+    assert released == ["Olá. "]
+    assert gate.blocked
+    assert any("parcelas acima do máximo" in reason for reason in gate.reasons)
+    assert gate.finish(approved=True) == []
+
+
+def test_violation_across_sentences_is_caught():
+    """Testa a triagem sobre o texto já liberado mais o trecho novo."""
+    gate = SentenceGate(LIMITS)
+    released = _feed(gate, "Se não pagar, ligaremos para seus\nfamiliares. Obrigado.")
+    assert released == ["Se não pagar, ligaremos para seus\n"]
+    assert gate.blocked
+    assert gate.finish(approved=True) == []
+
+
+def test_buffer_mode_holds_everything():
+    """Testa que no modo buffer nada é liberado antes da aprovação final."""
+    gate = SentenceGate(LIMITS, mode="buffer")
+    assert _feed(gate, "Olá, Maria. Tudo certo. Até logo") == []
+    assert "".join(gate.finish(approved=True)) == "Olá, Maria. Tudo certo. Até logo"
+
+
+class FakeApp:
+    """Grafo falso: tokens do collection_agent e o estado final."""
+
+    def __init__(self, tokens, final_state):
+        self.tokens = tokens
+        self.final_state = final_state
+
+    def stream(self, state, stream_mode):
+        for token in self.tokens:
+            yield "messages", (SimpleNamespace(content=token), {"langgraph_node": "collection_agent"})
+        yield "messages", (SimpleNamespace(content="ignorado"), {"langgraph_node": "identify_intent"})
+        yield "values", self.final_state
+
+
+@pytest.fixture(autouse=True)
+def no_metrics_log(monkeypatch):
+    monkeypatch.setattr(chat_streaming, "CHAT_METRICS_LOG_PATH", "")
+
+
+@pytest.mark.parametrize("approved, expected", [
+    (True, "Olá. Tudo certo.\n"),
+    (False, "Olá. \n" + HELD_FOR_REVIEW_MESSAGE + "\n"),
+])
+def test_stream_turn_sentence_mode(monkeypatch, approved, expected):
+    """Testa o turno com liberação antecipada: o que falta só sai com a aprovação."""
+    monkeypatch.setattr(chat_streaming, "can_skip_audit", lambda state: True)
+    app = FakeApp(["Olá. ", "Tudo", " certo."], {"approved": approved, "compliance_check": "x"})
+    written = []
+    final_state, metrics = stream_turn(app, {}, LIMITS, mode="sentence", write=written.append)
+    assert "".join(written) == expected
+    assert metrics["early_release"] and metrics["approved"] == approved
+
+
+def test_stream_turn_buffer_without_early_release(monkeypatch):
+    """Testa que, sem dispensa de auditoria, o modo sentence espera a aprovação final."""
+    monkeypatch.setattr(chat_streaming, "can_skip_audit", lambda state: False)
+    app = FakeApp(["Olá. ", "Tudo certo."], {"approved": False})
+    written = []
+    stream_turn(app, {}, LIMITS, mode="sentence", write=written.append)
+    assert "".join(written) == HELD_FOR_REVIEW_MESSAGE + "\n"
@@ -0,0 +1,97 @@
+import pytest
+
+from compliance_rules import (
+    PASS,
+    UNCERTAIN,
+    VIOLATION,
+    check_limits,
+    find_sensitive_data,
+    is_valid_cpf,
+    parse_amount,
+    prescreen_response,
+)
+
+LIMITS = {
+    "desconto_max": 0.2,
+    "max_parcelas": 12,
+    "min_entrada": 100.0,
+    "carencia_maxima": 30,
+    "vencimento_min": 5,
+    "vencimento_max": 25,
+}
+
+
+@pytest.mark.parametrize("response", [
+    "Podemos parcelar em 24x sem juros.",
+    "Consigo dividir em até 18 vezes.",
+    "Temos uma proposta de 36 parcelas fixas.",
+    "Ficaria em 15 meses.",
+    "São 20x de R$ 150,00.",
+])
+def test_installment_offer_above_limit(response):
+    """Testa que ofertas de parcelamento acima do máximo são apontadas."""
+    assert any("parcelas acima do máximo" in reason for reason in check_limits(response, LIMITS))
+
+
+@pytest.mark.parametrize("response", [
+    "Você já pagou 15 parcelas das 24 do contrato original.",
+    "Restam 18 parcelas em aberto no seu contrato.",
+    "Podemos parcelar em 12x sem juros.",
+    "Seu contrato tem 48 meses de prazo.",
+])
+def test_installments_outside_offer_context(response):
+    """Testa que números de parcelas fora de uma oferta (ou dentro do limite) não são violação."""
+    assert check_limits(response, LIMITS) == []
+
+
+def test_other_limits():
+    """Testa desconto, entrada, carência e dia de vencimento fora dos limites."""
+    response = (
+        "Oferecemos 30% de desconto, entrada de R$ 50,00, 45 dias de carência "
+        "e vencimento todo dia 28."
+    )
+    reasons = check_limits(response, LIMITS)
+    assert len(reasons) == 4
+    assert check_limits("Desconto de 20% com entrada de R$ 1.000,00 e vencimento no dia 10.", LIMITS) == []
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1.500,00", 1500.0),
+    ("1500,50", 1500.5),
+    ("1500.00", 1500.0),
+    ("1.500", 1500.0),
+])
+def test_parse_amount(value, expected):
+    """Testa os formatos de valor em reais."""
+    assert parse_amount(value) == expected
+
+
+def test_is_valid_cpf():
+    """Testa os dígitos verificadores do CPF."""
+    assert is_valid_cpf("52998224725")
+    assert not is_valid_cpf("52998224724")
+    assert not is_valid_cpf("11111111111")
+
+
+def test_find_sensitive_data():
+    """Testa CPF e cartão válidos; números de contrato não são dado sensível."""
+    assert find_sensitive_data("CPF 529.982.247-25") == ["cpf"]
+    assert find_sensitive_data("Seu CPF 52998224725 está cadastrado") == ["cpf"]
+    assert find_sensitive_data("Contrato 52998224724") == []
+    assert find_sensitive_data("Cartão 4111 1111 1111 1111") == ["cartao"]
+    assert find_sensitive_data("Seu score de risco é alto") == ["contexto_interno"]
+
+
+@pytest.mark.parametrize("response, verdict", [
+    ("Se não pagar, você será preso.", VIOLATION),
+    ("Vamos ligar para seus familiares.", VIOLATION),
+    ("Podemos parcelar em 24x.", VIOLATION),
+    ("O atraso pode levar à negativação do seu nome.", UNCERTAIN),
+    ("Podemos parcelar em 10x de R$ 200,00, com vencimento no dia 10.", PASS),
+    ("Você já pagou 15 parcelas das 24 do contrato original.", PASS),
+])
+def test_prescreen_response(response, verdict):
+    """Testa o veredito da triagem local."""
+    result = prescreen_response(response, LIMITS)
+    assert result.verdict == verdict
+    assert bool(result.reasons) == (verdict != PASS)
@@ -0,0 +1,99 @@
+import pytest
+
+from customer_repository import (
+    CachedCustomerRepository,
+    InMemoryCustomerRepository,
+    SQLiteCustomerRepository,
+    format_cpf,
+    generate_customers,
+    normalize_cpf,
+    normalize_record,
+)
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SQLiteCustomerRepository(str(tmp_path / "customers.sqlite3"))
+    repository.bulk_load(generate_customers(250))
+    yield repository
+    repository.close()
+
+
+@pytest.mark.parametrize("cpf, expected", [
+    ("123.456.789-01", "12345678901"),
+    ("12345678901", "12345678901"),
+    ("123 456 789 01", "12345678901"),
+    ("123.456.789", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_cpf(cpf, expected):
+    """Testa a normalização do CPF com qualquer pontuação."""
+    assert normalize_cpf(cpf) == expected
+
+
+def test_normalize_record_rejects_invalid_cpf():
+    """Testa que um registro sem CPF de 11 dígitos é rejeitado na carga."""
+    with pytest.raises(ValueError):
+        normalize_record({"cpf": "123", "customer_name": "Cliente"})
+
+
+def test_get_accepts_any_format(repository):
+    """Testa a busca pelo CPF com e sem pontuação; o registro não traz o CPF."""
+    cpf = next(repository.find())["cpf"]
+    record = repository.get(format_cpf(cpf))
+    assert record == repository.get(cpf)
+    assert "cpf" not in record
+    assert repository.get("999.999.999-99") is None
+    assert repository.get("invalido") is None
+
+
+def test_find_keyset_paging(repository, monkeypatch):
+    """Testa que a paginação por chave devolve o segmento inteiro, em ordem e sem repetições."""
+    monkeypatch.setattr(SQLiteCustomerRepository, "BATCH_SIZE", 7)
+    filters = {"loan_status": "atrasado", "min_days_overdue": 31}
+    cpfs = [record["cpf"] for record in repository.find(**filters)]
+    assert len(cpfs) == repository.count(**filters) > 7
+    assert cpfs == sorted(set(cpfs))
+
+    # Retomada depois de um CPF e limite que não cai no fim de uma página
+    resumed = [record["cpf"] for record in repository.find(after_cpf=cpfs[9], limit=10, **filters)]
+    assert resumed == cpfs[10:20]
+
+
+def test_find_matches_in_memory_repository(repository):
+    """Testa que o SQLite e a implementação em memória selecionam o mesmo segmento."""
+    in_memory = InMemoryCustomerRepository(generate_customers(250))
+    filters = {"risk_score": "alto", "max_days_overdue": 200}
+    assert list(repository.find(**filters)) == list(in_memory.find(**filters))
+    assert repository.count(**filters) == in_memory.count(**filters)
+
+
+def test_cache_lru(repository):
+    """Testa os acertos, a remoção do menos usado e as cópias devolvidas pelo cache."""
+    cached = CachedCustomerRepository(repository, max_items=2)
+    first, second, third = (record["cpf"] for record in repository.find(limit=3))
+
+    cached.get(first)
+    cached.get(format_cpf(first))
+    cached.get(second)
+    assert cached.stats() == {"items": 2, "hits": 1, "misses": 2}
+
+    # `first` foi usado por último: `second` é o removido
+    cached.get(first)
+    cached.get(third)
+    cached.get(second)
+    assert cached.stats()["misses"] == 4
+
+    record = cached.get(first)
+    record["payment_history"].append("alterado")
+    assert "alterado" not in cached.get(first)["payment_history"]
+
+
+def test_cache_cleared_on_bulk_load(repository):
+    """Testa que uma nova carga descarta os registros em cache."""
+    cached = CachedCustomerRepository(repository, max_items=10)
+    record = next(repository.find(limit=1))
+    cached.get(record["cpf"])
+    cached.bulk_load([{**record, "customer_name": "Outro Nome"}])
+    assert cached.get(record["cpf"])["customer_name"] == "Outro Nome"
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from intent_rules import label_entries, match_intent, normalize_text, replay
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_normalize_text():
+    """Testa a remoção de acentos, pontuação e espaços repetidos."""
+    assert normalize_text("  Qual é o   SALDO?! ") == "qual e o saldo"
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("Qual o meu saldo?", "CONSULTA_SALDO"),
+    ("quero quitar a dívida", "QUITACAO_ACORDO"),
+    ("quando vence a próxima parcela?", "CONSULTA_VENCIMENTO"),
+    ("qual a data de vencimento?", "CONSULTA_VENCIMENTO"),
+    ("posso mudar o dia do vencimento pro dia 20?", "RENEGOCIACAO_PARCELA"),
+    ("quero trocar a data de vencimento", "RENEGOCIACAO_PARCELA"),
+    ("não consigo pagar este mês", "IMPOSSIBILIDADE_PAGAMENTO"),
+])
+def test_match_intent_rule(message, intent):
+    """Testa mensagens óbvias resolvidas pelas regras locais."""
+    match = match_intent(message)
+    assert match is not None
+    assert match.intent == intent
+    assert match.source == "rule"
+
+
+@pytest.mark.parametrize("message", [
+    "não quero renegociar",                                  # termo negado
+    "quero quitar, mas antes qual o meu saldo?",             # duas intenções
+    "o vencimento caiu no feriado, e agora?",                # "vencimento" sem pergunta
+    "bom dia",                                               # nenhuma regra
+    "",
+    " ".join(["quero", "quitar"] * 20),                      # mensagem longa
+])
+def test_match_intent_abstains(message):
+    """Testa que os casos ambíguos ficam com o LLM."""
+    assert match_intent(message) is None
+
+
+def test_acknowledgement_keeps_previous_intent():
+    """Testa que confirmações curtas mantêm a intenção do turno anterior."""
+    match = match_intent("Entendi!", previous_intent="CONSULTA_SALDO")
+    assert match == ("CONSULTA_SALDO", "previous", "entendi")
+    assert match_intent("ok") is None
+    assert match_intent("ok", previous_intent="DESCONHECIDA") is None
+
+
+def test_holdout_agreement():
+    """Testa a concordância das regras com os rótulos manuais do holdout."""
+    with open(os.path.join(CORPUS_DIR, "intent_holdout.jsonl"), encoding="utf-8") as file:
+        entries = [json.loads(line) for line in file if line.strip()]
+    report = replay(entries, "label")
+    assert report["compared"] > 0
+    assert report["disagreements"] == []
+
+
+def test_label_entries_uses_injected_labeler():
+    """Testa que só as entradas sem llm_intent são rotuladas, com mensagem e histórico."""
+    calls = []
+
+    def labeler(message, chat_history):
+        calls.append((message, chat_history))
+        return "ESCLARECIMENTO"
+
+    history = [{"customer": "oi"}]
+    entries = [
+        {"message": "como funciona?", "chat_history": history},
+        {"message": "qual o saldo?", "llm_intent": "CONSULTA_SALDO"},
+    ]
+    label_entries(entries, labeler)
+    assert calls == [("como funciona?", history)]
+    assert [entry["llm_intent"] for entry in entries] == ["ESCLARECIMENTO", "CONSULTA_SALDO"]
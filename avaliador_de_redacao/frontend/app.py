@@ -21,8 +21,19 @@ logger = logging.getLogger(__name__)
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from src.config import LLM_WARMUP_CONNECTIONS, MODEL_BASE_URL, OPENAI_API_KEY  # noqa: E402
+from src.llm_client import get_http_clients  # noqa: E402
 from src.workflows import grade_essay  # noqa: E402
 
+
+@st.cache_resource
+def warm_up_llm_connections() -> int:
+    """Abre as conexões com o modelo uma única vez por processo do Streamlit."""
+    warmed = get_http_clients().warm_up(MODEL_BASE_URL, OPENAI_API_KEY, LLM_WARMUP_CONNECTIONS)
+    logger.info(f"LLM warm-up: {warmed}/{LLM_WARMUP_CONNECTIONS} connections")
+    return warmed
+
+
 class TextEvaluationApp:
     """Main class for the text evaluation Streamlit application."""
     
@@ -167,6 +178,7 @@ class TextEvaluationApp:
 def main():
     """Main entry point for the application."""
     app = TextEvaluationApp()
+    warm_up_llm_connections()
     app.run()
 
 if __name__ == "__main__":
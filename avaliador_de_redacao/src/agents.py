@@ -1,15 +1,10 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from typing import Dict, Any
-from .config import OPENAI_API_KEY, MODEL_NAME, MODEL_BASE_URL
+from .llm_client import create_chat_model
 from .utils import extract_score
 
-# Initialize LLM
-llm = ChatOpenAI(
-    api_key=OPENAI_API_KEY,
-    model=MODEL_NAME,
-    base_url=MODEL_BASE_URL
-)
+# Initialize LLM (conexões do pool compartilhado)
+llm = create_chat_model()
 
 class EssayEvaluator:
     """Classe que implementa os agentes de avaliação de redação."""
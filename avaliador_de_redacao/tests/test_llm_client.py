@@ -0,0 +1,41 @@
+import asyncio
+
+from src import llm_client
+from src.config import LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT
+
+
+def test_http_clients_timeouts():
+    """Testa os timeouts explícitos de conexão e leitura."""
+    clients = llm_client.get_http_clients()
+    for client in (clients.sync_client, clients.async_client):
+        assert client.timeout.connect == LLM_CONNECT_TIMEOUT
+        assert client.timeout.read == LLM_READ_TIMEOUT
+
+
+def test_create_chat_model_shares_clients():
+    """Testa que todos os modelos usam os mesmos clientes HTTP."""
+    first = llm_client.create_chat_model()
+    second = llm_client.create_chat_model(temperature=0)
+    clients = llm_client.get_http_clients()
+    assert first.http_client is clients.sync_client
+    assert second.http_client is clients.sync_client
+
+
+def test_warm_up_ignores_network_errors():
+    """Testa que o aquecimento não falha sem acesso ao provedor."""
+    clients = llm_client.LLMHttpClients(connect_timeout=1)
+    assert clients.warm_up("http://127.0.0.1:1", "test-key", 2) == 0
+    assert clients.warm_up("http://127.0.0.1:1", "test-key", 0) == 0
+    assert asyncio.run(clients.awarm_up("http://127.0.0.1:1", "test-key", 2)) == 0
+    asyncio.run(clients.aclose())
+
+
+def test_pool_stats_counts_requests():
+    """Testa a contagem de requisições nas estatísticas do pool."""
+    clients = llm_client.LLMHttpClients(connect_timeout=1)
+    clients.warm_up("http://127.0.0.1:1", "test-key", 1)
+    stats = clients.pool_stats()
+    assert stats["requests"] == 1
+    assert stats["connections_opened"] == 0
+    assert stats["sync"]["open"] >= stats["sync"]["idle"] >= 0
+    asyncio.run(clients.aclose())